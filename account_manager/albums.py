@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+import asyncio
+from collections import OrderedDict
+
+from loguru import logger  # https://github.com/Delgan/loguru
+
+from core.config import album_window
+
+
+class AlbumBuffer:
+    """
+    Собирает части медиа-альбома в одно сообщение.
+
+    Альбом приходит как N отдельных событий с общим `grouped_id`. Части накапливаются в течение `window` секунд
+    с момента первой части, после чего альбом целиком передаётся в `process`: текст всех частей проверяется
+    по ключевым словам один раз, а при совпадении альбом пересылается одной пересылкой.
+
+    Части последних `recent_size` обработанных альбомов запоминаются: отредактированная позже часть
+    объединяется с остальными частями, и альбом проверяется заново целиком, а не одной частью.
+
+    :param process: (coroutine function) Обработчик альбома: `process(client, parts, chat_id)`,
+                    где parts — части альбома в порядке ID.
+    :param window: (float) Время ожидания остальных частей альбома, секунд.
+    :param recent_size: (int) Количество запоминаемых обработанных альбомов.
+    """
+
+    def __init__(self, process, window=album_window, recent_size=1000):
+        self.process = process
+        self.window = window
+        self.recent_size = recent_size
+        self._albums = {}  # {(chat_id, grouped_id): (client, {message_id: message})}
+        self._processing = {}  # {(chat_id, grouped_id): {message_id: message}} — альбомы в обработке
+        self._recent = OrderedDict()  # {(chat_id, grouped_id): {message_id: message}} — обработанные альбомы
+        self._timers = {}  # {(chat_id, grouped_id): asyncio.Task}
+
+    def __len__(self):
+        return len(self._albums)
+
+    def add(self, client, message, chat_id):
+        """
+        Добавляет часть альбома (повторная часть с тем же ID заменяет предыдущую, например после редактирования).
+
+        Часть уже обработанного альбома (правка) добавляется к его запомненным частям.
+
+        :param client: (TelegramClient) Клиент, получивший сообщение.
+        :param message: (Message) Часть альбома (с `grouped_id`).
+        :param chat_id: (int) Маркированный ID чата-источника.
+        :return: None
+        """
+        key = (chat_id, message.grouped_id)
+        if key not in self._albums:
+            self._albums[key] = (client, dict(self._recent.get(key) or self._processing.get(key) or {}))
+        parts = self._albums[key][1]
+        parts[message.id] = message
+        if key not in self._timers:
+            self._timers[key] = asyncio.create_task(self._flush_later(key))
+
+    async def _flush_later(self, key):
+        await asyncio.sleep(self.window)
+        self._timers.pop(key, None)
+        await self._flush(key)
+
+    async def _flush(self, key):
+        client, parts = self._albums.pop(key, (None, {}))
+        if not parts:
+            return
+        self._processing[key] = parts
+        try:
+            await self.process(client, [parts[message_id] for message_id in sorted(parts)], key[0])
+        except Exception as e:
+            logger.exception(f"❌ Ошибка обработки альбома {key[1]} чата {key[0]}: {e}")
+        finally:
+            self._processing.pop(key, None)
+            self._recent[key] = parts
+            self._recent.move_to_end(key)
+            if len(self._recent) > self.recent_size:
+                self._recent.popitem(last=False)
+
+    def pending_min_id(self, chat_id):
+        """
+        Возвращает наименьший ID части ещё не обработанного альбома чата.
+
+        :param chat_id: (int) Маркированный ID чата-источника.
+        :return: (int | None) ID или None, если необработанных альбомов в чате нет.
+        """
+        pending = [parts for (album_chat_id, _), (_, parts) in self._albums.items() if album_chat_id == chat_id]
+        pending += [parts for (album_chat_id, _), parts in self._processing.items() if album_chat_id == chat_id]
+        ids = [min(parts) for parts in pending if parts]
+        return min(ids) if ids else None
+
+    async def close(self):
+        """Обрабатывает накопленные альбомы при остановке отслеживания."""
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        for key in list(self._albums):
+            await self._flush(key)
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+
+from loguru import logger  # https://github.com/Delgan/loguru
+
+
+class DedupStore:
+    """
+    Ограниченное по памяти хранилище уже пересланных сообщений с временным окном (LRU + TTL).
+
+    Ключ — тройка (пользователь, чат, сообщение), поэтому сообщение, пересланное одному пользователю,
+    не подавляется для другого. Записи старше `ttl` секунд и самые старые записи сверх `max_size`
+    вытесняются. Состояние периодически сохраняется на диск и загружается при старте, поэтому
+    после перезапуска бота повторных пересылок не возникает.
+
+    - Счётчики `hits`, `misses`, `evictions` доступны через `stats()`.
+    - Файл записывается атомарно (через временный файл и `os.replace`).
+    - Автосохранение выполняется в фоновом потоке над снимком записей, поэтому `add` не блокирует цикл событий
+      (одновременно выполняется не более одной записи; добавления во время записи попадут в следующую).
+
+    :param path: (str) Путь к JSON-файлу для сохранения состояния.
+    :param max_size: (int) Максимальное количество хранимых ключей.
+    :param ttl: (int) Время жизни записи в секундах.
+    :param autosave_every: (int) Сохранять состояние на диск после каждых N добавлений.
+    """
+
+    def __init__(self, path, max_size=100_000, ttl=7 * 24 * 3600, autosave_every=200):
+        self.path = path
+        self.max_size = max_size
+        self.ttl = ttl
+        self.autosave_every = autosave_every
+        self._entries = OrderedDict()  # {ключ: время добавления}, от старых к новым
+        self._unsaved = 0
+        self._save_task = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.load()
+
+    @staticmethod
+    def make_key(user_id, chat_id, message_id):
+        return f"{user_id}:{chat_id}:{message_id}"
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _expire(self, now):
+        """Вытесняет записи, вышедшие за временное окно."""
+        border = now - self.ttl
+        while self._entries:
+            key, added_at = next(iter(self._entries.items()))
+            if added_at >= border:
+                break
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def contains(self, user_id, chat_id, message_id):
+        """
+        Проверяет, было ли сообщение уже переслано пользователю.
+
+        :param user_id: (int | str) Идентификатор пользователя Telegram.
+        :param chat_id: (int) Идентификатор чата-источника.
+        :param message_id: (int) Идентификатор сообщения.
+        :return: bool
+        """
+        self._expire(time.time())
+        if self.make_key(user_id, chat_id, message_id) in self._entries:
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def add(self, user_id, chat_id, message_id):
+        """
+        Отмечает сообщение как пересланное пользователю.
+
+        :param user_id: (int | str) Идентификатор пользователя Telegram.
+        :param chat_id: (int) Идентификатор чата-источника.
+        :param message_id: (int) Идентификатор сообщения.
+        :return: None
+        """
+        now = time.time()
+        key = self.make_key(user_id, chat_id, message_id)
+        self._entries[key] = now
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        self._expire(now)
+
+        self._unsaved += 1
+        if self._unsaved >= self.autosave_every:
+            self._schedule_save()
+
+    def _schedule_save(self):
+        """Запускает автосохранение в фоновом потоке (без цикла событий — сразу)."""
+        if self._save_task is not None and not self._save_task.done():
+            return  # Запись уже идёт; новые добавления сохранит следующая
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.save()
+            return
+        entries = list(self._entries.items())
+        self._unsaved = 0
+        self._save_task = loop.create_task(asyncio.to_thread(self._write, entries))
+
+    def stats(self):
+        """
+        Возвращает счётчики работы хранилища.
+
+        :return: dict с ключами size, hits, misses, evictions.
+        """
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+    def load(self):
+        """Загружает состояние с диска, отбрасывая устаревшие записи."""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Не удалось загрузить хранилище дубликатов {self.path}: {e}")
+            return
+
+        border = time.time() - self.ttl
+        for key, added_at in sorted(entries, key=lambda item: item[1])[-self.max_size:]:
+            if added_at >= border:
+                self._entries[key] = added_at
+        logger.info(f"📂 Загружено записей о пересланных сообщениях: {len(self._entries)}")
+
+    def save(self):
+        """Сохраняет состояние на диск."""
+        self._unsaved = 0
+        self._write(list(self._entries.items()))
+
+    async def flush(self):
+        """Дожидается фоновой записи и сохраняет текущее состояние в отдельном потоке (не блокируя цикл событий)."""
+        if self._save_task is not None:
+            await asyncio.gather(self._save_task, return_exceptions=True)
+        entries = list(self._entries.items())
+        self._unsaved = 0
+        self._save_task = asyncio.create_task(asyncio.to_thread(self._write, entries))
+        await self._save_task
+
+    def _write(self, entries):
+        """Атомарно записывает снимок записей в файл."""
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.error(f"❌ Не удалось сохранить хранилище дубликатов {self.path}: {e}")
+
+
+class TextHashStore:
+    """
+    Ограниченное по памяти хранилище хешей текста уже обработанных сообщений (LRU).
+
+    Позволяет не проверять сообщение повторно, если его текст не изменился: при редактировании (реакции,
+    исправление ссылки, изменение медиа) сообщение проверяется по ключевым словам заново, только если
+    изменился текст. Ключ включает пользователя, поэтому каждая сессия отслеживания видит сообщение один раз.
+
+    :param max_size: (int) Максимальное количество хранимых ключей.
+    """
+
+    def __init__(self, max_size=100_000):
+        self.max_size = max_size
+        self._hashes = OrderedDict()  # {(пользователь, чат, сообщение): hash(текст)}
+        self.unchanged = 0  # Повторных событий с тем же текстом
+
+    def __len__(self):
+        return len(self._hashes)
+
+    def changed(self, user_id, chat_id, message_id, text):
+        """
+        Запоминает хеш текста сообщения и сообщает, нужно ли его проверять.
+
+        :param user_id: (int | str) Идентификатор пользователя Telegram.
+        :param chat_id: (int) Идентификатор чата-источника.
+        :param message_id: (int) Идентификатор сообщения.
+        :param text: (str | None) Текст сообщения.
+        :return: (bool) True для нового сообщения или сообщения с изменённым текстом.
+        """
+        key = (str(user_id), chat_id, message_id)
+        text_hash = hash(text or "")
+        if self._hashes.get(key) == text_hash:
+            self.unchanged += 1
+            return False
+
+        self._hashes[key] = text_hash
+        self._hashes.move_to_end(key)
+        while len(self._hashes) > self.max_size:
+            self._hashes.popitem(last=False)
+        return True
+
+
+# 🧠 Хранилище пересланных сообщений (общее для всех сессий, ключ включает user_id)
+forwarded_store = DedupStore(path="data/forwarded_messages.json")
+seen_texts = TextHashStore()  # Хеши текста обработанных сообщений (новые и отредактированные)
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+from account_manager.keyword_query import QueryError, compile_query
+from account_manager.normalizer import normalize_keyword
+from database.database import get_user_settings
+
+# Форматы доставки найденных сообщений в целевую группу
+DELIVERY_FORWARD = "forward"  # Только пересылка оригинала (1 запрос)
+DELIVERY_CONTEXT = "context"  # Только сообщение с контекстом и фрагментом текста (1 запрос)
+DELIVERY_BOTH = "both"  # Сообщение с контекстом и пересылка оригинала (2 запроса)
+
+DELIVERY_FORMAT_LABELS = {
+    DELIVERY_FORWARD: "📨 Только пересылка",
+    DELIVERY_CONTEXT: "📝 Только контекст",
+    DELIVERY_BOTH: "📨 Пересылка и контекст",
+}
+
+def sends_context(delivery_format):
+    """Отправляется ли сообщение с контекстом (текстом) для формата доставки."""
+    return delivery_format != DELIVERY_FORWARD
+
+
+def forwards_original(delivery_format):
+    """Пересылается ли исходное сообщение для формата доставки."""
+    return delivery_format != DELIVERY_CONTEXT
+
+
+SNIPPET_RADIUS = 150  # Количество символов слева и справа от найденного ключевого слова
+
+
+def get_delivery_format(user_id):
+    """
+    Возвращает формат доставки найденных сообщений, выбранный пользователем.
+
+    :param user_id: (int | str) Идентификатор пользователя Telegram.
+    :return: (str) DELIVERY_FORWARD, DELIVERY_CONTEXT или DELIVERY_BOTH (по умолчанию).
+    """
+    delivery_format = get_user_settings(user_id=user_id).get("delivery_format")
+    return delivery_format if delivery_format in DELIVERY_FORMAT_LABELS else DELIVERY_BOTH
+
+
+def make_snippet(text, keywords, radius=SNIPPET_RADIUS):
+    """
+    Вырезает фрагмент текста вокруг первого найденного ключевого слова.
+
+    :param text: (str) Исходный текст сообщения.
+    :param keywords: (Iterable[str]) Найденные ключевые слова.
+    :param radius: (int) Количество символов слева и справа от ключевого слова.
+    :return: (str) Фрагмент текста, обрезанный по границам слов, с «…» на месте отброшенных частей.
+    """
+    if len(text) <= 2 * radius:
+        return text
+
+    lowered = text.lower().replace("ё", "е")
+    positions = []
+    for keyword in keywords:
+        try:
+            terms = compile_query(keyword).terms  # Для запроса ищем его слова и фразы
+        except QueryError:
+            terms = [keyword]
+        for term in terms:
+            term = term.strip('"*')
+            # Ключевое слово могло совпасть в другой форме — ищем также его основу
+            for needle in (term.lower().replace("ё", "е"), normalize_keyword(term)):
+                position = lowered.find(needle) if needle else -1
+                if position != -1:
+                    positions.append((position, len(needle)))
+                    break
+    position, length = min(positions) if positions else (0, 0)
+
+    start = max(0, position - radius)
+    end = min(len(text), position + length + radius)
+    # Не режем слова посередине
+    if start > 0:
+        space = text.find(" ", start, position)
+        start = space + 1 if space != -1 else start
+    if end < len(text):
+        space = text.rfind(" ", position + length, end)
+        end = space if space != -1 else end
+
+    return f"{'…' if start > 0 else ''}{text[start:end].strip()}{'…' if end < len(text) else ''}"
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+import asyncio
+
+from loguru import logger  # https://github.com/Delgan/loguru
+
+from database.database import get_user_settings
+
+DIGEST_DEFAULT_WINDOW = 300  # Окно накопления по умолчанию, секунд
+DIGEST_DEFAULT_SIZE = 20  # Количество совпадений, при котором дайджест отправляется досрочно
+DIGEST_MAX_TEXT = 4000  # Максимальная длина одного сообщения дайджеста (лимит Telegram — 4096)
+FORWARD_BATCH_LIMIT = 100  # Максимум сообщений в одном вызове forward_messages
+
+
+def get_digest_settings(user_id):
+    """
+    Возвращает параметры режима дайджеста пользователя.
+
+    :param user_id: (int | str) Идентификатор пользователя Telegram.
+    :return: (tuple) (включён ли дайджест, окно в секундах, размер пачки)
+    """
+    settings = get_user_settings(user_id=user_id)
+    enabled = settings.get("digest_enabled") == "1"
+    window = int(settings.get("digest_window") or DIGEST_DEFAULT_WINDOW)
+    size = int(settings.get("digest_size") or DIGEST_DEFAULT_SIZE)
+    return enabled, window, size
+
+
+def format_digest(items):
+    """
+    Формирует текст дайджеста по накопленным совпадениям.
+
+    Если текст не помещается в одно сообщение Telegram, он разбивается на несколько частей.
+
+    :param items: (list[dict]) Совпадения с ключами chat_title, link, keywords, snippet.
+    :return: (list[str]) Тексты сообщений дайджеста.
+    """
+    header = f"📰 **Дайджест совпадений: {len(items)}**\n\n"
+    parts = []
+    current = header
+    for number, item in enumerate(items, start=1):
+        entry = (
+            f"{number}. **{item['chat_title']}** — {', '.join(sorted(item['keywords']))}\n"
+            f"{item['link']}\n"
+            f"{item['snippet']}\n\n"
+        )
+        if len(current) + len(entry) > DIGEST_MAX_TEXT and current != header:
+            parts.append(current.rstrip())
+            current = ""
+        current += entry
+    if current.strip():
+        parts.append(current.rstrip())
+    return parts
+
+
+def group_message_ids(items):
+    """
+    Группирует ID сообщений по чатам-источникам пачками для `forward_messages`.
+
+    Для медиа-альбома пересылаются все его части (`message_ids`).
+
+    :param items: (list[dict]) Совпадения с ключами chat_id и message_ids.
+    :return: (list[tuple]) Пары (chat_id, [message_id, ...]) с не более чем FORWARD_BATCH_LIMIT ID в пачке.
+    """
+    by_chat = {}
+    for item in items:
+        by_chat.setdefault(item["chat_id"], []).extend(item["message_ids"])
+
+    batches = []
+    for chat_id, message_ids in by_chat.items():
+        for start in range(0, len(message_ids), FORWARD_BATCH_LIMIT):
+            batches.append((chat_id, message_ids[start:start + FORWARD_BATCH_LIMIT]))
+    return batches
+
+
+class DigestBuffer:
+    """
+    Накопитель совпадений для режима дайджеста.
+
+    Совпадения собираются в течение окна `window` секунд (отсчёт от первого совпадения) или до накопления
+    `max_items` штук, после чего передаются в `flush_callback` одной пачкой.
+
+    :param flush_callback: (coroutine function) Вызывается со списком накопленных совпадений.
+    :param window: (int) Окно накопления в секундах.
+    :param max_items: (int) Количество совпадений для досрочной отправки.
+    """
+
+    def __init__(self, flush_callback, window=DIGEST_DEFAULT_WINDOW, max_items=DIGEST_DEFAULT_SIZE):
+        self.flush_callback = flush_callback
+        self.window = window
+        self.max_items = max_items
+        self._items = []
+        self._timer = None  # Задача отложенной отправки
+        self._flush_task = None  # Задача досрочной отправки (при накоплении `max_items`)
+
+    def __len__(self):
+        return len(self._items)
+
+    def add(self, item):
+        """
+        Добавляет совпадение в дайджест.
+
+        :param item: (dict) Совпадение (chat_id, chat_title, message_ids, link, keywords, snippet).
+        :return: None
+        """
+        self._items.append(item)
+        if len(self._items) >= self.max_items and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.create_task(self.flush())
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.window)
+        self._timer = None
+        await self.flush()
+
+    async def flush(self):
+        """Отправляет накопленные совпадения (если они есть)."""
+        if self._timer is not None and self._timer is not asyncio.current_task():
+            self._timer.cancel()
+        self._timer = None
+
+        items, self._items = self._items, []
+        if not items:
+            return
+        try:
+            await self.flush_callback(items)
+        except Exception as e:
+            logger.exception(f"❌ Ошибка при отправке дайджеста: {e}")
+
+    async def close(self):
+        """Отправляет остаток дайджеста при остановке отслеживания."""
+        if self._flush_task is not None:
+            await self._flush_task
+            self._flush_task = None
+        await self.flush()
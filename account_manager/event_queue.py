@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import time
+from collections import deque
+
+from loguru import logger  # https://github.com/Delgan/loguru
+
+from core.config import event_workers, event_queue_size, event_overflow
+
+# Политики переполнения очереди событий
+OVERFLOW_DROP_OLDEST = "drop_oldest"  # Отбрасывается самое старое событие очереди
+OVERFLOW_COALESCE = "coalesce"  # Событие заменяет ожидающее событие того же сообщения; иначе — как drop_oldest
+OVERFLOW_BLOCK = "block"  # Обработчик события ждёт освобождения места (давление передаётся приёму событий)
+OVERFLOW_POLICIES = (OVERFLOW_DROP_OLDEST, OVERFLOW_COALESCE, OVERFLOW_BLOCK)
+
+
+class EventQueue:
+    """
+    Ограниченная очередь входящих сообщений отслеживаемых каналов с пулом воркеров.
+
+    Telethon запускает отдельную задачу на каждое событие без ограничения их количества: во время всплеска
+    (большие каналы публикуют альбомы) одновременно выполняются тысячи `process_message`. Обработчик события
+    только ставит сообщение в очередь, а обрабатывают их `workers` воркеров:
+
+    - порядок сообщений одного чата сохраняется: чат всегда обрабатывается одним и тем же воркером;
+    - ёмкость очереди ограничена `maxsize` (делится поровну между воркерами), поэтому расход памяти предсказуем;
+    - при переполнении применяется политика `overflow`:
+        - `drop_oldest` — отбрасывается самое старое ожидающее сообщение воркера;
+        - `coalesce` — сообщение заменяет ожидающее событие того же сообщения (chat_id, ID) на его месте в очереди,
+          а если такого нет — отбрасывается самое старое;
+        - `block` — `submit` ждёт освобождения места, и приём новых событий замедляется.
+
+    :param process: (coroutine function) Обработчик: `process(client, message, chat_id)`.
+    :param workers: (int) Количество воркеров.
+    :param maxsize: (int) Максимальное количество ожидающих сообщений (на все воркеры).
+    :param overflow: (str) Политика переполнения (см. `OVERFLOW_POLICIES`).
+    """
+
+    def __init__(self, process, workers=event_workers, maxsize=event_queue_size, overflow=event_overflow):
+        if overflow not in OVERFLOW_POLICIES:
+            logger.warning(f"⚠️ Неизвестная политика переполнения очереди событий: {overflow}, используется block")
+            overflow = OVERFLOW_BLOCK
+        self.process = process
+        self.workers = max(1, workers)
+        self.shard_size = max(1, maxsize // self.workers)
+        self.overflow = overflow
+        self._shards = [deque() for _ in range(self.workers)]  # Очереди воркеров: (ключ, время постановки, событие)
+        self._conditions = [asyncio.Condition() for _ in range(self.workers)]
+        self._tasks = []
+        self.processed = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.last_lag = 0.0  # Задержка последнего обработанного сообщения, сек
+
+    def start(self):
+        """Запускает воркеров."""
+        self._tasks = [asyncio.create_task(self._worker(index)) for index in range(self.workers)]
+
+    async def stop(self):
+        """Останавливает воркеров. Необработанные сообщения отбрасываются."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def qsize(self):
+        """Количество ожидающих обработки сообщений."""
+        return sum(len(shard) for shard in self._shards)
+
+    def lag(self):
+        """Сколько секунд ждёт обработки самое старое сообщение очереди."""
+        now = time.monotonic()
+        return max((now - shard[0][1] for shard in self._shards if shard), default=0.0)
+
+    def stats(self):
+        """Возвращает метрики очереди: queued, lag, last_lag, processed, dropped, coalesced."""
+        return {
+            "queued": self.qsize(),
+            "lag": round(self.lag(), 1),
+            "last_lag": round(self.last_lag, 1),
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+        }
+
+    async def submit(self, client, message, chat_id):
+        """
+        Ставит сообщение в очередь воркера, закреплённого за чатом.
+
+        :param client: (TelegramClient) Клиент, получивший сообщение.
+        :param message: (Message) Сообщение Telethon.
+        :param chat_id: (int) Маркированный ID чата-источника.
+        :return: None
+        """
+        index = hash(chat_id) % self.workers
+        shard, condition = self._shards[index], self._conditions[index]
+        key = (chat_id, message.id)
+        item = (key, time.monotonic(), (client, message, chat_id))
+
+        async with condition:
+            if self.overflow == OVERFLOW_COALESCE:
+                for position, (queued_key, queued_at, _) in enumerate(shard):
+                    if queued_key == key:
+                        shard[position] = (key, queued_at, item[2])  # Сохраняем место и время постановки
+                        self.coalesced += 1
+                        return
+
+            if len(shard) >= self.shard_size:
+                if self.overflow == OVERFLOW_BLOCK:
+                    await condition.wait_for(lambda: len(shard) < self.shard_size)
+                else:
+                    shard.popleft()
+                    self.dropped += 1
+                    if self.dropped % 100 == 1:
+                        logger.warning(f"⚠️ Очередь событий переполнена, отброшено сообщений: {self.dropped}")
+
+            shard.append(item)
+            condition.notify_all()
+
+    async def _worker(self, index):
+        shard, condition = self._shards[index], self._conditions[index]
+        while True:
+            async with condition:
+                await condition.wait_for(lambda: bool(shard))
+                _, queued_at, (client, message, chat_id) = shard.popleft()
+                condition.notify_all()  # Освободилось место для `submit` в режиме block
+
+            self.last_lag = time.monotonic() - queued_at
+            try:
+                await self.process(client, message, chat_id)
+            except Exception as e:
+                logger.exception(f"❌ Ошибка обработки сообщения чата {chat_id}: {e}")
+            self.processed += 1
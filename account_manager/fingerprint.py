@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import hashlib
+import re
+import time
+from collections import deque
+
+from loguru import logger  # https://github.com/Delgan/loguru
+from telethon import utils
+
+from account_manager.normalizer import normalize_text
+from core.config import duplicate_window, duplicate_distance, duplicate_min_words
+
+SIMHASH_BITS = 64
+WORD_RE = re.compile(r"\w+")
+URL_RE = re.compile(r"https?://\S+|t\.me/\S+")
+
+
+def _feature_hash(feature):
+    """Стабильный 64-битный хеш признака (встроенный `hash` строк меняется между запусками)."""
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def text_words(text):
+    """Разбивает нормализованный текст на слова без ссылок (ссылки в репостах обычно отличаются)."""
+    return WORD_RE.findall(normalize_text(URL_RE.sub(" ", text)))
+
+
+def simhash(words):
+    """
+    Вычисляет SimHash текста по словам и парам соседних слов.
+
+    Похожие тексты дают хеши, отличающиеся в небольшом количестве бит (расстояние Хэмминга).
+
+    :param words: (list[str]) Слова текста (`text_words`).
+    :return: (int) 64-битный отпечаток.
+    """
+    weights = [0] * SIMHASH_BITS
+    features = words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+    for feature in features:
+        feature_hash = _feature_hash(feature)
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if feature_hash >> bit & 1 else -1
+    return sum(1 << bit for bit in range(SIMHASH_BITS) if weights[bit] > 0)
+
+
+def message_origin(message, chat_id):
+    """
+    Возвращает ключ оригинала сообщения: для пересланного поста — исходный канал и ID поста, иначе — само сообщение.
+
+    :param message: (Message) Сообщение Telethon.
+    :param chat_id: (int) Маркированный ID чата-источника.
+    :return: tuple (маркированный ID канала, ID сообщения)
+    """
+    forward = getattr(message, "fwd_from", None)
+    if forward is not None and forward.from_id is not None and forward.channel_post:
+        return utils.get_peer_id(forward.from_id), forward.channel_post
+    return chat_id, message.id
+
+
+class DuplicateCluster:
+    """
+    Группа копий одного сообщения: первая копия переслана, остальные только подсчитываются.
+
+    :param origin: (tuple) Ключ оригинала (`message_origin`).
+    :param fingerprint: (int | None) SimHash текста (None для коротких текстов).
+    :param link: (str) Ссылка на пересланную копию.
+    :param targets: (list[int]) Целевые группы, куда переслана первая копия (туда же отправляется сводка).
+    """
+    __slots__ = ("origin", "fingerprint", "link", "targets", "created_at", "copies")
+
+    def __init__(self, origin, fingerprint, link, targets=()):
+        self.origin = origin
+        self.fingerprint = fingerprint
+        self.link = link
+        self.targets = list(targets)
+        self.created_at = time.monotonic()
+        self.copies = []  # Названия каналов, где найдены копии
+
+
+class NearDuplicateIndex:
+    """
+    Индекс недавно пересланных сообщений пользователя для подавления повторов из разных каналов.
+
+    Спам и новостные репосты за несколько минут появляются в десятках каналов, а хранилище `forwarded_store`
+    различает их по (чат, ID). Перед пересылкой сообщение сверяется с сообщениями, пересланными за последние
+    `window` секунд:
+
+    - точный повтор — пересланный пост (`fwd_from`) того же оригинала или сам оригинал уже пересланного репоста;
+    - почти повтор — текст, SimHash которого отличается не более чем на `max_distance` бит.
+
+    Повтор не пересылается, а учитывается в группе первой копии. Когда окно группы истекает, группы с копиями
+    передаются в `on_expire` — по ним отправляется одна сводка «найдено ещё в N каналах». Истёкшие группы
+    проверяются раз в `check_interval` секунд фоновой задачей (`start`), поэтому сводка не ждёт следующего
+    совпадения; при остановке (`close`) сводки отправляются по всем открытым группам.
+
+    Поиск почти повторов не перебирает весь индекс: отпечаток делится на `max_distance + 1` полос, и по принципу
+    Дирихле у отпечатков на расстоянии не больше `max_distance` хотя бы одна полоса совпадает.
+
+    :param window: (int) Окно поиска повторов, секунд.
+    :param max_distance: (int) Максимальное расстояние Хэмминга между отпечатками повторов.
+    :param min_words: (int) Тексты короче этого количества слов сравниваются только по оригиналу.
+    :param on_expire: (callable | None) Вызывается со списком истёкших групп, у которых были копии.
+    :param check_interval: (float) Период проверки истёкших групп, секунд.
+    """
+
+    def __init__(self, window=duplicate_window, max_distance=duplicate_distance, min_words=duplicate_min_words,
+                 on_expire=None, check_interval=60):
+        self.window = window
+        self.max_distance = max_distance
+        self.min_words = min_words
+        self.on_expire = on_expire
+        self.check_interval = min(check_interval, window)
+        self.bands = max_distance + 1
+        self.band_bits = SIMHASH_BITS // self.bands
+        self._clusters = deque()  # От старых к новым
+        self._by_origin = {}  # {ключ оригинала: DuplicateCluster}
+        self._by_band = {}  # {(номер полосы, значение): {DuplicateCluster: None}} — удаление за O(1)
+        self._task = None
+        self.suppressed = 0
+
+    def __len__(self):
+        return len(self._clusters)
+
+    def _band_keys(self, fingerprint):
+        mask = (1 << self.band_bits) - 1
+        return [(band, fingerprint >> (band * self.band_bits) & mask) for band in range(self.bands)]
+
+    def find(self, message, chat_id, text):
+        """
+        Ищет группу, копией которой является сообщение.
+
+        :param message: (Message) Сообщение Telethon.
+        :param chat_id: (int) Маркированный ID чата-источника.
+        :param text: (str) Текст сообщения.
+        :return: tuple (DuplicateCluster | None, ключ оригинала, отпечаток или None)
+        """
+        origin = message_origin(message, chat_id)
+        cluster = self._by_origin.get(origin)
+        if cluster is not None:
+            return cluster, origin, cluster.fingerprint
+
+        words = text_words(text)
+        if len(words) < self.min_words:
+            return None, origin, None
+
+        fingerprint = simhash(words)
+        for band_key in self._band_keys(fingerprint):
+            for candidate in self._by_band.get(band_key, ()):
+                if bin(candidate.fingerprint ^ fingerprint).count("1") <= self.max_distance:
+                    return candidate, origin, fingerprint
+        return None, origin, fingerprint
+
+    def add(self, origin, fingerprint, link, targets=()):
+        """
+        Регистрирует пересланное сообщение как первую копию новой группы.
+
+        :return: (DuplicateCluster) Новая группа.
+        """
+        cluster = DuplicateCluster(origin, fingerprint, link, targets)
+        self._clusters.append(cluster)
+        self._by_origin[origin] = cluster
+        if fingerprint is not None:
+            for band_key in self._band_keys(fingerprint):
+                self._by_band.setdefault(band_key, {})[cluster] = None
+        return cluster
+
+    def expire(self, force=False):
+        """
+        Удаляет группы, окно которых истекло.
+
+        :param force: (bool) Удалить все группы (при остановке отслеживания).
+        :return: (list[DuplicateCluster]) Удалённые группы, у которых были копии.
+        """
+        border = time.monotonic() - self.window
+        expired = []
+        while self._clusters and (force or self._clusters[0].created_at < border):
+            cluster = self._clusters.popleft()
+            self._by_origin.pop(cluster.origin, None)
+            if cluster.fingerprint is not None:
+                for band_key in self._band_keys(cluster.fingerprint):
+                    band = self._by_band.get(band_key)
+                    if band is not None:
+                        band.pop(cluster, None)
+                        if not band:
+                            del self._by_band[band_key]
+            if cluster.copies:
+                expired.append(cluster)
+        return expired
+
+    def flush_expired(self, force=False):
+        """
+        Удаляет истёкшие группы и передаёт группы с копиями в `on_expire`.
+
+        :param force: (bool) Удалить все группы (при остановке отслеживания).
+        :return: None
+        """
+        expired = self.expire(force=force)
+        if expired and self.on_expire is not None:
+            try:
+                self.on_expire(expired)
+            except Exception as e:
+                logger.exception(f"❌ Ошибка отправки сводок о копиях: {e}")
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.check_interval)
+            self.flush_expired()
+
+    def start(self):
+        """Запускает периодическую проверку истёкших групп."""
+        self._task = asyncio.create_task(self._flush_periodically())
+
+    async def close(self):
+        """Останавливает периодическую проверку и отправляет сводки по всем открытым группам."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self.flush_expired(force=True)
+
+
+def format_duplicate_summary(cluster):
+    """
+    Формирует сводку о копиях пересланного сообщения.
+
+    :param cluster: (DuplicateCluster) Группа с копиями.
+    :return: (str) Текст сообщения.
+    """
+    titles = sorted(set(cluster.copies))
+    shown = ", ".join(titles[:10]) + (f" и ещё {len(titles) - 10}" if len(titles) > 10 else "")
+    return (
+        f"🔁 **Сообщение найдено ещё в {len(cluster.copies)} каналах**\n\n"
+        f"**Ссылка на пересланное:** {cluster.link}\n"
+        f"**Каналы:** {shown}"
+    )
@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import time
+
+from loguru import logger  # https://github.com/Delgan/loguru
+from telethon.errors import FloodWaitError
+
+from core.config import forward_workers, forward_rate, forward_burst, forward_max_attempts
+from account_manager.peer_cache import peer_cache
+from database.database import PendingForward, save_pending_forwards
+
+
+class TokenBucket:
+    """
+    Ограничитель частоты «ведро с токенами».
+
+    :param rate: (float) Скорость пополнения — токенов в секунду.
+    :param capacity: (int) Ёмкость ведра (допустимый всплеск).
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def try_acquire(self):
+        """
+        Пытается забрать один токен.
+
+        :return: (float) 0, если токен получен, иначе — сколько секунд подождать до появления токена.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class ForwardingQueue:
+    """
+    Асинхронная очередь исходящих пересылок одного клиента Telethon с пулом воркеров.
+
+    Обработчик новых сообщений только ставит задачу в очередь и сразу возвращается, поэтому всплеск совпадений
+    не задерживает приём событий. Воркеры доставляют задачи в целевые группы:
+
+    - для каждой целевой группы действует свой лимит частоты (`TokenBucket`);
+    - при `FloodWaitError` приостанавливается только та группа, на которой он получен, на `e.seconds`;
+    - при прочих ошибках задача повторяется с экспоненциальной задержкой до `max_attempts` раз;
+    - задачи хранятся в таблице `PendingForward` до успешной доставки и восстанавливаются при следующем запуске;
+      новые задачи записываются в БД пачками в фоновом потоке, поэтому `enqueue` не блокирует цикл событий.
+
+    Отложенные задачи (лимит, FloodWait, повтор) не блокируют воркеры — они возвращаются в очередь по таймеру.
+
+    :param client: (TelegramClient) Клиент, от имени которого выполняется отправка.
+    :param user_id: (int | str) Идентификатор пользователя Telegram.
+    :param workers: (int) Количество воркеров.
+    :param rate: (float) Отправок в секунду на одну целевую группу.
+    :param burst: (int) Допустимый всплеск отправок на одну целевую группу.
+    :param max_attempts: (int) Максимум попыток доставки одной задачи.
+    :param base_backoff: (float) Начальная задержка повтора в секундах.
+    """
+
+    def __init__(self, client, user_id, workers=forward_workers, rate=forward_rate, burst=forward_burst,
+                 max_attempts=forward_max_attempts, base_backoff=2.0):
+        self.client = client
+        self.user_id = int(user_id)
+        self.workers = workers
+        self.rate = rate
+        self.burst = burst
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self._queue = asyncio.Queue()
+        self._buckets = {}  # {target_id: TokenBucket}
+        self._paused_until = {}  # {target_id: time.monotonic()}
+        self._deferred = set()  # Таймеры отложенных задач
+        self._unsaved = []  # Новые задачи, ещё не записанные в БД
+        self._persist_task = None
+        self._tasks = []
+        self.sent = 0
+        self.failed = 0
+        self.flood_waits = 0
+
+    async def start(self):
+        """Восстанавливает незавершённые задачи пользователя из БД и запускает воркеров."""
+        PendingForward.create_table(safe=True)
+        pending = list(
+            PendingForward.select().where(PendingForward.user_id == self.user_id).order_by(PendingForward.id)
+        )
+        for item in pending:
+            self._queue.put_nowait(item)
+        if pending:
+            logger.info(f"♻️ Восстановлено пересылок из очереди для user_id={self.user_id}: {len(pending)}")
+
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        """Останавливает воркеров. Недоставленные задачи остаются в БД до следующего запуска."""
+        for handle in self._deferred:
+            handle.cancel()
+        self._deferred.clear()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._persist_task is not None:
+            await self._persist_task  # Дописываем в БД задачи, поставленные перед остановкой
+
+    def enqueue(self, target_id, text=None, chat_id=None, message_ids=None):
+        """
+        Ставит пересылку в очередь. Запись в БД выполняется в фоне (`_persist`), вызов не блокируется.
+
+        :param target_id: (int) ID целевой группы.
+        :param text: (str | None) Текст сопроводительного сообщения.
+        :param chat_id: (int | None) ID чата-источника пересылаемых сообщений.
+        :param message_ids: (list[int] | None) ID пересылаемых сообщений.
+        :return: None
+        """
+        item = PendingForward(
+            user_id=self.user_id,
+            target_id=target_id,
+            chat_id=chat_id,
+            message_ids=",".join(str(message_id) for message_id in message_ids) if message_ids else None,
+            text=text,
+        )
+        self._unsaved.append(item)
+        if self._persist_task is None or self._persist_task.done():
+            self._persist_task = asyncio.create_task(self._persist())
+        self._queue.put_nowait(item)
+
+    async def _persist(self):
+        """Записывает новые задачи в БД пачками в фоновом потоке (пока они поступают)."""
+        while self._unsaved:
+            items, self._unsaved = self._unsaved, []
+            try:
+                await asyncio.to_thread(save_pending_forwards, items)
+            except Exception as e:
+                # Задачи остаются в памяти и будут доставлены, но не переживут перезапуск бота
+                logger.exception(f"❌ Не удалось сохранить очередь пересылок user_id={self.user_id} ({len(items)}): {e}")
+
+    def qsize(self):
+        """Количество задач в очереди, включая отложенные."""
+        return self._queue.qsize() + len(self._deferred)
+
+    def stats(self):
+        """Возвращает счётчики очереди: queued, sent, failed, flood_waits."""
+        return {"queued": self.qsize(), "sent": self.sent, "failed": self.failed, "flood_waits": self.flood_waits}
+
+    def _defer(self, item, delay):
+        """Возвращает задачу в очередь через `delay` секунд, не занимая воркер."""
+        loop = asyncio.get_running_loop()
+
+        def requeue():
+            self._deferred.discard(handle)
+            self._queue.put_nowait(item)
+
+        handle = loop.call_later(delay, requeue)
+        self._deferred.add(handle)
+
+    async def _resolve_source(self, chat_id):
+        """
+        Возвращает чат-источник для пересылки.
+
+        Канал может слушать другой аккаунт пользователя, и тогда аккаунт очереди не знает его по ID — в этом
+        случае канал ищется по username из общего кеша метаданных.
+        """
+        try:
+            return await self.client.get_input_entity(chat_id)
+        except ValueError:
+            peer = peer_cache.lookup(chat_id)
+            if peer is None or not peer.username:
+                raise
+            return await self.client.get_input_entity(peer.username)
+
+    async def _worker(self):
+        while True:
+            item = await self._queue.get()
+            try:
+                await self._deliver(item)
+            except Exception as e:
+                logger.exception(f"❌ Ошибка воркера пересылки user_id={self.user_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _deliver(self, item):
+        if item.id is None and self._persist_task is not None:
+            # Задача ещё записывается в БД — её запись обновляется и удаляется ниже
+            await asyncio.shield(self._persist_task)
+        target_id = item.target_id
+
+        pause = self._paused_until.get(target_id, 0) - time.monotonic()
+        if pause > 0:
+            self._defer(item, pause)
+            return
+
+        bucket = self._buckets.get(target_id)
+        if bucket is None:
+            bucket = self._buckets[target_id] = TokenBucket(self.rate, self.burst)
+        wait = bucket.try_acquire()
+        if wait > 0:
+            self._defer(item, wait)
+            return
+
+        try:
+            if item.text:
+                await self.client.send_message(target_id, item.text)
+                # Текст отправлен — при повторе после ошибки пересылки он не продублируется
+                item.text = None
+                if item.id is not None:
+                    item.save(only=[PendingForward.text])
+
+            if item.message_ids:
+                message_ids = [int(message_id) for message_id in item.message_ids.split(",")]
+                from_peer = await self._resolve_source(item.chat_id)
+                await self.client.forward_messages(target_id, message_ids, from_peer=from_peer)
+
+            if item.id is not None:
+                item.delete_instance()
+            self.sent += 1
+            logger.info(f"✅ Сообщение переслано в целевую группу (ID={target_id})")
+        except FloodWaitError as e:
+            self.flood_waits += 1
+            self._paused_until[target_id] = time.monotonic() + e.seconds
+            logger.warning(f"⚠️ FloodWait {e.seconds} сек. для целевой группы {target_id}, группа приостановлена")
+            self._defer(item, e.seconds)
+        except Exception as e:
+            item.attempts += 1
+            if item.attempts >= self.max_attempts:
+                self.failed += 1
+                if item.id is not None:
+                    item.delete_instance()
+                logger.exception(f"❌ Пересылка в {target_id} не выполнена после {item.attempts} попыток: {e}")
+                return
+            if item.id is not None:
+                item.save(only=[PendingForward.attempts])
+            delay = self.base_backoff * 2 ** (item.attempts - 1)
+            logger.warning(f"⚠️ Ошибка пересылки в {target_id} (попытка {item.attempts}), повтор через {delay} сек.: {e}")
+            self._defer(item, delay)
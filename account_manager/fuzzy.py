@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+from functools import lru_cache
+
+from account_manager.normalizer import WORD_RE
+
+MAX_FUZZY_DISTANCE = 2
+# Минимальная длина основы слова для допустимого расстояния: короткие слова с опечаткой совпадают со всем подряд
+MIN_FUZZY_LENGTH = {1: 4, 2: 7}
+
+
+@lru_cache(maxsize=100_000)
+def deletions(word, distance):
+    """
+    Все варианты слова, полученные удалением не более `distance` символов (включая само слово).
+
+    :param word: (str) Слово.
+    :param distance: (int) Максимальное количество удалений.
+    :return: (frozenset[str]) Варианты удаления.
+    """
+    variants = {word}
+    edge = {word}
+    for _ in range(distance):
+        edge = {variant[:index] + variant[index + 1:] for variant in edge for index in range(len(variant))}
+        variants |= edge
+    return frozenset(variants)
+
+
+def edit_distance(first, second, limit):
+    """
+    Расстояние Дамерау — Левенштейна (с перестановкой соседних символов) с отсечением по `limit`.
+
+    :param first: (str) Первое слово.
+    :param second: (str) Второе слово.
+    :param limit: (int) Расстояние, больше которого точное значение не нужно.
+    :return: (int) Расстояние или `limit + 1`, если оно больше `limit`.
+    """
+    if abs(len(first) - len(second)) > limit:
+        return limit + 1
+    before_previous, previous = None, list(range(len(second) + 1))
+    for i in range(1, len(first) + 1):
+        row = [i] + [0] * len(second)
+        for j in range(1, len(second) + 1):
+            cost = first[i - 1] != second[j - 1]
+            row[j] = min(previous[j] + 1, row[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and first[i - 1] == second[j - 2] and first[i - 2] == second[j - 1]:
+                row[j] = min(row[j], before_previous[j - 2] + 1)
+        if min(row) > limit:
+            return limit + 1
+        before_previous, previous = previous, row
+    return min(previous[-1], limit + 1)
+
+
+class FuzzyIndex:
+    """
+    Индекс нечёткого поиска слов с опечатками (симметричное удаление, SymSpell).
+
+    Для каждого нечёткого ключевого слова заранее (при построении индекса) сохраняются все варианты с удалением
+    до `distance` символов. Слова на расстоянии редактирования не больше d имеют общий вариант удаления, поэтому
+    для слова сообщения достаточно сгенерировать его варианты удаления и найти их в словаре, а затем проверить
+    кандидатов точным расстоянием. Стоимость проверки слова зависит только от его длины, а не от количества
+    ключевых слов.
+
+    Сравниваются целые слова: основы (`normalize_text`) и полные формы без стемминга — опечатка в окончании
+    («вакансиа») меняет основу, которую отрезает стеммер, а полная форма остаётся на расстоянии одной опечатки.
+
+    - Варианты удаления слов сообщений кешируются: одни и те же слова встречаются в тысячах сообщений.
+    - Слова, длина которых не может дать совпадение ни с одним ключевым словом, пропускаются без генерации.
+    """
+
+    def __init__(self):
+        self._variants = {}  # {вариант удаления: set(слово)}
+        self._words = {}  # {слово: list[(допустимое расстояние, значение)]}
+        self.max_distance = 0
+        self._min_length = None
+        self._max_length = 0
+
+    def __len__(self):
+        return len(self._words)
+
+    def add(self, words, distance, value):
+        """
+        Добавляет нечёткое слово.
+
+        :param words: (Iterable[str]) Формы слова: основа и полная форма без стемминга.
+        :param distance: (int) Допустимое расстояние редактирования (1 или 2).
+        :param value: Значение, возвращаемое при совпадении.
+        :return: None
+        """
+        for word in set(words):
+            self._words.setdefault(word, []).append((distance, value))
+            for variant in deletions(word, distance):
+                self._variants.setdefault(variant, set()).add(word)
+            self._min_length = len(word) if self._min_length is None else min(self._min_length, len(word))
+            self._max_length = max(self._max_length, len(word))
+        self.max_distance = max(self.max_distance, distance)
+
+    def _fits(self, word):
+        return self._min_length - self.max_distance <= len(word) <= self._max_length + self.max_distance
+
+    def lookup(self, *words):
+        """
+        Находит нечёткие слова на допустимом расстоянии от слова сообщения.
+
+        :param words: (str) Формы слова сообщения (основа и полная форма).
+        :return: list Значения совпавших слов (без повторов).
+        """
+        words = [word for word in set(words) if self._fits(word)] if self._words else []
+        candidates = set()
+        for word in words:
+            for variant in deletions(word, self.max_distance):
+                candidates |= self._variants.get(variant, set())
+
+        matches = []
+        for candidate in candidates:
+            values = self._words[candidate]
+            limit = max(distance for distance, _ in values)
+            found = min(edit_distance(word, candidate, limit) for word in words)
+            matches.extend(value for distance, value in values if found <= distance and value not in matches)
+        return matches
+
+    def iter_matches(self, text, full_text):
+        """
+        Перебирает совпадения нечётких слов со словами текста.
+
+        :param text: (str) Нормализованный текст (`normalize_text`).
+        :param full_text: (str) Тот же текст, нормализованный без стемминга (слова идут в том же порядке).
+        :return: Генератор пар (позиция начала слова в `text`, значение).
+        """
+        if not self._words:
+            return
+        for match, full_match in zip(WORD_RE.finditer(text), WORD_RE.finditer(full_text)):
+            for value in self.lookup(match.group(), full_match.group()):
+                yield match.start(), value
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+from collections import deque
+
+from account_manager.normalizer import at_word_end, at_word_start
+
+
+class KeywordMatcher:
+    """
+    Скомпилированный многошаблонный поиск ключевых слов (алгоритм Ахо — Корасик).
+
+    Автомат строится один раз по списку ключевых слов, после чего текст сообщения проверяется за один проход,
+    независимо от количества ключевых слов. Поиск регистронезависимый: шаблоны хранятся в нижнем регистре,
+    а текст должен быть приведён к нижнему регистру вызывающей стороной (один раз на сообщение).
+
+    - Пустые строки и дубликаты (без учёта регистра) отбрасываются при построении.
+    - Номер шаблона совпадает с индексом в `self.keywords`.
+
+    :param keywords: (iterable[str]) Ключевые слова или фразы пользователя.
+    """
+
+    def __init__(self, keywords):
+        self.keywords = []  # Исходные ключевые слова (как их ввёл пользователь)
+        self.patterns = []  # Шаблоны в нижнем регистре
+        self._goto = [{}]  # Переходы автомата: {символ: состояние}
+        self._fail = [0]  # Суффиксные ссылки
+        self._output = [()]  # Номера шаблонов, оканчивающихся в состоянии
+
+        seen = set()
+        for keyword in keywords:
+            pattern = (keyword or "").strip().lower()
+            if not pattern or pattern in seen:
+                continue
+            seen.add(pattern)
+            self._add_pattern(pattern, len(self.patterns))
+            self.keywords.append(keyword.strip())
+            self.patterns.append(pattern)
+
+        self._build_fail_links()
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def _add_pattern(self, pattern, index):
+        """Добавляет шаблон в бор (trie)."""
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+            state = next_state
+        self._output[state] = self._output[state] + (index,)
+
+    def _build_fail_links(self):
+        """Строит суффиксные ссылки обходом в ширину и объединяет выходы состояний."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def iter_matches(self, text):
+        """
+        Перебирает все вхождения шаблонов в тексте за один проход.
+
+        :param text: (str) Текст в нижнем регистре.
+        :return: Генератор пар (позиция конца совпадения, номер шаблона).
+        """
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for index in output[state]:
+                yield position, index
+
+    def contains_word(self, text):
+        """
+        Проверяет, содержит ли текст хотя бы одно ключевое слово целым словом (не частью другого слова).
+
+        :param text: (str) Текст в нижнем регистре.
+        :return: bool
+        """
+        for end, index in self.iter_matches(text):
+            if at_word_start(text, end - len(self.patterns[index]) + 1) and at_word_end(text, end + 1):
+                return True
+        return False
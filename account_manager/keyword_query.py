@@ -0,0 +1,329 @@
+# -*- coding: utf-8 -*-
+import bisect
+import re
+from functools import lru_cache
+
+from account_manager.fuzzy import FuzzyIndex, MAX_FUZZY_DISTANCE, MIN_FUZZY_LENGTH
+from account_manager.keyword_matcher import KeywordMatcher
+from account_manager.normalizer import WORD_RE, at_word_end, at_word_start, normalize_keyword, normalize_text
+from core.config import keyword_stemming
+
+# Лексемы запроса: фраза в кавычках, скобки, NEAR/n, слово (возможно, с * или ~ на конце)
+TOKEN_RE = re.compile(r'"([^"]*)"|(\()|(\))|NEAR/(\d+)|([^\s()"]+)')
+FUZZY_RE = re.compile(r"^(.+?)~(\d?)$")
+QUOTES = str.maketrans({"«": '"', "»": '"', "“": '"', "”": '"', "„": '"'})
+OPERATORS = ("AND", "OR", "NOT")
+MAX_NEAR = 50
+
+
+class QueryError(ValueError):
+    """Ошибка разбора запроса ключевого слова (сообщение показывается пользователю)."""
+
+
+class QueryAtom:
+    """
+    Элементарное условие запроса: слово, фраза, префикс или слово с опечатками, которые ищутся в нормализованном
+    тексте.
+
+    :param source: (str) Исходное слово или фраза (для фрагмента текста в уведомлении).
+    :param pattern: (str) Нормализованный шаблон (`normalize_keyword`).
+    :param prefix: (bool) Совпадение должно начинаться с начала слова (`слово*`).
+    :param fuzzy: (int) Допустимое количество опечаток в слове (`слово~n`), 0 — точное совпадение.
+    """
+    __slots__ = ("source", "pattern", "prefix", "fuzzy", "whole_word")
+
+    def __init__(self, source, pattern, prefix=False, fuzzy=0):
+        self.source = source
+        self.pattern = pattern
+        self.prefix = prefix
+        self.fuzzy = fuzzy
+        # Основа слова совпадает только с целыми словами текста, иначе «мам» (от «мама») находится в «мамонт»
+        self.whole_word = keyword_stemming and not prefix
+
+    @property
+    def fuzzy_forms(self):
+        """Формы нечёткого слова для `FuzzyIndex`: основа и полная форма без стемминга."""
+        return self.pattern, normalize_keyword(self.source, stemming=False)
+
+
+class MatchContext:
+    """
+    Совпадения атомов запроса в одном тексте.
+
+    :param text: (str) Нормализованный текст.
+    :param hits: (dict) {номер атома: list[int]} Позиции начала совпадений атома.
+    """
+
+    def __init__(self, text, hits):
+        self.text = text
+        self.hits = hits
+        self._word_starts = None
+
+    def word_at(self, position):
+        """Номер слова, которому принадлежит символ (позиции слов вычисляются один раз, только для NEAR)."""
+        if self._word_starts is None:
+            self._word_starts = [match.start() for match in WORD_RE.finditer(self.text)]
+        return bisect.bisect_right(self._word_starts, position) - 1
+
+
+class KeywordQuery:
+    """
+    Скомпилированный запрос ключевого слова.
+
+    Обычное ключевое слово («ремонт квартир») — один атом, который ищется как подстрока, как и раньше (при включённом
+    стемминге — как целые слова, см. `QueryAtom.whole_word`). Запросом
+    считается ключевое слово с операторами или специальными символами:
+
+    - `AND`, `OR`, `NOT` (заглавными буквами) и скобки; слова без оператора объединяются через AND;
+    - `"фраза целиком"` — слова подряд;
+    - `слово*` — слово, начинающееся с префикса;
+    - `слово~` или `слово~2` — слово с одной или двумя опечатками (ищется по индексу `FuzzyIndex`);
+    - `a NEAR/n b` — a и b не дальше n слов друг от друга.
+
+    Пример: `вакансия AND python NOT senior`.
+
+    Запрос разбирается один раз и компилируется в план: список атомов и вложенные замыкания, которые вычисляют
+    условие по найденным совпадениям атомов. Атомы всех запросов ищутся одним проходом автомата по тексту
+    (в общем индексе — вместе с ключевыми словами всех пользователей), план вычисляется только для запросов,
+    у которых найден хотя бы один атом. Запрос, которому удовлетворяет текст без совпадений (например, только
+    из NOT), отклоняется при разборе.
+
+    :param keyword: (str) Ключевое слово или запрос пользователя.
+    :raise QueryError: Если запрос составлен с ошибкой.
+    """
+
+    def __init__(self, keyword):
+        self.keyword = keyword.strip()
+        self.atoms = []
+        self.is_plain = not is_query(self.keyword)
+        self._matcher = None  # Собственный автомат атомов (только для `matches`)
+        self._pattern_atoms = []
+        self._fuzzy = None  # Собственный индекс нечётких атомов (только для `matches`)
+
+        if self.is_plain:
+            self._atom(self.keyword, normalize_keyword(self.keyword))
+            self._evaluate = lambda context: bool(context.hits)
+            return
+
+        self._tokens = _tokenize(self.keyword)
+        self._position = 0
+        self._evaluate = self._parse_or()
+        if self._position < len(self._tokens):
+            raise QueryError(f"неожиданное «{self._tokens[self._position][1]}»")
+        del self._tokens
+        if self._evaluate(MatchContext("", {})):
+            raise QueryError("запрос должен содержать хотя бы одно слово без NOT")
+
+    @property
+    def terms(self):
+        """Исходные слова и фразы запроса (для поиска фрагмента текста вокруг совпадения)."""
+        return [atom.source for atom in self.atoms]
+
+    def evaluate(self, context):
+        """
+        Вычисляет запрос по совпадениям его атомов.
+
+        :param context: (MatchContext) Совпадения атомов в тексте.
+        :return: bool
+        """
+        return self._evaluate(context)
+
+    def accepts(self, atom_index, text, start):
+        """
+        Проверяет ограничение атома на позицию совпадения: префикс — только с начала слова, основа слова
+        (при включённом стемминге) — только целое слово.
+        """
+        atom = self.atoms[atom_index]
+        if (atom.prefix or atom.whole_word) and not at_word_start(text, start):
+            return False
+        return not atom.whole_word or at_word_end(text, start + len(atom.pattern))
+
+    def matches(self, text):
+        """
+        Проверяет текст без общего индекса (например, при разовом поиске по истории группы).
+
+        :param text: (str) Исходный текст сообщения.
+        :return: bool
+        """
+        if self._matcher is None:
+            self._matcher = KeywordMatcher(atom.pattern for atom in self.atoms if not atom.fuzzy)
+            self._pattern_atoms = [
+                [index for index, atom in enumerate(self.atoms) if atom.pattern == pattern and not atom.fuzzy]
+                for pattern in self._matcher.patterns
+            ]
+            self._fuzzy = FuzzyIndex()
+            for index, atom in enumerate(self.atoms):
+                if atom.fuzzy:
+                    self._fuzzy.add(atom.fuzzy_forms, atom.fuzzy, index)
+        normalized = normalize_text(text)
+        hits = {}
+        for end, pattern_index in self._matcher.iter_matches(normalized):
+            start = end - len(self._matcher.patterns[pattern_index]) + 1
+            for atom_index in self._pattern_atoms[pattern_index]:
+                if self.accepts(atom_index, normalized, start):
+                    hits.setdefault(atom_index, []).append(start)
+        full_text = normalize_text(text, stemming=False) if len(self._fuzzy) else normalized
+        for start, atom_index in self._fuzzy.iter_matches(normalized, full_text):
+            hits.setdefault(atom_index, []).append(start)
+        return bool(hits) and self.evaluate(MatchContext(normalized, hits))
+
+    # --- Разбор запроса (рекурсивный спуск) ---
+
+    def _atom(self, source, pattern, prefix=False, fuzzy=0):
+        if not pattern:
+            raise QueryError(f"«{source}» не содержит букв или цифр")
+        self.atoms.append(QueryAtom(source, pattern, prefix, fuzzy))
+        return len(self.atoms) - 1
+
+    def _peek(self):
+        return self._tokens[self._position] if self._position < len(self._tokens) else (None, None)
+
+    def _take(self):
+        token = self._peek()
+        self._position += 1
+        return token
+
+    def _parse_or(self):
+        operands = [self._parse_and()]
+        while self._peek() == ("op", "OR"):
+            self._take()
+            operands.append(self._parse_and())
+        if len(operands) == 1:
+            return operands[0]
+        return lambda context: any(operand(context) for operand in operands)
+
+    def _parse_and(self):
+        operands = [self._parse_not()]
+        while True:
+            kind, value = self._peek()
+            if kind == "op" and value == "AND":
+                self._take()
+            elif kind is None or kind == ")" or (kind == "op" and value == "OR"):
+                break
+            operands.append(self._parse_not())  # Слова без оператора объединяются через AND
+        if len(operands) == 1:
+            return operands[0]
+        return lambda context: all(operand(context) for operand in operands)
+
+    def _parse_not(self):
+        if self._peek() == ("op", "NOT"):
+            self._take()
+            operand = self._parse_not()
+            return lambda context: not operand(context)
+        return self._parse_near()
+
+    def _parse_near(self):
+        kind, _ = self._peek()
+        if kind != "(":
+            left = self._parse_atom()
+            operand = self._atom_evaluator(left)
+            while self._peek()[0] == "near":
+                distance = self._take()[1]
+                right = self._parse_atom()
+                operand = self._near_evaluator(operand, left, right, distance)
+                left = right
+            return operand
+
+        self._take()
+        operand = self._parse_or()
+        if self._take()[0] != ")":
+            raise QueryError("не закрыта скобка")
+        if self._peek()[0] == "near":
+            raise QueryError("NEAR/n соединяет только слова и фразы")
+        return operand
+
+    def _parse_atom(self):
+        kind, value = self._take()
+        if kind == "phrase":
+            return self._atom(f'"{value}"', normalize_keyword(value))
+        if kind == "word":
+            fuzzy = FUZZY_RE.match(value)
+            if fuzzy:
+                return self._fuzzy_atom(fuzzy.group(1), int(fuzzy.group(2) or 1))
+            if value.endswith("*"):
+                prefix = value.rstrip("*")
+                # Стемминг только укорачивает слово, поэтому основа префикса остаётся префиксом
+                return self._atom(value, normalize_keyword(prefix), prefix=True)
+            return self._atom(value, normalize_keyword(value))
+        if kind is None:
+            raise QueryError("запрос обрывается после оператора")
+        raise QueryError(f"ожидалось слово вместо «{value}»")
+
+    def _fuzzy_atom(self, word, distance):
+        pattern = normalize_keyword(word)
+        if not 0 < distance <= MAX_FUZZY_DISTANCE:
+            raise QueryError(f"в «{word}~{distance}» допускается от 1 до {MAX_FUZZY_DISTANCE} опечаток")
+        if " " in pattern or not WORD_RE.fullmatch(pattern or " "):
+            raise QueryError(f"«{word}~» — опечатки ищутся только в отдельном слове")
+        if len(normalize_keyword(word, stemming=False)) < MIN_FUZZY_LENGTH[distance]:
+            raise QueryError(f"«{word}» слишком короткое для поиска с {distance} опечатками")
+        return self._atom(word, pattern, fuzzy=distance)
+
+    @staticmethod
+    def _atom_evaluator(atom_index):
+        return lambda context: atom_index in context.hits
+
+    @staticmethod
+    def _near_evaluator(operand, left, right, distance):
+        def near(context):
+            if not operand(context) or right not in context.hits:
+                return False
+            left_words = [context.word_at(position) for position in context.hits[left]]
+            return any(
+                abs(context.word_at(position) - word) <= distance
+                for position in context.hits[right] for word in left_words
+            )
+
+        return near
+
+
+def _tokenize(keyword):
+    """Разбивает запрос на лексемы: (вид, значение)."""
+    tokens = []
+    for phrase, opening, closing, distance, word in TOKEN_RE.findall(keyword.translate(QUOTES)):
+        if opening:
+            tokens.append(("(", "("))
+        elif closing:
+            tokens.append((")", ")"))
+        elif distance:
+            if not 0 < int(distance) <= MAX_NEAR:
+                raise QueryError(f"расстояние NEAR должно быть от 1 до {MAX_NEAR}")
+            tokens.append(("near", int(distance)))
+        elif word in OPERATORS:
+            tokens.append(("op", word))
+        elif word:
+            tokens.append(("word", word))
+        else:
+            tokens.append(("phrase", phrase))
+    return tokens
+
+
+def is_query(keyword):
+    """
+    Проверяет, является ли ключевое слово запросом (содержит операторы, кавычки, скобки, префикс* или слово~).
+
+    Операторы распознаются только заглавными буквами, поэтому обычные фразы с «and» или «or» не меняют смысла.
+
+    :param keyword: (str) Ключевое слово пользователя.
+    :return: bool
+    """
+    keyword = keyword.translate(QUOTES)
+    if '"' in keyword or "(" in keyword or ")" in keyword:
+        return True
+    return any(
+        word in OPERATORS or word.startswith("NEAR/") or (word.endswith("*") and len(word) > 1)
+        or FUZZY_RE.match(word)
+        for word in keyword.split()
+    )
+
+
+@lru_cache(maxsize=50_000)
+def compile_query(keyword):
+    """
+    Разбирает ключевое слово или запрос (результат кешируется: план строится один раз на запрос).
+
+    :param keyword: (str) Ключевое слово или запрос пользователя.
+    :return: (KeywordQuery) Скомпилированный запрос.
+    :raise QueryError: Если запрос составлен с ошибкой.
+    """
+    return KeywordQuery(keyword)
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+import asyncio
+from datetime import datetime
+
+from loguru import logger  # https://github.com/Delgan/loguru
+
+from core.config import keyword_stats_interval
+from database.database import save_keyword_hits
+
+
+class KeywordStats:
+    """
+    Общие для всего процесса счётчики срабатываний ключевых слов (таблица `KeywordHits`).
+
+    На пути обработки совпадения счётчик только увеличивается в словаре — без обращений к базе данных и без
+    ожидания. Накопленные приращения раз в `flush_interval` секунд сохраняются одной транзакцией (вставка или
+    увеличение счётчиков за день), поэтому частота записи не зависит от количества совпадений.
+
+    - Таймер записи запускается первым несохранённым совпадением; остаток сохраняется в `close`.
+    - При ошибке записи приращения возвращаются в счётчики и будут сохранены со следующей пачкой.
+
+    :param flush_interval: (float) Период сохранения в базу данных, секунд.
+    """
+
+    def __init__(self, flush_interval=keyword_stats_interval):
+        self.flush_interval = flush_interval
+        self._counts = {}  # {(user_id, ключевое слово, день): [совпадений, время последнего]}
+        self._timer = None
+        self.flushes = 0
+
+    def __len__(self):
+        return len(self._counts)
+
+    def record(self, user_id, keywords):
+        """
+        Учитывает совпадение сообщения с ключевыми словами пользователя.
+
+        :param user_id: (int | str) Идентификатор пользователя Telegram.
+        :param keywords: (Iterable[str]) Найденные ключевые слова.
+        :return: None
+        """
+        now = datetime.now()
+        day = now.date()
+        for keyword in keywords:
+            counter = self._counts.get((user_id, keyword, day))
+            if counter is None:
+                self._counts[(user_id, keyword, day)] = [1, now]
+            else:
+                counter[0] += 1
+                counter[1] = now
+        if self._timer is None or self._timer.done():
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_interval)
+        self.flush()
+
+    def flush(self):
+        """Сохраняет накопленные счётчики одной транзакцией."""
+        counts, self._counts = self._counts, {}
+        if not counts:
+            return
+        try:
+            save_keyword_hits(self._rows(counts))
+        except Exception as e:
+            self._requeue(counts, e)
+            return
+        self.flushes += 1
+
+    async def flush_in_thread(self):
+        """Сохраняет накопленные счётчики в отдельном потоке, не блокируя цикл событий (для обработчиков бота)."""
+        counts, self._counts = self._counts, {}
+        if not counts:
+            return
+        try:
+            await asyncio.to_thread(save_keyword_hits, self._rows(counts))
+        except Exception as e:
+            self._requeue(counts, e)
+            return
+        self.flushes += 1
+
+    @staticmethod
+    def _rows(counts):
+        return [
+            {"user_id": int(user_id), "keyword": keyword, "day": day, "hits": hits, "last_hit": last_hit}
+            for (user_id, keyword, day), (hits, last_hit) in counts.items()
+        ]
+
+    def _requeue(self, counts, error):
+        """Возвращает несохранённые приращения в счётчики."""
+        logger.warning(f"⚠️ Не удалось сохранить статистику ключевых слов ({len(counts)} записей): {error}")
+        for key, (hits, last_hit) in counts.items():
+            counter = self._counts.setdefault(key, [0, last_hit])
+            counter[0] += hits
+            counter[1] = max(counter[1], last_hit)
+
+    async def close(self):
+        """Останавливает отложенную запись и сохраняет остаток (при остановке бота)."""
+        if self._timer is not None:
+            self._timer.cancel()
+            await asyncio.gather(self._timer, return_exceptions=True)
+            self._timer = None
+        self.flush()
+
+
+# 📊 Счётчики срабатываний ключевых слов всех сессий процесса
+keyword_stats = KeywordStats()
@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import os
+import random
+
+from loguru import logger  # https://github.com/Delgan/loguru
+from telethon import TelegramClient, events
+from telethon.errors import FloodWaitError, UserAlreadyParticipantError
+from telethon.tl.functions.channels import JoinChannelRequest
+
+from account_manager.peer_cache import peer_cache
+from account_manager.sharding import assign_channels, list_session_files, normalize_channel
+from account_manager.subscription import get_subscribed_channels
+from core.config import pool_accounts
+from system.dispatcher import api_id, api_hash
+
+POOL_DIR = os.path.join("accounts", "free")  # Сессии аккаунтов бота, которые слушают каналы для всех пользователей
+POOL_USER_ID = 0  # Псевдо-пользователь, под которым распределение каналов пула хранится в `ChannelAssignment`
+
+
+class SharedListenerPool:
+    """
+    Общий пул аккаунтов бота (accounts/free/), который слушает публичные каналы сразу для многих пользователей.
+
+    Пул подписывается на объединение каналов всех подключённых к нему пользователей (каждый канал — одним
+    аккаунтом пула, распределение `assign_channels`) и передаёт каждое сообщение обработчикам всех пользователей,
+    отслеживающих этот канал. Вместо отдельного подключения и подписок на каждого пользователя процесс держит
+    несколько подключений пула, а пользователям не нужен собственный файл сессии.
+
+    - Аккаунты подключаются при первом обращении (`start`) и переподключаются, если соединение разорвано.
+    - Подписка на новые каналы идёт в фоне, по одной фоновой задаче на аккаунт; каналы, в которых аккаунт уже
+      состоит, начинают прослушиваться сразу.
+    - При отключении пользователя (`unsubscribe`) аккаунты пула остаются в каналах: сообщения канала без
+      подписчиков просто не передаются дальше.
+    - Каналы, для которых не хватило лимита аккаунтов пула, не отслеживаются (возвращаются из `subscribe`).
+    - Пул занимает только `size` сессий из папки (первые по имени, уже подключённые — в первую очередь);
+      остальные сессии accounts/free выдаются пользователям кнопкой «🔐 Подключить свободный аккаунт».
+    - Сообщение канала передаётся обработчикам пользователей по очереди: обработчик только ставит сообщение
+      в ограниченную очередь пользователя (`EventQueue`), поэтому её политика переполнения действует и здесь.
+
+    :param session_dir: (str) Папка с сессиями аккаунтов пула.
+    :param size: (int) Количество сессий папки, зарезервированных за пулом (0 — пул не используется).
+    """
+
+    def __init__(self, session_dir=POOL_DIR, size=pool_accounts):
+        self.session_dir = session_dir
+        self.size = size
+        self._clients = {}  # {имя файла сессии: TelegramClient}
+        self._subscribed = {}  # {имя файла сессии: {"@username": маркированный ID}}
+        self._pending = {}  # {имя файла сессии: set("@username")} — каналы, ожидающие подписки
+        self._join_tasks = {}  # {имя файла сессии: asyncio.Task}
+        self._chat_usernames = {}  # {маркированный ID: "@username"} — прослушиваемые каналы
+        self._user_channels = {}  # {user_id: set("@username")}
+        self._channel_users = {}  # {"@username": set(user_id)}
+        self._handlers = {}  # {user_id: coroutine function (client, message, chat_id)}
+        self._lock = asyncio.Lock()
+        self.events = 0  # Получено сообщений из каналов пула
+        self.deliveries = 0  # Передано обработчикам пользователей
+
+    def reserved_session_files(self):
+        """
+        Возвращает файлы сессий, зарезервированные за пулом: подключённые аккаунты пула и первые по имени
+        остальные сессии папки, всего не больше `size`.
+
+        :return: (list[str]) Полные пути к файлам сессий.
+        """
+        session_files = list_session_files(self.session_dir)
+        connected = [path for path in session_files if os.path.basename(path) in self._clients]
+        others = [path for path in session_files if os.path.basename(path) not in self._clients]
+        return connected + others[:max(0, self.size - len(connected))]
+
+    def is_available(self):
+        """Проверяет, есть ли у пула аккаунты (подключённые или зарезервированные файлы сессий)."""
+        return bool(self._clients) or bool(self.reserved_session_files())
+
+    def session_names(self):
+        """Возвращает имена сессий (без расширения), зарезервированных за пулом — они не выдаются пользователям."""
+        return {os.path.basename(path).replace(".session", "") for path in self.reserved_session_files()}
+
+    def stats(self):
+        """Возвращает счётчики: accounts, channels, users, events, deliveries."""
+        return {
+            "accounts": sum(1 for client in self._clients.values() if client.is_connected()),
+            "channels": len(self._chat_usernames),
+            "users": len(self._user_channels),
+            "events": self.events,
+            "deliveries": self.deliveries,
+        }
+
+    async def start(self):
+        """
+        Подключает аккаунты пула (при первом вызове) и переподключает отключившиеся.
+
+        :return: (bool) True, если подключён хотя бы один аккаунт пула.
+        """
+        async with self._lock:
+            for session_path in self.reserved_session_files():
+                session_name = os.path.basename(session_path)
+                client = self._clients.get(session_name)
+                if client is not None:
+                    if not client.is_connected():
+                        await client.connect()
+                    continue
+
+                client = TelegramClient(
+                    session_path.replace(".session", ""), api_id, api_hash, system_version="4.16.30-vxCUSTOM"
+                )
+                await client.connect()
+                if not await client.is_user_authorized():
+                    logger.error(f"⚠️ Сессия пула {session_name} недействительна — аккаунт пропущен")
+                    await client.disconnect()
+                    continue
+
+                self._clients[session_name] = client
+                self._subscribed[session_name], _ = await get_subscribed_channels(client=client)
+                self._pending[session_name] = set()
+                for event_type in (events.NewMessage, events.MessageEdited):
+                    client.add_event_handler(
+                        self._handle_new_message,
+                        event_type(func=lambda event: event.chat_id in self._chat_usernames)
+                    )
+                logger.info(f"🌐 Аккаунт пула {session_name} подключён, каналов: {len(self._subscribed[session_name])}")
+
+        return any(client.is_connected() for client in self._clients.values())
+
+    def delivery_client(self, user_id):
+        """
+        Возвращает аккаунт пула, через который пересылаются сообщения пользователя.
+
+        Пользователи распределяются между аккаунтами пула по user_id, чтобы лимиты отправки не приходились
+        на один аккаунт.
+
+        :param user_id: (int | str) Идентификатор пользователя Telegram.
+        :return: (TelegramClient | None) Клиент или None, если подключённых аккаунтов нет.
+        """
+        clients = [self._clients[name] for name in sorted(self._clients) if self._clients[name].is_connected()]
+        return clients[int(user_id) % len(clients)] if clients else None
+
+    async def wait_disconnected(self):
+        """Ожидает отключения любого из аккаунтов пула."""
+        await asyncio.wait(
+            [client.disconnected for client in self._clients.values()], return_when=asyncio.FIRST_COMPLETED
+        )
+
+    async def subscribe(self, user_id, channels, handler):
+        """
+        Подключает пользователя к пулу: его каналы добавляются в прослушивание, сообщения передаются в `handler`.
+
+        :param user_id: (int | str) Идентификатор пользователя Telegram.
+        :param channels: (Iterable[str]) Username отслеживаемых каналов пользователя.
+        :param handler: (coroutine function) Обработчик сообщения: `handler(client, message, chat_id)`.
+        :return: (list[str]) Каналы пользователя, для которых не хватило лимита аккаунтов пула.
+        """
+        user_id = str(user_id)
+        async with self._lock:
+            self._user_channels[user_id] = {normalize_channel(channel) for channel in channels if channel}
+            self._handlers[user_id] = handler
+            self._rebuild_routes()
+            unassigned = self._rebalance()
+        return sorted(set(unassigned) & self._user_channels[user_id])
+
+    def unsubscribe(self, user_id):
+        """
+        Отключает пользователя от пула (аккаунты пула остаются в каналах).
+
+        :param user_id: (int | str) Идентификатор пользователя Telegram.
+        :return: None
+        """
+        user_id = str(user_id)
+        self._user_channels.pop(user_id, None)
+        self._handlers.pop(user_id, None)
+        self._rebuild_routes()
+
+    def _rebuild_routes(self):
+        """Перестраивает индекс «канал → пользователи»."""
+        channel_users = {}
+        for user_id, channels in self._user_channels.items():
+            for channel in channels:
+                channel_users.setdefault(channel, set()).add(user_id)
+        self._channel_users = channel_users
+
+    def _rebalance(self):
+        """
+        Распределяет объединение каналов пользователей между аккаунтами пула и ставит недостающие подписки в очередь.
+
+        :return: (list[str]) Каналы, для которых не хватило лимита аккаунтов пула.
+        """
+        if not self._clients:
+            return sorted(self._channel_users)
+
+        assignment, unassigned = assign_channels(
+            user_id=POOL_USER_ID,
+            channels=self._channel_users,
+            accounts={session_name: set(subscribed) for session_name, subscribed in self._subscribed.items()}
+        )
+        for session_name, assigned in assignment.items():
+            subscribed = self._subscribed[session_name]
+            for channel in assigned:
+                if channel in subscribed:
+                    self._chat_usernames[subscribed[channel]] = channel
+                else:
+                    self._pending[session_name].add(channel)
+
+            join_task = self._join_tasks.get(session_name)
+            if self._pending[session_name] and (join_task is None or join_task.done()):
+                self._join_tasks[session_name] = asyncio.create_task(self._join_pending(session_name))
+
+        if unassigned:
+            logger.warning(f"⚠️ Общий пул: не хватает лимита аккаунтов для {len(unassigned)} каналов")
+        return unassigned
+
+    async def _join_pending(self, session_name):
+        """Фоновая подписка аккаунта пула на ожидающие каналы (с паузами от 1 до 10 секунд)."""
+        client = self._clients[session_name]
+        pending = self._pending[session_name]
+        while pending:
+            channel = pending.pop()
+            if channel not in self._channel_users:
+                continue  # Канал больше никто не отслеживает
+            try:
+                updates = await client(JoinChannelRequest(channel))
+                for chat in getattr(updates, "chats", []):
+                    peer_info = peer_cache.remember(chat)
+                    self._subscribed[session_name][channel] = peer_info.peer_id
+                    self._chat_usernames[peer_info.peer_id] = channel
+                logger.info(f"🌐 Аккаунт пула {session_name} подписался на {channel}")
+            except UserAlreadyParticipantError:
+                logger.info(f"ℹ️ Аккаунт пула {session_name} уже подписан на {channel}")
+            except FloodWaitError as e:
+                logger.warning(f"⚠️ FloodWait {e.seconds} сек. при подписке аккаунта пула на {channel}")
+                pending.add(channel)  # Повторим после ожидания
+                await asyncio.sleep(e.seconds)
+            except Exception as e:
+                logger.error(f"❌ Аккаунт пула {session_name} не смог подписаться на {channel}: {e}")
+            await asyncio.sleep(random.randint(1, 10))
+
+    async def _handle_new_message(self, event):
+        """
+        Передаёт новое или отредактированное сообщение канала обработчикам всех его пользователей.
+
+        Обработчик пользователя — постановка в его очередь входящих сообщений (`EventQueue.submit`), поэтому ожидание
+        короткое, а при политике `block` переполненная очередь замедляет приём событий, а не копит задачи.
+        """
+        self.events += 1
+        channel = self._chat_usernames.get(event.chat_id)
+        for user_id in list(self._channel_users.get(channel, ())):
+            handler = self._handlers.get(user_id)
+            if handler is None:
+                continue
+            try:
+                await handler(event.client, event.message, event.chat_id)
+                self.deliveries += 1
+            except Exception as e:
+                logger.exception(f"❌ Ошибка обработки сообщения пула для user_id={user_id}: {e}")
+
+    async def shutdown(self):
+        """Отключает аккаунты пула (при остановке бота)."""
+        for join_task in self._join_tasks.values():
+            join_task.cancel()
+        await asyncio.gather(*self._join_tasks.values(), return_exceptions=True)
+        for client in self._clients.values():
+            if client.is_connected():
+                await client.disconnect()
+        if self._clients:
+            logger.info(f"🛑 Аккаунты общего пула отключены: {len(self._clients)}")
+
+
+listener_pool = SharedListenerPool()
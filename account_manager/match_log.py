@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+import asyncio
+from datetime import datetime
+
+from loguru import logger  # https://github.com/Delgan/loguru
+
+from core.config import match_log_batch, match_log_interval
+from database.database import save_matches
+
+
+class MatchLogWriter:
+    """
+    Общая для всего процесса очередь записи журнала совпадений (таблица `MatchLog`).
+
+    Сотни сессий отслеживания находят совпадения одновременно, и отдельный INSERT на каждое совпадение — это
+    отдельная транзакция SQLite с синхронизацией журнала. Записи накапливаются в памяти и сохраняются одной
+    транзакцией, когда их набирается `batch_size` или через `flush_interval` секунд после первой несохранённой
+    записи — что наступит раньше.
+
+    - Таймер записи запускается первой несохранённой записью; остаток сохраняется в `close`.
+    - При ошибке записи пачка возвращается в очередь и будет сохранена со следующей (хранится не более
+      `batch_size * 50` записей).
+
+    :param batch_size: (int) Количество записей, при котором пачка сохраняется сразу.
+    :param flush_interval: (float) Максимальное время ожидания записи в журнал, секунд.
+    """
+
+    def __init__(self, batch_size=match_log_batch, flush_interval=match_log_interval):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._rows = []
+        self._timer = None
+        self.written = 0
+        self.flushes = 0
+
+    def __len__(self):
+        return len(self._rows)
+
+    def add(self, user_id, chat_id, chat_title, message_id, keywords, link, snippet):
+        """
+        Добавляет совпадение в очередь записи.
+
+        :param user_id: (int | str) Идентификатор пользователя Telegram.
+        :param chat_id: (int) Маркированный ID чата-источника.
+        :param chat_title: (str) Название чата-источника.
+        :param message_id: (int) ID сообщения.
+        :param keywords: (Iterable[str]) Найденные ключевые слова.
+        :param link: (str) Ссылка на сообщение.
+        :param snippet: (str) Фрагмент текста вокруг ключевого слова.
+        :return: None
+        """
+        self._rows.append({
+            "user_id": int(user_id),
+            "chat_id": chat_id,
+            "chat_title": chat_title,
+            "message_id": message_id,
+            "keywords": ", ".join(sorted(keywords)),
+            "link": link,
+            "snippet": snippet,
+            "matched_at": datetime.now(),
+        })
+        if len(self._rows) >= self.batch_size:
+            self.flush()
+        elif self._timer is None or self._timer.done():
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_interval)
+        self.flush()
+
+    def flush(self):
+        """Сохраняет накопленные записи одной транзакцией."""
+        rows, self._rows = self._rows, []
+        if not rows:
+            return
+        try:
+            save_matches(rows)
+        except Exception as e:
+            self._requeue(rows, e)
+            return
+        self.written += len(rows)
+        self.flushes += 1
+
+    async def flush_in_thread(self):
+        """Сохраняет накопленные записи в отдельном потоке, не блокируя цикл событий (для обработчиков бота)."""
+        rows, self._rows = self._rows, []
+        if not rows:
+            return
+        try:
+            await asyncio.to_thread(save_matches, rows)
+        except Exception as e:
+            self._requeue(rows, e)
+            return
+        self.written += len(rows)
+        self.flushes += 1
+
+    def _requeue(self, rows, error):
+        """Возвращает несохранённые записи в начало очереди."""
+        logger.warning(f"⚠️ Не удалось сохранить журнал совпадений ({len(rows)} записей): {error}")
+        self._rows = (rows + self._rows)[-self.batch_size * 50:]  # Память ограничена при долгом сбое
+
+    def stats(self):
+        """Возвращает счётчики: queued, written, flushes."""
+        return {"queued": len(self._rows), "written": self.written, "flushes": self.flushes}
+
+    async def close(self):
+        """Останавливает отложенную запись и сохраняет остаток (при остановке бота)."""
+        if self._timer is not None:
+            self._timer.cancel()
+            await asyncio.gather(self._timer, return_exceptions=True)
+            self._timer = None
+        self.flush()
+
+
+# 📜 Журнал совпадений всех сессий процесса
+match_log = MatchLogWriter()
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+import re
+from functools import lru_cache
+
+from core.config import keyword_stemming
+
+WORD_RE = re.compile(r"\w+")
+SPACES_RE = re.compile(r"\s+")
+CYRILLIC_RE = re.compile(r"[а-я]")
+
+# Латинские буквы, похожие на кириллические (после приведения к нижнему регистру)
+LATIN_TO_CYRILLIC = str.maketrans({
+    "a": "а", "b": "в", "c": "с", "e": "е", "h": "н", "k": "к", "m": "м", "o": "о", "p": "р", "t": "т",
+    "x": "х", "y": "у",
+})
+# Кириллические буквы, похожие на латинские
+CYRILLIC_TO_LATIN = str.maketrans({
+    "а": "a", "в": "b", "с": "c", "е": "e", "н": "h", "к": "k", "м": "m", "о": "o", "р": "p", "т": "t",
+    "х": "x", "у": "y", "і": "i", "ј": "j", "ѕ": "s", "ԁ": "d",
+})
+CYRILLIC_LOOKALIKES = set("авсенкмортхуіјѕԁ")
+LATIN_LOOKALIKES = set("abcehkmoptxy")
+
+# Окончания для облегчённого стемминга (от длинных к коротким); основа не короче MIN_STEM символов
+RUSSIAN_ENDINGS = sorted((
+    "иями", "ями", "ами", "ией", "иям", "иях", "ях", "ах", "ям", "ам", "ом", "ем", "ой", "ей", "ий", "ый", "ая",
+    "яя", "ое", "ее", "ые", "ие", "ых", "их", "ым", "им", "ую", "юю", "ого", "его", "ому", "ему", "ов", "ев",
+    "ью", "ия", "ья", "ии", "ть", "ла", "ло", "ли", "ют", "ут", "ет", "ит", "ат", "ят", "ешь", "ишь", "ем",
+    "а", "я", "о", "е", "у", "ю", "ы", "и", "ь", "й",
+), key=len, reverse=True)
+ENGLISH_ENDINGS = sorted(("ies", "es", "s", "ing", "ed", "ly", "'s"), key=len, reverse=True)
+MIN_STEM = 3
+
+
+def fold_homoglyphs(word):
+    """
+    Заменяет буквы-двойники другого алфавита в слове, где смешаны латиница и кириллица.
+
+    Смешанное слово приводится к кириллице, если в нём есть кириллическая буква без латинского двойника
+    («pабота» → «работа»), к латинице — если есть латинская буква без кириллического двойника, иначе — к алфавиту
+    большинства букв («сat» → «cat»). Слова в одном алфавите не меняются.
+
+    :param word: (str) Слово в нижнем регистре.
+    :return: (str) Слово в одном алфавите.
+    """
+    cyrillic = [char for char in word if "\u0400" <= char <= "\u04ff"]
+    latin = [char for char in word if "a" <= char <= "z"]
+    if not cyrillic or not latin:
+        return word
+    if any(char not in CYRILLIC_LOOKALIKES for char in cyrillic):
+        return word.translate(LATIN_TO_CYRILLIC)
+    if any(char not in LATIN_LOOKALIKES for char in latin) or len(latin) > len(cyrillic):
+        return word.translate(CYRILLIC_TO_LATIN)
+    return word.translate(LATIN_TO_CYRILLIC)
+
+
+@lru_cache(maxsize=100_000)
+def stem_word(word):
+    """
+    Облегчённый стемминг: отбрасывает типичное окончание русского или английского слова.
+
+    «работа», «работу», «работой» → «работ»; «jobs», «job» → «job». Слова короче MIN_STEM + 1 и числа не меняются.
+
+    :param word: (str) Слово в нижнем регистре, в одном алфавите.
+    :return: (str) Основа слова.
+    """
+    if len(word) <= MIN_STEM or word.isdigit():
+        return word
+    endings = RUSSIAN_ENDINGS if CYRILLIC_RE.search(word) else ENGLISH_ENDINGS
+    for ending in endings:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+            return word[:-len(ending)]
+    return word
+
+
+def _normalize_word(match, stemming):
+    word = fold_homoglyphs(match.group())
+    return stem_word(word) if stemming else word
+
+
+def at_word_start(text, start):
+    """Проверяет, что позиция `start` — начало слова в тексте."""
+    return start == 0 or not text[start - 1].isalnum()
+
+
+def at_word_end(text, end):
+    """Проверяет, что позиция `end` (не включая) — конец слова в тексте."""
+    return end >= len(text) or not text[end].isalnum()
+
+
+def normalize_text(text, stemming=keyword_stemming):
+    """
+    Нормализует текст для поиска ключевых слов (за один проход по тексту).
+
+    1. Приведение к нижнему регистру без учёта регистра (`casefold`), «ё» → «е».
+    2. Замена букв-двойников другого алфавита внутри слова.
+    3. Облегчённый стемминг каждого слова (если включён).
+    4. Сжатие пробельных символов до одного пробела.
+
+    Ключевые слова нормализуются той же функцией, поэтому «работа» находит «работу», «РАБОТЁ» — «работе»,
+    а «pабота» с латинской «p» — «работа». Основа слова короче самого слова, поэтому при стемминге шаблон должен
+    совпадать с целыми словами текста (`at_word_start`, `at_word_end`): иначе «мам» (от «мама») находится
+    в «мамонт».
+
+    :param text: (str) Исходный текст.
+    :param stemming: (bool) Применять стемминг.
+    :return: (str) Нормализованный текст.
+    """
+    text = text.casefold().replace("ё", "е")
+    text = WORD_RE.sub(lambda match: _normalize_word(match, stemming), text)
+    return SPACES_RE.sub(" ", text)
+
+
+@lru_cache(maxsize=50_000)
+def normalize_keyword(keyword, stemming=keyword_stemming):
+    """
+    Нормализует ключевое слово (результат кешируется: индекс перестраивается без повторной нормализации).
+
+    :param keyword: (str) Ключевое слово или фраза пользователя.
+    :param stemming: (bool) Применять стемминг.
+    :return: (str) Нормализованный шаблон для поиска.
+    """
+    return normalize_text(keyword.strip(), stemming=stemming).strip()
@@ -1,31 +1,57 @@
 # -*- coding: utf-8 -*-
 import asyncio
-from datetime import datetime
+import os
+from datetime import datetime, timedelta
 import random
 from aiogram.types import Message
 from loguru import logger  # https://github.com/Delgan/loguru
 from telethon import events
 from telethon.errors import (
-    FloodWaitError, UserAlreadyParticipantError, InviteRequestSentError, ChannelPrivateError
+    FloodWaitError, UserAlreadyParticipantError, InviteRequestSentError, ChannelPrivateError, ChannelsTooMuchError
 )
 from telethon.tl.functions.channels import GetFullChannelRequest, JoinChannelRequest
-from telethon.tl.types import Chat
 
+from account_manager.albums import AlbumBuffer
 from account_manager.auth import connect_client
-from account_manager.subscription import subscription_telegram
+from account_manager.dedup import forwarded_store, seen_texts
+from account_manager.event_queue import EventQueue
+from account_manager.fingerprint import NearDuplicateIndex, format_duplicate_summary
+from account_manager.delivery import (
+    DELIVERY_CONTEXT, DELIVERY_BOTH, get_delivery_format, make_snippet, sends_context, forwards_original
+)
+from account_manager.digest import DigestBuffer, get_digest_settings, format_digest, group_message_ids
+from account_manager.forwarding_queue import ForwardingQueue
+from account_manager.listener_pool import POOL_DIR, listener_pool
+from account_manager.keyword_stats import keyword_stats
+from account_manager.match_log import match_log
+from account_manager.peer_cache import peer_cache
+from account_manager.poller import ChannelPoller, get_poll_mode
+from account_manager.prefilter import message_filters, register_user_filter, unregister_user_filter
+from account_manager.routing import RoutingTable, build_routing_table
+from account_manager.resume import ChannelCursorTracker, UserNotifier, backfill_missed_messages
+from account_manager.sharding import assign_channels, list_session_files
+from account_manager.standby import StandbyMonitor, find_standby_session
+from account_manager.shared_index import shared_index, register_user_keywords, unregister_user
+from account_manager.subscription import subscription_telegram, get_subscribed_channels, resolve_peer_id
+from account_manager.supervisor import tracking_supervisor
+from core.config import refresh_group_metadata, group_refresh_age, channels_per_account, suppress_duplicates
 from database.database import (
-    create_groups_model, create_keywords_model, create_group_model, TelegramGroup, get_user_channel_usernames,
-    delete_group_by_username
+    create_groups_model, create_group_model, TelegramGroup, delete_group_by_username,
+    User, set_tracking_active, remove_tracking_active, get_active_trackings
 )
 from keyboards.user.keyboards import menu_launch_tracking_keyboard, connect_grup_keyboard_tech
 from locales.locales import get_text
 
-# 🧠 Простейший трекер сообщений (в памяти)
-forwarded_messages = set()
-
-# 🛑 Словарь активных клиентов и флагов остановки
+# 🛑 Словарь активных клиентов (жизненным циклом сессий управляет `tracking_supervisor`)
 active_clients = {}  # {user_id: client}
-stop_flags = {}  # {user_id: asyncio.Event}
+forwarding_queues = {}  # {user_id: ForwardingQueue}
+digest_buffers = {}  # {user_id: DigestBuffer} — только для пользователей с включённым дайджестом
+delivery_formats = {}  # {user_id: формат доставки} — см. account_manager.delivery
+channel_pollers = {}  # {user_id: list[ChannelPoller]} — опрос каналов без подписки, по одному на аккаунт
+event_queues = {}  # {user_id: EventQueue} — ограниченная очередь входящих сообщений
+album_buffers = {}  # {user_id: AlbumBuffer} — накопление частей медиа-альбомов
+duplicate_indexes = {}  # {user_id: NearDuplicateIndex} — недавно пересланные сообщения для подавления копий
+routing_tables = {}  # {user_id: RoutingTable} — маршруты «ключевое слово → целевые группы»
 
 
 async def join_target_group(client, user_id, message):
@@ -80,73 +106,83 @@ async def join_target_group(client, user_id, message):
 
     try:
         await subscription_telegram(client, target_username)  # Подписываемся на группу
-        # Получаем ID группы
-        entity = await client.get_entity(target_username)
-        return entity.telegram_id
+        # ID группы — через сессию этого клиента: кеш метаданных мог заполнить другой аккаунт
+        return await resolve_peer_id(client, target_username)
 
     except Exception as e:
         logger.exception(f"❌ Не удалось присоединиться к целевой группе {target_username}: {e}")
         return None
 
 
-async def process_message(client, message: Message, chat_id: int, user_id, target_group_id):
+async def process_message(client, message: Message, chat_id: int, user_id, target_group_id, album=None):
     """
     Обрабатывает входящее сообщение, проверяет его на совпадение с ключевыми словами и пересылает в целевую группу с
     контекстом при совпадении.
 
     Контекст включает название источника, ссылку на сообщение и сам текст.
-    Использует глобальный set `forwarded_messages` для предотвращения дубликатов.
-
-    - Сообщение пересылается только один раз (проверка по chat_id-message.id).
+    Формат доставки выбирается пользователем (`delivery_formats`):
+
+    - только пересылка оригинала;
+    - только сообщение с контекстом и фрагментом текста вокруг ключевого слова;
+    - сообщение с контекстом (полный текст) и пересылка оригинала.
+
+    Использует хранилище `forwarded_store` для предотвращения дубликатов.
+    Отправка выполняется асинхронно через очередь пользователя (`forwarding_queues`), поэтому обработчик
+    событий не ждёт ответа Telegram.
+
+    - Сообщение пересылается пользователю только один раз (проверка по user_id, chat_id и message.id).
+    - До поиска ключевых слов сообщение проходит фильтр пользователя (`message_filters`): минус-слова, длина,
+      отправители, боты, пересланные сообщения.
+    - Альбом (`album`) проверяется один раз по объединённому тексту всех частей и пересылается целиком.
+    - Копии уже пересланного сообщения из других каналов (репост того же поста или почти тот же текст)
+      не пересылаются, а учитываются в `duplicate_indexes`; по истечении окна отправляется одна сводка о копиях.
     - Ссылка формируется по разным правилам для супергрупп и обычных чатов.
-    - Ключевые слова загружаются динамически из базы данных пользователя.
+    - Целевые группы выбираются по найденным ключевым словам (`routing_tables`); без маршрутов — основная группа.
+    - Каждое пересылаемое совпадение записывается в журнал совпадений (`match_log`).
+    - Срабатывания ключевых слов учитываются в счётчиках `keyword_stats` (включая копии уже пересланных постов).
+    - Ключевые слова берутся из общего индекса (`shared_index`): сообщение канала сканируется один раз для всех
+      пользователей, отслеживающих этот канал, остальные сессии получают готовый результат.
 
     :param client: (TelegramClient) Активный клиент для отправки сообщений.
     :param message: (Message) Входящее сообщение для обработки.
     :param chat_id: (int) Идентификатор чата-источника.
     :param user_id: (int) Идентификатор пользователя, чьи ключевые слова используются.
-    :param target_group_id: (int) Идентификатор целевой группы для пересылки.
+    :param target_group_id: (int) Идентификатор основной целевой группы для пересылки.
+    :param album: (list[Message] | None) Все части медиа-альбома (`message` — первая из них).
     :return: None
-    :raises Exception: Логируется при ошибках отправки сообщения.
+    :raises Exception: Логируется при ошибках постановки в очередь.
     """
-    if not message.message:
+    parts = album or [message]
+    text = "\n".join(part.message for part in parts if part.message)
+    if not text:
         return
 
-    message_text = message.message.lower()
-    msg_key = f"{chat_id}-{message.id}"
-
-    if msg_key in forwarded_messages:
+    if any(forwarded_store.contains(user_id, chat_id, part.id) for part in parts):
         return
 
-    # Получаем ключевые слова из базы данных для данного пользователя
-    Keywords = create_keywords_model(user_id=user_id)
-
-    # Создаем таблицу, если она не существует
-    if not Keywords.table_exists():
-        Keywords.create_table()
-        logger.info(f"Создана таблица ключевых слов для пользователя {user_id}")
-        return  # Таблица только что создана, ключевых слов еще нет
-
-    keywords = [keyword.user_keyword for keyword in Keywords.select() if keyword.user_keyword]
-
-    # Если нет ключевых слов, выходим
-    if not keywords:
+    # Предварительный фильтр пользователя: заведомо ненужные сообщения отбрасываются до поиска ключевых слов
+    message_filter = message_filters.get(str(user_id))
+    if message_filter is not None and message_filter.rejects(message, text):
         return
 
-    # Приводим ключевые слова к нижнему регистру для поиска
-    keywords_lower = [keyword.lower() for keyword in keywords]
+    # Один проход по тексту сообщения для всех пользователей, результат берётся из общего индекса
+    matched_keywords = shared_index.match_for_user(user_id, chat_id, message.id, text)
 
-    # Используем ключевые слова из базы данных
-    if any(keyword in message_text for keyword in keywords_lower):
+    if matched_keywords:
         logger.info(f"📌 Найдено совпадение. Пересылаю сообщение ID={message.id}")
+        # Отмечаем сообщение до первого await: то же сообщение, полученное параллельно другим аккаунтом
+        # пользователя (резервным), будет отброшено проверкой выше
+        for part in parts:
+            forwarded_store.add(user_id, chat_id, part.id)
+        keyword_stats.record(user_id, matched_keywords)  # Счётчики в памяти, сохраняются пачками
         try:
-            # Получаем информацию о чате-источнике
+            # Получаем информацию о чате-источнике (из общего кеша метаданных)
             try:
-                chat_entity = await client.get_entity(chat_id)
-                chat_title = getattr(chat_entity, "title", None) or getattr(chat_entity, "username",
-                                                                            None) or "Неизвестно"
+                peer = await peer_cache.get(client, chat_id)
+                chat_title = peer.title or peer.username or "Неизвестно"
             except Exception as e:
                 logger.warning(f"Не удалось получить название чата: {e}")
+                peer = None
                 chat_title = "Неизвестно"
 
             # Формируем ссылку на сообщение
@@ -155,33 +191,200 @@ async def process_message(client, message: Message, chat_id: int, user_id, targe
                 # Удаляем префикс -100 и получаем чистый ID
                 clean_chat_id = str(chat_id)[4:]
                 message_link = f"https://t.me/c/{clean_chat_id}/{message.id}"
-            else:
+            elif peer is None:
+                message_link = "Ссылка недоступна"
+            elif peer.username:
                 # Для чатов с username (если есть)
-                try:
-                    chat_entity = await client.get_entity(chat_id)
-                    if chat_entity.username:
-                        message_link = f"https://t.me/{chat_entity.username}/{message.id}"
-                    else:
-                        message_link = "Ссылка недоступна (нет username)"
-                except Exception:
-                    message_link = "Ссылка недоступна"
-
-            # Формируем итоговое сообщение с контекстом
-            context_text = (
-                f"📥 **Новое сообщение**\n\n"
-                f"**Источник:** {chat_title}\n"
-                f"**Ссылка:** {message_link}\n\n"
-                f"**Текст сообщения:**\n{message.message}"
+                message_link = f"https://t.me/{peer.username}/{message.id}"
+            else:
+                message_link = "Ссылка недоступна (нет username)"
+
+            routing_table = routing_tables.get(str(user_id)) or RoutingTable(target_group_id)
+            targets = routing_table.targets_for(matched_keywords)
+
+            duplicates = duplicate_indexes.get(str(user_id))
+            if duplicates is not None:
+                duplicates.flush_expired()  # Истёкшие группы не должны поглощать новые сообщения
+                cluster, origin, fingerprint = duplicates.find(message, chat_id, text)
+                if cluster is not None:
+                    # Копия уже пересланного сообщения: только учитываем канал для сводки
+                    cluster.copies.append(chat_title)
+                    duplicates.suppressed += 1
+                    logger.info(f"🔁 Сообщение ID={message.id} из {chat_title} — копия уже пересланного, пропускаю")
+                    return
+                duplicates.add(origin, fingerprint, message_link, targets)
+
+            # Журнал совпадений (записывается пачками, см. `match_log`)
+            match_log.add(
+                user_id=user_id,
+                chat_id=chat_id,
+                chat_title=chat_title,
+                message_id=message.id,
+                keywords=matched_keywords,
+                link=message_link,
+                snippet=make_snippet(text, matched_keywords)
             )
 
-            # Отправляем в целевую группу
-            await client.send_message(target_group_id, context_text)
-            await client.forward_messages(target_group_id, message)
-            logger.info(f"✅ Сообщение переслано в целевую группу (ID={target_group_id})")
-
-            forwarded_messages.add(msg_key)
+            digest = digest_buffers.get(str(user_id))
+            if digest is not None:
+                # Режим дайджеста: совпадение накапливается и будет отправлено одной пачкой
+                digest.add({
+                    "chat_id": chat_id,
+                    "chat_title": chat_title,
+                    "message_ids": [part.id for part in parts],
+                    "link": message_link,
+                    "keywords": matched_keywords,
+                    "snippet": make_snippet(text, matched_keywords, radius=100),
+                    "targets": targets,
+                })
+                logger.info(f"📰 Сообщение добавлено в дайджест (в накопителе: {len(digest)})")
+            else:
+                delivery_format = delivery_formats.get(str(user_id), DELIVERY_BOTH)
+
+                # Формируем итоговое сообщение с контекстом
+                context_text = None
+                if delivery_format == DELIVERY_BOTH:
+                    context_text = (
+                        f"📥 **Новое сообщение**\n\n"
+                        f"**Источник:** {chat_title}\n"
+                        f"**Ссылка:** {message_link}\n\n"
+                        f"**Текст сообщения:**\n{text}"
+                    )
+                elif delivery_format == DELIVERY_CONTEXT:
+                    context_text = (
+                        f"📥 **Новое сообщение**\n\n"
+                        f"**Источник:** {chat_title}\n"
+                        f"**Ссылка:** {message_link}\n"
+                        f"**Ключевые слова:** {', '.join(sorted(matched_keywords))}\n\n"
+                        f"{make_snippet(text, matched_keywords)}"
+                    )
+
+                # Ставим отправку в очередь (доставка выполняется воркерами с учётом лимитов и FloodWait)
+                for target_id in targets:
+                    forwarding_queues[str(user_id)].enqueue(
+                        target_id=target_id,
+                        text=context_text,
+                        chat_id=chat_id,
+                        message_ids=[part.id for part in parts] if forwards_original(delivery_format) else None
+                    )
+                logger.info(f"📤 Сообщение поставлено в очередь на пересылку (ID={', '.join(map(str, targets))})")
         except Exception as e:
-            logger.exception(f"❌ Ошибка при отправке сообщения с контекстом: {e}")
+            logger.exception(f"❌ Ошибка при постановке сообщения в очередь: {e}")
+
+
+async def process_incoming_message(client, message: Message, chat_id: int, user_id, target_group_id):
+    """
+    Принимает новое или отредактированное сообщение отслеживаемого канала и передаёт его в `process_message`.
+
+    - Сообщение проверяется, только если оно новое или его текст изменился (`seen_texts`): повторные события
+      и правки без изменения текста пропускаются, а ключевое слово, добавленное правкой, будет найдено.
+      Уже пересланное сообщение повторно не пересылается (`forwarded_store`).
+    - Части медиа-альбома накапливаются в `album_buffers` и проверяются одним вызовом после получения всех частей;
+      отредактированная часть уже обработанного альбома проверяется заново вместе с остальными частями.
+
+    :param client: (TelegramClient) Клиент, получивший сообщение.
+    :param message: (Message) Новое или отредактированное сообщение.
+    :param chat_id: (int) Идентификатор чата-источника.
+    :param user_id: (int | str) Идентификатор пользователя, чьи ключевые слова используются.
+    :param target_group_id: (int) Идентификатор целевой группы для пересылки.
+    :return: None
+    """
+    if not seen_texts.changed(user_id, chat_id, message.id, message.message):
+        return
+
+    album_buffer = album_buffers.get(str(user_id))
+    if message.grouped_id and album_buffer is not None:
+        album_buffer.add(client, message, chat_id)
+        return
+
+    await process_message(
+        client=client,
+        message=message,
+        chat_id=chat_id,
+        user_id=str(user_id),
+        target_group_id=target_group_id
+    )
+
+
+def enqueue_duplicate_summaries(user_id, clusters):
+    """
+    Ставит в очередь пересылок сводки о копиях пересланных сообщений (одно сообщение на группу копий)
+    в те целевые группы, куда была переслана первая копия.
+
+    :param user_id: (int | str) Идентификатор пользователя Telegram.
+    :param clusters: (list[DuplicateCluster]) Группы с истёкшим окном, у которых были копии.
+    :return: None
+    """
+    forwarding_queue = forwarding_queues.get(str(user_id))
+    if forwarding_queue is None:
+        logger.warning(f"⚠️ Нет очереди пересылок для user_id={user_id}, сводки о копиях не отправлены")
+        return
+    for cluster in clusters:
+        for target_id in cluster.targets:
+            forwarding_queue.enqueue(target_id=target_id, text=format_duplicate_summary(cluster))
+
+
+def start_message_buffers(user_id, target_group_id):
+    """
+    Создаёт накопитель медиа-альбомов пользователя (собранный альбом проверяется и пересылается целиком),
+    загружает фильтр сообщений пользователя и, если включено подавление копий (`suppress_duplicates`),
+    индекс недавно пересланных сообщений.
+
+    :param user_id: (int | str) Идентификатор пользователя Telegram.
+    :param target_group_id: (int) Идентификатор целевой группы для пересылки.
+    :return: None
+    """
+    register_user_filter(user_id=user_id)
+    if suppress_duplicates:
+        duplicates = NearDuplicateIndex(on_expire=lambda clusters: enqueue_duplicate_summaries(user_id, clusters))
+        duplicates.start()
+        duplicate_indexes[str(user_id)] = duplicates
+    album_buffers[str(user_id)] = AlbumBuffer(
+        process=lambda client, parts, chat_id: process_message(
+            client=client,
+            message=parts[0],
+            chat_id=chat_id,
+            user_id=str(user_id),
+            target_group_id=target_group_id,
+            album=parts
+        )
+    )
+
+
+async def send_digest(user_id, target_group_id, items):
+    """
+    Отправляет накопленный дайджест совпадений в целевые группы пользователя.
+
+    Совпадения группируются по целевым группам маршрутов: каждая группа получает свой дайджест одним (или
+    несколькими, если не помещается) сообщением со ссылками, а исходные сообщения (все части альбомов)
+    пересылаются пачками по чатам-источникам — один вызов `forward_messages` на чат. Формат доставки
+    пользователя (`delivery_formats`) учитывается так же, как при обычной пересылке: «только пересылка» —
+    без текста дайджеста, «только контекст» — без пересылки оригиналов.
+
+    :param user_id: (int | str) Идентификатор пользователя Telegram.
+    :param target_group_id: (int) Идентификатор основной целевой группы.
+    :param items: (list[dict]) Накопленные совпадения.
+    :return: None
+    """
+    forwarding_queue = forwarding_queues.get(str(user_id))
+    if forwarding_queue is None:
+        logger.error(f"❌ Нет очереди пересылок для user_id={user_id}, дайджест не отправлен")
+        return
+
+    delivery_format = delivery_formats.get(str(user_id), DELIVERY_BOTH)
+    items_by_target = {}
+    for item in items:
+        for target_id in item.get("targets") or [target_group_id]:
+            items_by_target.setdefault(target_id, []).append(item)
+
+    for target_id, target_items in items_by_target.items():
+        if sends_context(delivery_format):
+            for text in format_digest(target_items):
+                forwarding_queue.enqueue(target_id=target_id, text=text)
+        if forwards_original(delivery_format):
+            for chat_id, message_ids in group_message_ids(target_items):
+                forwarding_queue.enqueue(target_id=target_id, chat_id=chat_id, message_ids=message_ids)
+        logger.info(f"📰 Дайджест из {len(target_items)} совпадений поставлен в очередь (ID={target_id})")
 
 
 def determine_telegram_chat_type(entity):
@@ -204,121 +407,129 @@ def determine_telegram_chat_type(entity):
         return 'Обычный чат (группа старого типа)'
 
 
-async def get_grup_accaunt(client, message):
+async def get_grup_accaunt(client, entities, max_age=group_refresh_age):
     """
-    Собирает и обновляет данные о группах и каналах из аккаунта пользователя.
+    Обновляет данные о группах и каналах аккаунта пользователя в общей базе (`TelegramGroup`).
 
-    Проходит по всем диалогам, фильтрует супергруппы и каналы, получает полную информацию
-    (участники, описание, ссылка), определяет тип чата и сохраняет/обновляет запись в базе данных.
+    Запускается фоновой задачей после начала прослушивания и не влияет на скорость запуска отслеживания.
+    Сущности берутся из списка диалогов (`get_subscribed_channels`), поэтому `get_entity` не вызывается.
+    Для каждой супергруппы/канала запрашивается полная информация (участники, описание), определяется тип
+    чата и запись сохраняется/обновляется в базе данных.
 
-    Пропускает личные чаты и обычные группы без username.
-    Добавлена защита от ошибок и ограничений Telegram API.
+    - Записи, обновлённые менее `max_age` часов назад, пропускаются (без запроса GetFullChannelRequest).
+    - Между запросами выдерживается пауза 1 секунда для защиты от ограничений Telegram API.
 
     :param client: (TelegramClient) Активный клиент Telethon.
-    :param message: (Message) Объект сообщения для логирования и контекста.
+    :param entities: (list[Channel]) Супергруппы и каналы из списка диалогов.
+    :param max_age: (int) Через сколько часов запись считается устаревшей.
     :return: None
     """
-    subscribed_usernames = set()
+    fresh_since = datetime.now() - timedelta(hours=max_age)
+    refreshed = 0
 
-    try:
-        async for dialog in client.iter_dialogs():
-            try:
-                entity = await client.get_entity(dialog.telegram_id)
-
-                # Пропускаем личные чаты
-                if isinstance(entity, Chat):
-                    logger.debug(f"💬 Пропущен личный чат: {dialog.telegram_id}")
-                    continue
-
-                # Проверяем, является ли супергруппой или каналом
-                if not getattr(entity, 'megagroup', False) and not getattr(entity, 'broadcast', False):
-                    continue
-
-                if entity.username:
-                    subscribed_usernames.add(f"@{entity.username.lower()}")
-
-                # Получаем полную информацию
-                full_entity = await client(GetFullChannelRequest(channel=entity))
-                participants_count = full_entity.full_chat.participants_count or 0
-                actual_username = f"@{entity.username}" if entity.username else ""
-                link = f"https://t.me/{entity.username}" if entity.username else None
-                title = entity.title or "Без названия"
-                description = full_entity.full_chat.about or ""
-                new_group_type = determine_telegram_chat_type(entity)
-
-                logger.info(
-                    f"👥 {participants_count} | 📝 {title} | Тип: {new_group_type} | 🔗 {link} | 💬 {description}")
-
-                TelegramGroup.insert(
-                    group_hash=entity.access_hash,
-                    name=title,
-                    username=actual_username,
-                    description=description,
-                    participants=participants_count,
-                    group_type=new_group_type,
-                    link=link or "",
-                    date_added=datetime.now()
-                ).on_conflict(
-                    conflict_target=[TelegramGroup.group_hash],
-                    update={
-                        TelegramGroup.name: title,
-                        TelegramGroup.username: actual_username,
-                        TelegramGroup.description: description,
-                        TelegramGroup.participants: participants_count,
-                        TelegramGroup.group_type: new_group_type,
-                        TelegramGroup.link: link or "",
-                    }
-                ).execute()
-
-                logger.debug(f"🔄 Обновлена группа: {title}")
-
-                await asyncio.sleep(1)
-            except TypeError as te:
-                logger.warning(f"❌ TypeError при обработке диалога {dialog.telegram_id}: {te}")
-                continue
-            except Exception as e:
-                logger.exception(f"⚠️ Ошибка при обработке диалога {dialog.telegram_id}: {e}")
+    for entity in entities:
+        try:
+            is_fresh = TelegramGroup.select().where(
+                (TelegramGroup.group_hash == str(entity.access_hash)) & (TelegramGroup.date_added >= fresh_since)
+            ).exists()
+            if is_fresh:
                 continue
-    except Exception as error:
-        logger.exception(f"🔥 Критическая ошибка в forming_a_list_of_groups: {error}")
 
-    return subscribed_usernames
+            # Получаем полную информацию
+            full_entity = await client(GetFullChannelRequest(channel=entity))
+            participants_count = full_entity.full_chat.participants_count or 0
+            actual_username = f"@{entity.username}" if entity.username else ""
+            link = f"https://t.me/{entity.username}" if entity.username else None
+            title = entity.title or "Без названия"
+            description = full_entity.full_chat.about or ""
+            new_group_type = determine_telegram_chat_type(entity)
+
+            logger.info(
+                f"👥 {participants_count} | 📝 {title} | Тип: {new_group_type} | 🔗 {link} | 💬 {description}")
+
+            TelegramGroup.insert(
+                group_hash=entity.access_hash,
+                name=title,
+                username=actual_username,
+                description=description,
+                participants=participants_count,
+                group_type=new_group_type,
+                link=link or "",
+                date_added=datetime.now()
+            ).on_conflict(
+                conflict_target=[TelegramGroup.group_hash],
+                update={
+                    TelegramGroup.name: title,
+                    TelegramGroup.username: actual_username,
+                    TelegramGroup.description: description,
+                    TelegramGroup.participants: participants_count,
+                    TelegramGroup.group_type: new_group_type,
+                    TelegramGroup.link: link or "",
+                    TelegramGroup.date_added: datetime.now(),
+                }
+            ).execute()
+
+            refreshed += 1
+            logger.debug(f"🔄 Обновлена группа: {title}")
+
+            await asyncio.sleep(1)
+        except FloodWaitError as e:
+            logger.warning(f"⚠️ FloodWait {e.seconds} сек. при обновлении данных групп, обновление прервано")
+            break
+        except Exception as e:
+            logger.exception(f"⚠️ Ошибка при обработке канала {entity.id}: {e}")
+            continue
+
+    logger.info(f"🔄 Обновление данных групп завершено: обновлено {refreshed} из {len(entities)}")
 
 
-async def join_required_channels(client, user_id, message):
+async def join_required_channels(client, user_id, message, channels, already_subscribed, on_joined=None,
+                                 on_failed=None):
     """
     Подписывает аккаунт Telegram на все отслеживаемые каналы и группы пользователя из базы данных.
 
-    Получает список username из персональной таблицы пользователя и пытается присоединиться к каждому. При успехе
+    Получает список username каналов, закреплённых за аккаунтом, и пытается присоединиться к каждому. При успехе
     уведомляет пользователя. Невалидные ссылки удаляются из базы данных.
 
     - Между подписками добавляется задержка в диапазоне от 1 до 10 секунд для избежания Flood.
     - Использует модель `create_groups_model` для доступа к данным.
+    - Запускается в фоне во время прослушивания: после каждой успешной подписки маркированный ID канала
+      передаётся в `on_joined`, и канал сразу начинает прослушиваться.
+    - Каналы сверх лимита и каналы, подписка на которые не удалась (заявка на вступление, лимит каналов аккаунта),
+      передаются в `on_failed` — например, для отслеживания опросом без подписки.
 
     :param client: (TelegramClient) Активный клиент для выполнения запросов.
     :param user_id: (int) Идентификатор пользователя, чьи каналы нужно подключить.
     :param message: (Message) Объект сообщения aiogram для отправки уведомлений.
+    :param channels: (set[str]) Username ("@username") каналов, закреплённых за аккаунтом.
+    :param already_subscribed: (set[str]) Username ("@username") каналов, где аккаунт уже состоит.
+    :param on_joined: (callable | None) Вызывается с маркированным ID канала после подписки.
+    :param on_failed: (callable | None) Вызывается с username канала, на который подписаться не удалось.
     :return: None
     """
-    db_channels, total_count = get_user_channel_usernames(user_id=user_id)  # Получаем все username из базы данных
-    already_subscribed = await get_grup_accaunt(client, message)  # Получаем список каналов, где аккаунт уже состоит
+    db_channels, total_count = set(channels), len(channels)  # Каналы, закреплённые за аккаунтом
 
     logger.info(f"📊 Всего каналов для подписки: {total_count}, уже подписан на: {len(already_subscribed)}")
     if total_count == 0:
-        await message.answer("📭 У вас нет добавленных каналов для отслеживания.")
         return
 
-    if len(list(db_channels - already_subscribed)) > 500:
+    to_join = list(db_channels - already_subscribed)
+    if len(to_join) > channels_per_account:
         await message.answer(
-            f"⚠️ Найдено {len(list(db_channels - already_subscribed))} каналов. "
-            f"Подписка будет выполнена только на первые {500}."
+            f"⚠️ Найдено {len(to_join)} каналов. "
+            f"Подписка будет выполнена только на первые {channels_per_account}."
         )
+        if on_failed is not None:
+            for channel in to_join[channels_per_account:]:
+                on_failed(channel)
 
-    for channel in list(db_channels - already_subscribed)[:500]:  # Ограничиваем до 500 записей
+    # Ограничиваем лимитом каналов на аккаунт (распределение `assign_channels` его не превышает)
+    for channel in to_join[:channels_per_account]:
         random_delay = random.choice([1, 2, 3, 4, 5, 6, 7, 8, 9, 10])
         try:
             logger.warning(f"🔗 Подписка на {channel}")
-            await client(JoinChannelRequest(channel))
+            updates = await client(JoinChannelRequest(channel))
+            notify_joined(updates, on_joined)
             await message.answer(
                 f"✅ Подписка на {channel} выполнена\n"
                 f"⏳ Следующая попытка через {random_delay} сек."
@@ -331,9 +542,16 @@ async def join_required_channels(client, user_id, message):
         except FloodWaitError as e:
             logger.error(f"⚠️ FloodWait {e.seconds} сек.")
             await asyncio.sleep(e.seconds)
-            await client(JoinChannelRequest(channel))
+            updates = await client(JoinChannelRequest(channel))
+            notify_joined(updates, on_joined)
         except InviteRequestSentError:
             logger.error(f"✉️ Приглашение уже отправлено: {channel}")
+            if on_failed is not None:
+                on_failed(channel)
+        except ChannelsTooMuchError:
+            logger.error(f"⚠️ Аккаунт состоит в максимальном количестве каналов, {channel} пропущен")
+            if on_failed is not None:
+                on_failed(channel)
         except ValueError:
             logger.error(f"❌ Невалидный username: {channel}")
             delete_group_by_username(user_id, channel)  # Удаляем невалидный канал / группу
@@ -341,6 +559,20 @@ async def join_required_channels(client, user_id, message):
             logger.exception(f"❌ Ошибка при подписке на {channel}: {e}")
 
 
+def notify_joined(updates, on_joined):
+    """
+    Передаёт маркированные ID чатов из ответа на JoinChannelRequest в `on_joined` и сохраняет их в общем кеше.
+
+    :param updates: (Updates) Ответ Telegram на подписку.
+    :param on_joined: (callable | None) Вызывается с маркированным ID каждого чата.
+    :return: None
+    """
+    for chat in getattr(updates, "chats", []):
+        peer_info = peer_cache.remember(chat)
+        if on_joined is not None:
+            on_joined(peer_info.peer_id)
+
+
 async def ensure_joined_target_group(client, message, user_id: int):
     """
     Обеспечивает подключение клиента Telethon к целевой группе пользователя.
@@ -380,7 +612,7 @@ async def get_user_channels_or_notify(user_id: int, user, message, client):
     :param user_id: (int) ID пользователя Telegram.
     :param user: Объект пользователя (с полем `language`).
     :param message: Aiogram Message для отправки ответа.
-    :param client: Telethon клиент (будет отключён в случае ошибки).
+    :param client: Telethon клиент (будет отключён в случае ошибки) или None для общего пула аккаунтов.
     :return: list[str] | None: Список username каналов или None, если список пуст.
     """
     Groups = create_groups_model(user_id=user_id)
@@ -393,7 +625,8 @@ async def get_user_channels_or_notify(user_id: int, user, message, client):
 
     if not channels:
         logger.warning("⚠️ Список каналов пуст. Добавьте группы в базу данных.")
-        await client.disconnect()
+        if client is not None:
+            await client.disconnect()
         await message.answer(
             get_text(user.language, "tracking_launch_error"),
             reply_markup=menu_launch_tracking_keyboard()
@@ -403,37 +636,78 @@ async def get_user_channels_or_notify(user_id: int, user, message, client):
     return channels
 
 
+def add_tracking_handler(client, chat_ids, event_queue, on_event=None):
+    """
+    Регистрирует у клиента обработчик новых сообщений отслеживаемых каналов.
+
+    Фильтр проверяет принадлежность чата живому множеству маркированных ID `chat_ids`: каналы, на которые
+    аккаунт подписывается в фоне, добавляются в это множество и сразу начинают прослушиваться.
+    Обработчик только ставит сообщение в очередь `event_queue`; проверка ключевых слов и пересылка выполняются
+    её воркерами. Отредактированные сообщения (`events.MessageEdited`) ставятся в ту же очередь.
+
+    :param client: (TelegramClient) Клиент аккаунта, который слушает каналы.
+    :param chat_ids: (set[int]) Маркированные ID прослушиваемых каналов.
+    :param event_queue: (EventQueue) Очередь входящих сообщений пользователя.
+    :param on_event: (callable | None) Вызывается при каждом событии (отметка для `StandbyMonitor`).
+    :return: None
+    """
+
+    @client.on(events.NewMessage(func=lambda event: event.chat_id in chat_ids))
+    @client.on(events.MessageEdited(func=lambda event: event.chat_id in chat_ids))
+    async def handle_new_message(event: events.NewMessage.Event):
+        if on_event is not None:
+            on_event()
+        await event_queue.submit(client, event.message, event.chat_id)
+
+
 async def filter_messages(message, user_id, user, session_path):
     """
     Основная функция запуска процесса отслеживания сообщений в Telegram.
 
     Инициализирует клиент Telethon с помощью сессии пользователя, подключается
-    к целевой группе (для пересылки) и к отслеживаемым каналам, затем начинает
-    слушать новые сообщения. При совпадении с ключевыми словами — пересылает
-    сообщение с контекстом.
-
-    Работает до принудительной остановки (stop_tracking).
-
-    - Использует event-based обработку через `client.on(events.NewMessage)`.
-    - Состояние отслеживания хранится в памяти (`forwarded_messages`).
+    к целевой группе (для пересылки) и сразу начинает слушать новые сообщения в каналах,
+    где аккаунт уже состоит. Подписка на остальные каналы идёт в фоне, и каждый канал
+    добавляется в прослушивание сразу после подписки. При совпадении с ключевыми словами —
+    пересылает сообщение с контекстом.
+
+    Работает до принудительной остановки (stop_tracking) или до отключения клиента. Запускается
+    в фоновой задаче `tracking_supervisor`: остановка — это отмена задачи, поэтому прерывается любое
+    ожидание, включая подписку на каналы.
+
+    - Использует event-based обработку через `client.on(events.NewMessage)`; события ставятся в ограниченную
+      очередь `EventQueue`, которую обрабатывает пул воркеров с сохранением порядка внутри чата.
+    - Пересланные сообщения учитываются в `forwarded_store` (сохраняется на диск при остановке).
     - После остановки клиент корректно отключается.
+    - Позиция последнего обработанного сообщения каждого канала сохраняется (`ChannelCursorTracker`); при запуске
+      сообщения, пропущенные с момента прошлой сессии, догружаются и проходят обычную обработку.
+    - Если клиент отключился сам, выбрасывается ConnectionError — супервизор перезапустит сессию.
+    - Если у пользователя несколько файлов сессий, каналы распределяются между аккаунтами (`assign_channels`),
+      каждый аккаунт подписывается на свои каналы и слушает их. Все совпадения обрабатываются общим
+      `process_message`, а пересылка выполняется очередью основного аккаунта (`session_path`).
+    - Если подключён резервный аккаунт (accounts/{user_id}/standby/), он слушает каналы основного аккаунта
+      параллельно; дубли отбрасываются `forwarded_store`, а `StandbyMonitor` переключает пересылку на резервный
+      аккаунт, если основной перестал получать обновления.
+    - Каналы, на которые аккаунт не может подписаться (лимит каналов, заявка на вступление, нет места ни у одного
+      аккаунта), отслеживаются без подписки опросом истории (`ChannelPoller`). В режиме опроса (`get_poll_mode`)
+      так отслеживаются все каналы, на которые аккаунт ещё не подписан, а подписка выполняется только для каналов
+      с высокой частотой публикаций.
 
     :param message: (Message) Объект сообщения aiogram для взаимодействия с пользователем.
     :param user_id: (int) Идентификатор пользователя Telegram.
     :param user: (User) Модель пользователя из базы данных (для языка и данных).
-    :param session_path: (str) Полный путь к файлу сессии (.session) для авторизации.
+    :param session_path: (str) Полный путь к файлу сессии (.session) основного аккаунта; остальные сессии
+                         берутся из той же папки.
     :return: None
-    :raises Exception: Логируется при ошибках инициализации или подключения.
+    :raises Exception: Логируется и пробрасывается супервизору для перезапуска сессии.
     """
     # user_id = str(user_id)  # <-- ✅ преобразуем в строку
     logger.info(f"🚀 Запуск бота для user_id={str(user_id)}...")
     logger.info(f"📂 Найден файл сессии: {session_path}")
     # Telethon ожидает session_name без расширения
 
-    # ✅ Создаём флаг остановки для этого пользователя
-    stop_event = asyncio.Event()
-    stop_flags[str(user_id)] = stop_event
-
+    cursor_tracker = None
+    background_tasks = []  # Фоновая подписка на каналы и обновление данных групп
+    extra_clients = []  # Дополнительные аккаунты пользователя
     try:
 
         # Проверка на наличие подключенного аккаунта у пользователя для избежания ошибки
@@ -444,6 +718,10 @@ async def filter_messages(message, user_id, user, session_path):
             message=message
         )  # <-- ✅ подключаемся к клиенту Telethon
 
+        # Сессия недействительна — пользователь уже уведомлён, перезапуск не поможет
+        if client is None:
+            return
+
         # ✅ Сохраняем активный клиент
         active_clients[str(user_id)] = client
 
@@ -454,14 +732,29 @@ async def filter_messages(message, user_id, user, session_path):
         if not target_group_id:
             return
 
-        # === Подключаемся к обязательным каналам ===
-        await join_required_channels(client=client, user_id=str(user_id), message=message)
+        # === Маршруты «ключевое слово → целевые группы» (аккаунт подписывается на группы маршрутов заранее) ===
+        routing_tables[str(user_id)] = await build_routing_table(
+            client=client, user_id=user_id, default_target=target_group_id
+        )
 
-        # ✅ Проверяем, не была ли установлена остановка во время подписки
-        if stop_event.is_set():
-            logger.info("🛑 Остановка до начала прослушивания сообщений.")
-            await message.answer("🛑 Отслеживание остановлено.")
-            return
+        # === Запускаем очередь исходящих пересылок (восстанавливает недоставленные после перезапуска) ===
+        forwarding_queue = ForwardingQueue(client=client, user_id=user_id)
+        await forwarding_queue.start()
+        forwarding_queues[str(user_id)] = forwarding_queue
+
+        # === Формат доставки найденных сообщений ===
+        delivery_formats[str(user_id)] = get_delivery_format(user_id=user_id)
+        logger.info(f"📨 Формат доставки: {delivery_formats[str(user_id)]}")
+
+        # === Режим дайджеста (если включён пользователем) ===
+        digest_enabled, digest_window, digest_size = get_digest_settings(user_id=user_id)
+        if digest_enabled:
+            digest_buffers[str(user_id)] = DigestBuffer(
+                flush_callback=lambda items: send_digest(user_id, target_group_id, items),
+                window=digest_window,
+                max_items=digest_size
+            )
+            logger.info(f"📰 Режим дайджеста: окно {digest_window} сек., до {digest_size} совпадений")
 
         # === Загружаем список каналов из базы ===
         channels = await get_user_channels_or_notify(user_id=int(user_id), user=user, message=message, client=client)
@@ -470,18 +763,169 @@ async def filter_messages(message, user_id, user, session_path):
         if not channels:
             return
 
-        # === Обработка новых сообщений ===
-        @client.on(events.NewMessage(chats=channels))
-        async def handle_new_message(event: events.NewMessage.Event):
-            # Обрабатывает входящее сообщение, проверяет его на совпадение с ключевыми словами и пересылает в целевую
-            # группу с контекстом при совпадении.
-            await process_message(
-                client=client,  # <-- ✅ передаем клиент для пересылки
-                message=event.message,  # <-- ✅ передаем сообщение для пересылки
-                chat_id=event.chat_id,  # <-- ✅ передаем chat_id для пересылки
-                user_id=str(user_id),  # <-- ✅ передаем user_id для пересылки
-                target_group_id=target_group_id  # <-- ✅ передаем target_group_id для пересылки
+        # === Регистрируем ключевые слова пользователя в общем индексе (один раз на сессию) ===
+        register_user_keywords(user_id=str(user_id))
+
+        # === Позиции каналов (для догрузки пропущенных сообщений после перезапуска) ===
+        # Позиция не сохраняется дальше частей альбомов, которые ещё накапливаются или проверяются
+        cursor_tracker = ChannelCursorTracker(
+            user_id=user_id,
+            hold=lambda chat_id: album_buffers[str(user_id)].pending_min_id(chat_id)
+            if str(user_id) in album_buffers else None
+        )
+        cursor_tracker.start()
+
+        async def process_tracked_message(account, tracked_message, chat_id):
+            # Проверяет сообщение по ключевым словам, пересылает при совпадении и запоминает позицию канала
+            await process_incoming_message(
+                client=account,
+                message=tracked_message,
+                chat_id=chat_id,
+                user_id=user_id,
+                target_group_id=target_group_id
+            )
+            cursor_tracker.update(chat_id, tracked_message.id)
+
+        start_message_buffers(user_id=user_id, target_group_id=target_group_id)
+
+        # === Очередь входящих сообщений: ограниченная, с пулом воркеров и порядком внутри чата ===
+        event_queue = EventQueue(process=process_tracked_message)
+        event_queue.start()
+        event_queues[str(user_id)] = event_queue
+
+        # === Дополнительные аккаунты пользователя: каналы распределяются между всеми аккаунтами ===
+        accounts = {os.path.basename(session_path): client}
+        for extra_session_path in list_session_files(os.path.dirname(session_path)):
+            if extra_session_path == session_path:
+                continue
+            extra_client = await connect_client(
+                session_name=extra_session_path.replace(".session", ""),
+                user=user,
+                message=message
+            )
+            if extra_client is None:
+                continue  # Недействительная сессия — пользователь уже уведомлён
+            extra_clients.append(extra_client)
+            accounts[os.path.basename(extra_session_path)] = extra_client
+
+        # === Каналы, в которых аккаунты уже состоят (ID берутся из списков диалогов) ===
+        subscriptions = {}
+        for session_name, account in accounts.items():
+            subscriptions[session_name] = await get_subscribed_channels(client=account)
+
+        assignment, unassigned = assign_channels(
+            user_id=user_id,
+            channels=channels,
+            accounts={session_name: set(subscribed) for session_name, (subscribed, _) in subscriptions.items()}
+        )
+        if unassigned:
+            await message.answer(
+                f"⚠️ {len(unassigned)} каналов не помещаются в лимит подключённых аккаунтов ({len(accounts)}) "
+                f"и будут отслеживаться опросом истории без подписки, с задержкой. "
+                f"Подключите ещё один аккаунт, чтобы получать их сообщения сразу."
+            )
+
+        # === Режим опроса: новые каналы не подписываются, а отслеживаются опросом истории ===
+        poll_mode = get_poll_mode(user_id=user_id)
+        if poll_mode:
+            logger.info("🔄 Режим опроса: подписка только на каналы с высокой частотой публикаций")
+
+        # === Резервный аккаунт (hot standby): слушает каналы основного аккаунта параллельно с ним ===
+        primary_name = os.path.basename(session_path)
+        standby_client = None
+        standby_monitor = None
+        standby_session_path = find_standby_session(os.path.dirname(session_path))
+        if standby_session_path:
+            standby_client = await connect_client(
+                session_name=standby_session_path.replace(".session", ""),
+                user=user,
+                message=message
+            )
+        if standby_client is not None:
+            extra_clients.append(standby_client)
+            if not await join_target_group(client=standby_client, user_id=int(user_id), message=message):
+                logger.warning(f"⚠️ Резервный аккаунт user_id={str(user_id)} не подключён к целевой группе")
+            standby_subscribed, _ = await get_subscribed_channels(client=standby_client)
+            standby_chat_ids = {
+                chat_id for username, chat_id in standby_subscribed.items() if username in assignment[primary_name]
+            }
+            standby_monitor = StandbyMonitor(
+                primary=client,
+                standby=standby_client,
+                forwarding_queue=forwarding_queue,
+                notify=message.answer
+            )
+            add_tracking_handler(
+                client=standby_client,
+                chat_ids=standby_chat_ids,
+                event_queue=event_queue,
+                on_event=standby_monitor.beat_standby
+            )
+            # В режиме опроса резервный аккаунт подписывается только на каналы, где состоит основной
+            primary_subscribed, _ = subscriptions[primary_name]
+            background_tasks.append(asyncio.create_task(
+                join_required_channels(
+                    client=standby_client,
+                    user_id=str(user_id),
+                    message=message,
+                    channels=(
+                        assignment[primary_name] & set(primary_subscribed) if poll_mode else assignment[primary_name]
+                    ),
+                    already_subscribed=set(standby_subscribed),
+                    on_joined=standby_chat_ids.add
+                )
+            ))
+            background_tasks.append(asyncio.create_task(standby_monitor.run()))
+            logger.info(f"🛡 Резервный аккаунт: каналов для прослушивания сразу {len(standby_chat_ids)}")
+
+        # === Каждый аккаунт сразу слушает свои каналы, на которые уже подписан ===
+        live_chat_ids = {}  # {имя файла сессии: set(маркированных ID)} — пополняется по мере подписки
+        for session_name, account in accounts.items():
+            subscribed, dialog_entities = subscriptions[session_name]
+            live_chat_ids[session_name] = {
+                chat_id for username, chat_id in subscribed.items() if username in assignment[session_name]
+            }
+            add_tracking_handler(
+                client=account,
+                chat_ids=live_chat_ids[session_name],
+                event_queue=event_queue,
+                on_event=standby_monitor.beat_primary if standby_monitor and account is client else None
+            )
+            logger.info(
+                f"👂 Аккаунт {session_name}: каналов для прослушивания сразу "
+                f"{len(live_chat_ids[session_name])} из {len(assignment[session_name])}"
+            )
+
+        def make_history_processor(account):
+            """Обработчик сообщений, полученных из истории канала (догрузка и опрос), для аккаунта `account`."""
+
+            async def process_history_message(chat_id, history_message):
+                await process_tracked_message(account, history_message, chat_id)
+
+            return process_history_message
+
+        # === Опрос каналов без подписки: по одному опросчику на аккаунт ===
+        pollers = {}
+        for session_name, account in accounts.items():
+            async def promote_channel(channel, account=account, session_name=session_name):
+                # Канал с частыми публикациями: подписываемся и переводим его на прослушивание событий
+                try:
+                    updates = await account(JoinChannelRequest(channel))
+                    notify_joined(updates, live_chat_ids[session_name].add)
+                    pollers[session_name].remove(channel)
+                    logger.info(f"🔗 Канал {channel} переведён с опроса на подписку")
+                except Exception as e:
+                    logger.warning(f"⚠️ Не удалось подписаться на {channel}, канал остаётся на опросе: {e}")
+
+            pollers[session_name] = ChannelPoller(
+                client=account,
+                process=make_history_processor(account),
+                cursors=cursor_tracker.last_ids,
+                on_hot=promote_channel if poll_mode else None
             )
+        for channel in unassigned:
+            pollers[primary_name].add(channel)
+        channel_pollers[str(user_id)] = list(pollers.values())
 
         logger.info("👂 Бот слушает новые сообщения...")
         await message.answer(
@@ -489,44 +933,290 @@ async def filter_messages(message, user_id, user, session_path):
             reply_markup=menu_launch_tracking_keyboard()
         )
 
-        # ✅ Запускаем прослушивание с проверкой флага остановки
-        while not stop_event.is_set():
-            try:
-                # Используем wait_for с небольшим таймаутом для возможности проверки флага
-                await asyncio.wait_for(stop_event.wait(), timeout=1.0)
-                break  # Флаг установлен, выходим
-            except asyncio.TimeoutError:
-                # Таймаут - продолжаем работу
-                pass
+        for session_name, account in accounts.items():
+            subscribed, dialog_entities = subscriptions[session_name]
 
-        logger.info("🛑 Прослушивание остановлено по запросу пользователя.")
-        await message.answer("🛑 Отслеживание сообщений остановлено.")
+            if poll_mode:
+                # === Режим опроса: каналы, на которые аккаунт не подписан, отслеживаются опросом истории ===
+                for channel in assignment[session_name] - set(subscribed):
+                    pollers[session_name].add(channel)
+            else:
+                # === Подписка на остальные каналы идёт в фоне, каждый канал начинает прослушиваться сразу после
+                # подписки; каналы, на которые подписаться не удалось, переходят на опрос ===
+                background_tasks.append(asyncio.create_task(
+                    join_required_channels(
+                        client=account,
+                        user_id=str(user_id),
+                        message=message,
+                        channels=assignment[session_name],
+                        already_subscribed=set(subscribed),
+                        on_joined=live_chat_ids[session_name].add,
+                        on_failed=pollers[session_name].add
+                    )
+                ))
+            background_tasks.append(asyncio.create_task(pollers[session_name].run()))
+            logger.info(f"🔄 Аккаунт {session_name}: каналов на опросе {len(pollers[session_name])}")
+
+            # === Обновление данных групп в общей базе (необязательно, в фоне) ===
+            if refresh_group_metadata:
+                background_tasks.append(asyncio.create_task(get_grup_accaunt(client=account, entities=dialog_entities)))
+
+        # === Догружаем сообщения, пропущенные за время простоя (новые сообщения уже обрабатываются) ===
+        for session_name, account in accounts.items():
+            missed_cursors = {
+                chat_id: message_id
+                for chat_id, message_id in cursor_tracker.last_ids.items()
+                if chat_id in live_chat_ids[session_name]
+            }
+            await backfill_missed_messages(
+                client=account, cursors=missed_cursors, process=make_history_processor(account)
+            )
 
-        # await client.run_until_disconnected()
+        # ✅ Слушаем до отмены задачи супервизором (остановка) или до отключения любого из аккаунтов.
+        # При наличии резервного аккаунта отключение основного обрабатывает `StandbyMonitor`.
+        watched_clients = [
+            account for account in accounts.values() if standby_monitor is None or account is not client
+        ]
+        if standby_client is not None:
+            watched_clients.append(standby_client)
+        await asyncio.wait(
+            [account.disconnected for account in watched_clients], return_when=asyncio.FIRST_COMPLETED
+        )
+        raise ConnectionError(f"Аккаунт пользователя user_id={str(user_id)} отключился от Telegram")
     except Exception as e:
         logger.exception(f"❌ Критическая ошибка в filter_messages: {e}")
+        raise
     finally:
         # ✅ Очищаем ресурсы
-        if user_id in active_clients:
+        for background_task in background_tasks:
+            background_task.cancel()  # Прерываем фоновую подписку на каналы и обновление данных групп
+        await asyncio.gather(*background_tasks, return_exceptions=True)
+
+        if cursor_tracker is not None:
+            await cursor_tracker.stop()  # Сохраняем позиции каналов
+
+        await release_user_resources(user_id=user_id)
+
+        if str(user_id) in active_clients:
             client = active_clients.pop(str(user_id))
             if client.is_connected():
                 await client.disconnect()
                 logger.info(f"🛑 Клиент для user_id={str(user_id)} отключён.")
 
-        if user_id in stop_flags:
-            stop_flags.pop(str(user_id))
-            logger.info(f"🗑️ Флаг остановки для user_id={str(user_id)} удалён.")
+        for extra_client in extra_clients:
+            if extra_client.is_connected():
+                await extra_client.disconnect()
+        if extra_clients:
+            logger.info(f"🛑 Дополнительные аккаунты user_id={str(user_id)} отключены: {len(extra_clients)}")
+
+
+async def release_user_resources(user_id):
+    """
+    Освобождает ресурсы сессии отслеживания пользователя, не связанные с подключением аккаунта.
+
+    Останавливает очередь входящих сообщений, обрабатывает накопленные альбомы, отправляет сводки по открытым группам
+    копий и остаток дайджеста, останавливает очередь пересылок (до отключения клиента, через который она
+    отправляет), удаляет ключевые слова и фильтр пользователя и сохраняет хранилище пересланных сообщений.
+
+    :param user_id: (int | str) Идентификатор пользователя Telegram.
+    :return: None
+    """
+    if str(user_id) in event_queues:
+        await event_queues.pop(str(user_id)).stop()  # Прекращаем обработку входящих сообщений
+
+    if str(user_id) in album_buffers:
+        await album_buffers.pop(str(user_id)).close()  # Накопленные альбомы проверяются до остановки очереди
+
+    duplicates = duplicate_indexes.pop(str(user_id), None)
+    if duplicates is not None:
+        await duplicates.close()  # Сводки по открытым группам копий уходят в очередь
+        logger.info(f"🔁 Копий сообщений не переслано для user_id={str(user_id)}: {duplicates.suppressed}")
+
+    if str(user_id) in digest_buffers:
+        await digest_buffers.pop(str(user_id)).close()  # Остаток дайджеста уходит в очередь
+    delivery_formats.pop(str(user_id), None)
+    routing_tables.pop(str(user_id), None)
+    channel_pollers.pop(str(user_id), None)
+
+    if str(user_id) in forwarding_queues:
+        await forwarding_queues.pop(str(user_id)).stop()
+        logger.info(f"📤 Очередь пересылок для user_id={str(user_id)} остановлена.")
+
+    unregister_user(user_id=user_id)  # Удаляем ключевые слова пользователя из общего индекса
+    unregister_user_filter(user_id=user_id)
+
+    await forwarded_store.flush()  # Сохраняем хранилище пересланных сообщений на диск
+    logger.info(f"📊 Хранилище пересланных сообщений: {forwarded_store.stats()}")
+
+
+async def filter_messages_pooled(message, user_id, user):
+    """
+    Запускает отслеживание сообщений через общий пул аккаунтов бота (`listener_pool`), без сессии пользователя.
+
+    Каналы пользователя добавляются в прослушивание пула: аккаунты пула подписываются на объединение каналов всех
+    таких пользователей, и каждое сообщение канала проверяется по ключевым словам всех пользователей, которые его
+    отслеживают. Найденные сообщения пересылаются в целевую группу пользователя аккаунтом пула (`delivery_client`).
+
+    - Работает только для публичных каналов (с username).
+    - Формат доставки и режим дайджеста — как в `filter_messages`.
+    - Догрузка пропущенных сообщений и опрос каналов без подписки в этом режиме не выполняются.
+    - Если аккаунт пула отключился, выбрасывается ConnectionError — супервизор перезапустит сессию.
+
+    :param message: (Message | UserNotifier) Объект для отправки уведомлений пользователю.
+    :param user_id: (int) Идентификатор пользователя Telegram.
+    :param user: (User) Модель пользователя из базы данных.
+    :return: None
+    :raises Exception: Логируется и пробрасывается супервизору для перезапуска сессии.
+    """
+    logger.info(f"🌐 Запуск отслеживания через общий пул для user_id={str(user_id)}...")
+    try:
+        if not await listener_pool.start():
+            await message.answer(
+                "❌ Нет доступных аккаунтов для отслеживания. Подключите свой аккаунт.",
+                reply_markup=menu_launch_tracking_keyboard()
+            )
+            return
+        client = listener_pool.delivery_client(user_id=user_id)
+
+        # === Аккаунт пула, который пересылает сообщения пользователя, подключается к его целевой группе ===
+        target_group_id = await ensure_joined_target_group(client=client, message=message, user_id=int(user_id))
+        if not target_group_id:
+            return
+        routing_tables[str(user_id)] = await build_routing_table(
+            client=client, user_id=user_id, default_target=target_group_id
+        )
+
+        forwarding_queue = ForwardingQueue(client=client, user_id=user_id)
+        await forwarding_queue.start()
+        forwarding_queues[str(user_id)] = forwarding_queue
+
+        delivery_formats[str(user_id)] = get_delivery_format(user_id=user_id)
+        digest_enabled, digest_window, digest_size = get_digest_settings(user_id=user_id)
+        if digest_enabled:
+            digest_buffers[str(user_id)] = DigestBuffer(
+                flush_callback=lambda items: send_digest(user_id, target_group_id, items),
+                window=digest_window,
+                max_items=digest_size
+            )
+
+        channels = await get_user_channels_or_notify(user_id=int(user_id), user=user, message=message, client=None)
+        if not channels:
+            return
+
+        register_user_keywords(user_id=str(user_id))
+
+        async def process_pool_message(pool_client, pool_message, chat_id):
+            await process_incoming_message(
+                client=pool_client,
+                message=pool_message,
+                chat_id=chat_id,
+                user_id=user_id,
+                target_group_id=target_group_id
+            )
+
+        start_message_buffers(user_id=user_id, target_group_id=target_group_id)
+        event_queue = EventQueue(process=process_pool_message)
+        event_queue.start()
+        event_queues[str(user_id)] = event_queue
+
+        unassigned = await listener_pool.subscribe(user_id=user_id, channels=channels, handler=event_queue.submit)
+        if unassigned:
+            await message.answer(
+                f"⚠️ {len(unassigned)} каналов не отслеживаются: у общего пула закончился лимит каналов. "
+                f"Подключите свой аккаунт, чтобы отслеживать их."
+            )
+
+        logger.info(f"👂 Бот слушает новые сообщения через общий пул: {listener_pool.stats()}")
+        await message.answer(
+            text="👂 Бот слушает новые сообщения (через общий пул аккаунтов)...",
+            reply_markup=menu_launch_tracking_keyboard()
+        )
+
+        await listener_pool.wait_disconnected()
+        raise ConnectionError("Аккаунт общего пула отключился от Telegram")
+    except Exception as e:
+        logger.exception(f"❌ Критическая ошибка в filter_messages_pooled: {e}")
+        raise
+    finally:
+        listener_pool.unsubscribe(user_id=user_id)  # Аккаунты пула остаются подключёнными для других пользователей
+        await release_user_resources(user_id=user_id)
+
+
+async def run_tracking_session(message, user_id, user, session_path):
+    """
+    Запускает сессию отслеживания с отметкой в базе данных для возобновления после перезапуска бота.
+
+    Отметка (`ActiveTracking`) снимается при штатном завершении сессии (например, нет каналов или целевой
+    группы) и при остановке пользователем. При сбое или остановке бота отметка остаётся — сессия будет
+    возобновлена при следующем запуске (`resume_tracking_sessions`).
+
+    :param message: (Message | UserNotifier) Объект для отправки уведомлений пользователю.
+    :param user_id: (int) Идентификатор пользователя Telegram.
+    :param user: (User) Модель пользователя из базы данных.
+    :param session_path: (str) Полный путь к файлу сессии (.session) или `POOL_DIR` для общего пула аккаунтов.
+    :return: None
+    """
+    set_tracking_active(user_id=int(user_id), session_path=session_path)
+    if session_path == POOL_DIR:
+        await filter_messages_pooled(message=message, user_id=user_id, user=user)
+    else:
+        await filter_messages(message=message, user_id=user_id, user=user, session_path=session_path)
+    remove_tracking_active(user_id=int(user_id))
+
+
+async def resume_tracking_sessions():
+    """
+    Возобновляет сессии отслеживания, которые были запущены на момент остановки бота.
+
+    Вызывается при старте бота. Сессии запускаются через `tracking_supervisor` с небольшой паузой между ними,
+    уведомления пользователям отправляются ботом (`UserNotifier`), так как исходного сообщения нет.
+    Если файл сессии или пользователь больше не существуют, отметка удаляется.
+
+    :return: None
+    """
+    try:
+        trackings = get_active_trackings()
+    except Exception as e:
+        logger.exception(f"❌ Не удалось получить список сессий для возобновления: {e}")
+        return
+
+    if trackings:
+        logger.info(f"♻️ Возобновление сессий отслеживания: {len(trackings)}")
+
+    for tracking in trackings:
+        user = User.get_or_none(User.user_id == tracking.user_id)
+        if user is None or (tracking.session_path != POOL_DIR and not os.path.exists(tracking.session_path)):
+            logger.warning(f"⚠️ Сессия user_id={tracking.user_id} не может быть возобновлена: нет пользователя или файла")
+            remove_tracking_active(user_id=tracking.user_id)
+            continue
+
+        notifier = UserNotifier(user_id=tracking.user_id)
+        started = tracking_supervisor.start(
+            user_id=tracking.user_id,
+            factory=lambda notifier=notifier, tracking=tracking, user=user: run_tracking_session(
+                message=notifier,
+                user_id=tracking.user_id,
+                user=user,
+                session_path=tracking.session_path
+            )
+        )
+        if started:
+            await notifier.answer(
+                "♻️ Бот был перезапущен. Отслеживание возобновлено, пропущенные сообщения будут проверены.",
+                reply_markup=menu_launch_tracking_keyboard()
+            )
+        await asyncio.sleep(1)  # Разносим подключения аккаунтов во времени
 
 
 async def stop_tracking(user_id, message):
     """
     Останавливает процесс отслеживания сообщений для пользователя.
 
-    Устанавливает флаг остановки для активной сессии пользователя, что приводит к
-    завершению цикла прослушивания в функции `filter_messages`.
+    Отменяет фоновую задачу сессии в `tracking_supervisor` и дожидается освобождения ресурсов
+    (отправка остатка дайджеста, остановка очереди пересылок, отключение клиента).
 
     - Не создаёт новое подключение к сессии (избегает блокировки SQLite).
-    - Использует глобальный словарь `stop_flags` для управления состоянием.
+    - Прерывает сессию на любом этапе, в том числе во время подписки на каналы.
     - Безопасно обрабатывает случаи, когда отслеживание уже остановлено.
 
     :param user_id: (int) Идентификатор пользователя Telegram.
@@ -537,8 +1227,9 @@ async def stop_tracking(user_id, message):
 
     logger.info(f"🛑 Запрос на остановку отслеживания для user_id={user_id}")
 
-    # ✅ Проверяем, есть ли активное отслеживание для этого пользователя
-    if user_id not in stop_flags:
+    # ✅ Останавливаем сессию, если она активна
+    remove_tracking_active(user_id=int(user_id))  # Остановлено пользователем — не возобновляем после перезапуска
+    if not await tracking_supervisor.stop(user_id):
         logger.warning(f"⚠️ Отслеживание для user_id={user_id} не активно или уже остановлено.")
         await message.answer(
             "⚠️ Отслеживание не запущено или уже остановлено.",
@@ -546,12 +1237,8 @@ async def stop_tracking(user_id, message):
         )
         return
 
-    # ✅ Устанавливаем флаг остановки
-    stop_event = stop_flags[user_id]
-    stop_event.set()
-
-    logger.info(f"✅ Флаг остановки установлен для user_id={user_id}")
+    logger.info(f"✅ Отслеживание для user_id={user_id} остановлено")
     await message.answer(
-        "🛑 Команда остановки отправлена. Отслеживание будет остановлено в течение нескольких секунд.",
+        "🛑 Отслеживание сообщений остановлено.",
         reply_markup=menu_launch_tracking_keyboard()
     )
@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from loguru import logger  # https://github.com/Delgan/loguru
+from telethon import utils
+from telethon.tl.types import Channel, Chat, User as TelegramUser
+
+from database.database import PeerMetadata
+
+# Подписи типов чатов, используемые в базе групп/каналов (`TelegramGroup.group_type`)
+PEER_TYPE_LABELS = {
+    "megagroup": "Группа (супергруппа)",
+    "channel": "Канал",
+    "chat": "Обычный чат (группа старого типа)",
+}
+
+
+def describe_peer_type(entity):
+    """
+    Определяет тип сущности Telegram.
+
+    :param entity: (Channel, Chat, User) Объект сущности из Telethon.
+    :return: str 'megagroup', 'channel', 'chat', 'bot' или 'user'.
+    """
+    if isinstance(entity, Channel):
+        return "megagroup" if entity.megagroup else "channel"
+    if isinstance(entity, Chat):
+        return "chat"
+    if isinstance(entity, TelegramUser) and entity.bot:
+        return "bot"
+    return "user"
+
+
+class PeerInfo:
+    """
+    Метаданные сущности Telegram, хранящиеся в кеше.
+
+    :param peer_id: (int) Маркированный ID (для каналов начинается с -100).
+    :param title: (str | None) Название чата или имя пользователя.
+    :param username: (str | None) Username в нижнем регистре без '@'.
+    :param peer_type: (str) Тип сущности (см. `describe_peer_type`).
+    :param access_hash: (int | None) access_hash аккаунта, который получил сущность.
+    :param updated_at: (datetime) Время получения данных.
+    """
+    __slots__ = ("peer_id", "title", "username", "peer_type", "access_hash", "updated_at")
+
+    def __init__(self, peer_id, title, username, peer_type, access_hash=None, updated_at=None):
+        self.peer_id = peer_id
+        self.title = title
+        self.username = username
+        self.peer_type = peer_type
+        self.access_hash = access_hash
+        self.updated_at = updated_at or datetime.now()
+
+    @classmethod
+    def from_entity(cls, entity):
+        title = getattr(entity, "title", None) or " ".join(
+            part for part in (getattr(entity, "first_name", None), getattr(entity, "last_name", None)) if part
+        ) or None
+        username = getattr(entity, "username", None)
+        return cls(
+            peer_id=utils.get_peer_id(entity),
+            title=title,
+            username=username.lower() if username else None,
+            peer_type=describe_peer_type(entity),
+            access_hash=getattr(entity, "access_hash", None),
+        )
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(row.peer_id, row.title, row.username, row.peer_type, row.access_hash, row.updated_at)
+
+
+class PeerCache:
+    """
+    Общий асинхронный кеш метаданных сущностей Telegram (ID → название, username, тип, access_hash).
+
+    Используется всеми модулями, работающими с Telethon, вместо повторных вызовов `client.get_entity`.
+    Порядок поиска: память (LRU) → SQLite (`PeerMetadata`) → запрос к Telegram. Одновременные запросы
+    одной и той же сущности объединяются: все ожидают одну задачу получения, пока она не завершится.
+    Чтение и запись SQLite в `get` и `remember` выполняются в отдельном потоке и не блокируют цикл событий.
+
+    - Записи старше `ttl` считаются устаревшими и запрашиваются заново.
+    - В памяти хранится не более `max_size` записей, в SQLite — все (кеш «тёплый» после перезапуска).
+    - Поиск возможен по маркированному ID, @username или ссылке https://t.me/username.
+
+    :param ttl: (int) Время актуальности записи в секундах.
+    :param max_size: (int) Максимальное количество записей в памяти.
+    """
+
+    def __init__(self, ttl=24 * 3600, max_size=10_000):
+        self.ttl = timedelta(seconds=ttl)
+        self.max_size = max_size
+        self._by_id = OrderedDict()  # {peer_id: PeerInfo}
+        self._ids_by_username = {}  # {username: peer_id}
+        self._inflight = {}  # {ключ: asyncio.Task} — выполняющиеся получения сущностей
+        self._db_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="peer_cache")  # Запись по очереди
+        self._table_ready = False
+        self.hits = 0
+        self.misses = 0
+        self.resolves = 0
+
+    @staticmethod
+    def _make_key(peer):
+        """Приводит ID, @username или ссылку к ключу кеша: int или username в нижнем регистре."""
+        if isinstance(peer, int):
+            return peer
+        username, is_invite = utils.parse_username(str(peer).strip())
+        if username and not is_invite:
+            return username.lower()
+        return str(peer).strip()
+
+    def _is_fresh(self, info):
+        return datetime.now() - info.updated_at < self.ttl
+
+    def _ensure_table(self):
+        if not self._table_ready:
+            PeerMetadata.create_table(safe=True)
+            self._table_ready = True
+
+    def _remember(self, info):
+        """Кладёт запись в память с учётом ограничения размера."""
+        self._by_id[info.peer_id] = info
+        self._by_id.move_to_end(info.peer_id)
+        if info.username:
+            self._ids_by_username[info.username] = info.peer_id
+
+        while len(self._by_id) > self.max_size:
+            _, evicted = self._by_id.popitem(last=False)
+            if evicted.username and self._ids_by_username.get(evicted.username) == evicted.peer_id:
+                del self._ids_by_username[evicted.username]
+
+    def _lookup_memory(self, key):
+        peer_id = self._ids_by_username.get(key) if isinstance(key, str) else key
+        info = self._by_id.get(peer_id)
+        if info is not None and self._is_fresh(info):
+            self._by_id.move_to_end(peer_id)
+            return info
+        return None
+
+    def _read_db(self, key):
+        """Читает запись из SQLite (без изменения памяти — безопасно вызывать из потока)."""
+        self._ensure_table()
+        if isinstance(key, int):
+            row = PeerMetadata.get_or_none(PeerMetadata.peer_id == key)
+        else:
+            row = PeerMetadata.get_or_none(PeerMetadata.username == key)
+        if row is None:
+            return None
+        info = PeerInfo.from_row(row)
+        return info if self._is_fresh(info) else None
+
+    def _lookup_db(self, key):
+        info = self._read_db(key)
+        if info is not None:
+            self._remember(info)
+        return info
+
+    async def _run_db(self, function, *args):
+        """Выполняет обращение к SQLite в потоке кеша."""
+        return await asyncio.get_running_loop().run_in_executor(self._db_executor, function, *args)
+
+    def _store(self, info):
+        """Сохраняет запись в память и в SQLite (при запущенном цикле событий — в фоне, в потоке кеша)."""
+        self._remember(info)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._write_db(info)
+            return
+        loop.run_in_executor(self._db_executor, self._write_db, info)
+
+    def _write_db(self, info):
+        """Сохраняет запись в SQLite."""
+        try:
+            self._ensure_table()
+            PeerMetadata.insert(
+                peer_id=info.peer_id,
+                username=info.username,
+                title=info.title,
+                peer_type=info.peer_type,
+                access_hash=info.access_hash,
+                updated_at=info.updated_at,
+            ).on_conflict(
+                conflict_target=[PeerMetadata.peer_id],
+                update={
+                    PeerMetadata.username: info.username,
+                    PeerMetadata.title: info.title,
+                    PeerMetadata.peer_type: info.peer_type,
+                    PeerMetadata.access_hash: info.access_hash,
+                    PeerMetadata.updated_at: info.updated_at,
+                }
+            ).execute()
+        except Exception as e:
+            logger.warning(f"⚠️ Не удалось сохранить метаданные {info.peer_id} в БД: {e}")
+
+    def remember(self, entity):
+        """
+        Добавляет в кеш уже полученную сущность (без сетевого запроса).
+
+        :param entity: (Channel, Chat, User) Объект сущности из Telethon.
+        :return: PeerInfo
+        """
+        info = PeerInfo.from_entity(entity)
+        self._store(info)
+        return info
+
+    async def get(self, client, peer):
+        """
+        Возвращает метаданные сущности, запрашивая её у Telegram только при промахе кеша.
+
+        :param client: (TelegramClient) Клиент, которым выполняется запрос при промахе.
+        :param peer: (int | str) Маркированный ID, @username или ссылка на чат.
+        :return: PeerInfo
+        :raises ValueError: Если сущность не найдена (пробрасывается из Telethon), как и другие ошибки Telethon.
+        """
+        key = self._make_key(peer)
+
+        info = self._lookup_memory(key)
+        if info is not None:
+            self.hits += 1
+            return info
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._resolve(client, peer, key))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        # Отмена одного ожидающего не отменяет получение для остальных
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task):
+        """Убирает завершённое получение сущности из выполняющихся."""
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # Ошибка передана ожидающим; отмечаем её полученной, если ожидающих не осталось
+
+    async def _resolve(self, client, peer, key):
+        """Получает сущность из SQLite или у Telegram (одна задача на ключ)."""
+        info = await self._run_db(self._read_db, key)
+        if info is not None:
+            self._remember(info)
+            self.hits += 1
+            return info
+
+        self.misses += 1
+        self.resolves += 1
+        entity = await client.get_entity(peer)
+        info = PeerInfo.from_entity(entity)
+        self._store(info)
+        logger.debug(f"🔎 Получены метаданные {peer}: {info.title} ({info.peer_type})")
+        return info
+
+    def lookup(self, peer):
+        """
+        Возвращает метаданные сущности только из кеша (память или SQLite), без запроса к Telegram.
+
+        :param peer: (int | str) Маркированный ID, @username или ссылка на чат.
+        :return: PeerInfo или None, если сущности нет в кеше.
+        """
+        key = self._make_key(peer)
+        return self._lookup_memory(key) or self._lookup_db(key)
+
+    def invalidate(self, peer):
+        """
+        Удаляет сущность из кеша в памяти (например, после смены username).
+
+        :param peer: (int | str) Маркированный ID, @username или ссылка на чат.
+        :return: None
+        """
+        key = self._make_key(peer)
+        peer_id = self._ids_by_username.pop(key, None) if isinstance(key, str) else key
+        self._by_id.pop(peer_id, None)
+
+    def stats(self):
+        """Возвращает счётчики работы кеша: size, hits, misses, resolves."""
+        return {"size": len(self._by_id), "hits": self.hits, "misses": self.misses, "resolves": self.resolves}
+
+
+# 🧠 Общий кеш метаданных для всех клиентов Telethon процесса
+peer_cache = PeerCache()
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import time
+
+from loguru import logger  # https://github.com/Delgan/loguru
+
+from account_manager.peer_cache import peer_cache
+from core.config import poll_min_interval, poll_max_interval, poll_delay, poll_limit, poll_hot_rate
+from database.database import get_user_settings
+
+
+def get_poll_mode(user_id):
+    """
+    Проверяет, включён ли у пользователя режим опроса.
+
+    В режиме опроса аккаунт не подписывается на новые каналы: они отслеживаются опросом истории, а подписка
+    выполняется только для каналов с высокой частотой публикаций. Без режима опроса аккаунт подписывается на все
+    каналы, а опросом отслеживаются только каналы, подписка на которые не удалась или превышает лимит.
+
+    :param user_id: (int | str) Идентификатор пользователя Telegram.
+    :return: (bool) True, если режим опроса включён.
+    """
+    return get_user_settings(user_id=user_id).get("poll_mode") == "1"
+
+
+class PolledChannel:
+    """
+    Состояние канала, который отслеживается опросом истории (без подписки).
+
+    :param username: (str) Username канала ("@username").
+    :param last_id: (int | None) ID последнего обработанного сообщения (None — ещё не известен).
+    :param interval: (float) Текущий интервал опроса, секунд.
+    """
+    __slots__ = ("username", "last_id", "interval", "due", "rate", "polled_at", "hot", "received")
+
+    def __init__(self, username, last_id, interval):
+        self.username = username
+        self.last_id = last_id
+        self.interval = interval
+        self.due = time.monotonic()  # Первый опрос — сразу
+        self.rate = 0.0  # Оценка частоты публикаций, сообщений в час
+        self.polled_at = None
+        self.hot = False  # Канал уже передан на подписку (или попытка не удалась)
+        self.received = 0  # Сообщений, полученных с последнего завершённого опроса (для оценки частоты)
+
+
+class ChannelPoller:
+    """
+    Отслеживание публичных каналов без подписки: периодический опрос истории `iter_messages(min_id=...)`.
+
+    Подходит для каналов, на которые аккаунт не может или не должен подписываться (лимит 500 каналов,
+    заявки на вступление, экономия лимита подписок). Новые сообщения передаются в `process` — ту же обработку,
+    что и для событий подписанных каналов.
+
+    - Интервал опроса подстраивается под частоту публикаций канала: после опроса с новыми сообщениями он
+      сокращается вдвое, после пустого — увеличивается в 1.5 раза (в пределах `min_interval`..`max_interval`).
+    - Каналы опрашиваются по одному с паузой `delay` секунд между запросами, чтобы не упереться в FloodWait.
+    - За один запрос читается не больше `limit` сообщений — от старых к новым, начиная с последнего обработанного.
+      Если их больше, канал опрашивается снова сразу (после паузы `delay`), пока не догонит ленту: сообщения
+      не пропускаются, сколько бы их ни накопилось за интервал.
+    - При первом опросе канала без сохранённой позиции запоминается только ID последнего сообщения —
+      старые сообщения не обрабатываются.
+    - Канал с частотой публикаций от `hot_rate` сообщений в час передаётся в `on_hot` (например, для подписки).
+
+    :param client: (TelegramClient) Клиент, которым выполняется опрос.
+    :param process: (coroutine function) Обработчик сообщения: `process(chat_id, message)`.
+    :param cursors: (dict) {chat_id: last_message_id} — сохранённые позиции каналов.
+    :param on_hot: (coroutine function | None) Вызывается с username канала с высокой частотой публикаций.
+    """
+
+    def __init__(self, client, process, cursors=None, on_hot=None, min_interval=poll_min_interval,
+                 max_interval=poll_max_interval, delay=poll_delay, limit=poll_limit, hot_rate=poll_hot_rate):
+        self.client = client
+        self.process = process
+        self.cursors = cursors or {}
+        self.on_hot = on_hot
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.delay = delay
+        self.limit = limit
+        self.hot_rate = hot_rate
+        self._channels = {}  # {username: PolledChannel}
+        self.polls = 0
+        self.messages = 0
+
+    def __len__(self):
+        return len(self._channels)
+
+    def add(self, username):
+        """
+        Добавляет канал в опрос.
+
+        :param username: (str) Username канала.
+        :return: None
+        """
+        username = f"@{username.lstrip('@').lower()}"
+        if username in self._channels:
+            return
+        peer = peer_cache.lookup(username)
+        last_id = self.cursors.get(peer.peer_id) if peer is not None else None
+        self._channels[username] = PolledChannel(username, last_id, self.min_interval)
+
+    def remove(self, username):
+        """Убирает канал из опроса (например, после подписки на него)."""
+        self._channels.pop(f"@{username.lstrip('@').lower()}", None)
+
+    def stats(self):
+        """Возвращает счётчики: channels, polls, messages."""
+        return {"channels": len(self._channels), "polls": self.polls, "messages": self.messages}
+
+    async def _poll(self, channel):
+        """
+        Опрашивает один канал и передаёт новые сообщения в обработку.
+
+        :return: (bool) True, если прочитаны не все новые сообщения (канал нужно опросить снова сразу).
+        """
+        now = time.monotonic()
+        if channel.last_id is None:
+            # Первый опрос без сохранённой позиции: только запоминаем последнее сообщение
+            async for msg in self.client.iter_messages(channel.username, limit=1):
+                channel.last_id = msg.id
+            channel.last_id = channel.last_id or 0
+            channel.polled_at = now
+            return False
+
+        # reverse=True — от старых к новым, начиная сразу после min_id: при отставании читаются самые старые
+        messages = [
+            msg async for msg in self.client.iter_messages(
+                channel.username, min_id=channel.last_id, limit=self.limit, reverse=True
+            )
+        ]
+        for msg in messages:
+            await self.process(msg.chat_id, msg)
+            channel.last_id = max(channel.last_id, msg.id)
+
+        self.polls += 1
+        self.messages += len(messages)
+        channel.received += len(messages)
+        if len(messages) >= self.limit:
+            logger.info(f"⏩ Канал {channel.username}: новых сообщений больше {self.limit}, продолжаю чтение")
+            return True
+
+        # Адаптация интервала к частоте публикаций (по всем сообщениям с прошлого завершённого опроса)
+        if channel.polled_at is not None:
+            elapsed_hours = max(now - channel.polled_at, 1) / 3600
+            channel.rate = 0.7 * channel.rate + 0.3 * (channel.received / elapsed_hours)
+        channel.polled_at = now
+        if channel.received:
+            channel.interval = max(self.min_interval, channel.interval / 2)
+        else:
+            channel.interval = min(self.max_interval, channel.interval * 1.5)
+
+        if self.on_hot is not None and not channel.hot and channel.rate >= self.hot_rate:
+            channel.hot = True
+            logger.info(f"🔥 Канал {channel.username}: ~{channel.rate:.0f} сообщений в час — передан на подписку")
+            await self.on_hot(channel.username)
+        channel.received = 0
+        return False
+
+    async def run(self):
+        """Цикл опроса (запускается фоновой задачей на время сессии отслеживания)."""
+        while True:
+            if not self._channels:
+                await asyncio.sleep(self.min_interval)
+                continue
+
+            channel = min(self._channels.values(), key=lambda item: item.due)
+            wait = channel.due - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(min(wait, self.min_interval))  # Новые каналы могут появиться во время ожидания
+                continue
+
+            behind = False
+            try:
+                behind = await self._poll(channel)
+            except Exception as e:
+                # FloodWait, приватный/удалённый канал и т.п. — откладываем канал на максимальный интервал
+                channel.interval = self.max_interval
+                wait_seconds = getattr(e, "seconds", 0)
+                logger.warning(f"⚠️ Не удалось опросить канал {channel.username}: {e}")
+                if wait_seconds:
+                    await asyncio.sleep(wait_seconds)
+            channel.due = time.monotonic() + (0 if behind else channel.interval)
+            await asyncio.sleep(self.delay)
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+from loguru import logger  # https://github.com/Delgan/loguru
+
+from account_manager.keyword_matcher import KeywordMatcher
+from account_manager.normalizer import normalize_keyword, normalize_text
+from database.database import get_user_filters
+
+# Виды правил фильтрации (столбец `filter_type` таблицы '<user_id>_filters')
+FILTER_NEGATIVE = "negative"  # Минус-слово: сообщение с ним не пересылается
+FILTER_MIN_LENGTH = "min_length"  # Минимальная длина текста
+FILTER_MAX_LENGTH = "max_length"  # Максимальная длина текста
+FILTER_SENDER = "sender"  # Заблокированный отправитель: ID или @username
+FILTER_BOTS = "bots"  # Пропускать сообщения ботов и отправленные через ботов
+FILTER_FORWARDS = "forwards"  # only — только пересланные сообщения, exclude — только оригиналы
+
+SINGLE_VALUE_FILTERS = (FILTER_MIN_LENGTH, FILTER_MAX_LENGTH, FILTER_BOTS, FILTER_FORWARDS)
+
+FORWARDS_ONLY = "only"
+FORWARDS_EXCLUDE = "exclude"
+
+# Команды ввода правил: префикс строки → вид правила
+RULE_COMMANDS = {
+    "мин": FILTER_MIN_LENGTH, "min": FILTER_MIN_LENGTH,
+    "макс": FILTER_MAX_LENGTH, "max": FILTER_MAX_LENGTH,
+    "блок": FILTER_SENDER, "block": FILTER_SENDER,
+}
+FORWARDS_COMMANDS = {
+    "только пересланные": FORWARDS_ONLY, "forwards only": FORWARDS_ONLY,
+    "только оригиналы": FORWARDS_EXCLUDE, "originals only": FORWARDS_EXCLUDE,
+}
+BOTS_COMMANDS = ("без ботов", "no bots")
+
+
+class MessageFilter:
+    """
+    Предварительный фильтр сообщений пользователя, который выполняется до поиска ключевых слов.
+
+    Правила компилируются один раз при запуске отслеживания (или при их изменении) в проверки за постоянное время:
+    длина текста — сравнение чисел, отправители — множества ID и username, пересланные сообщения и боты — флаги.
+    Минус-слова собираются в один автомат (`KeywordMatcher`) и проверяются последними, одним проходом по тексту.
+    Минус-слово совпадает только с целыми словами текста: «-кот» отбрасывает «кот» (и «коты» при стемминге),
+    но не «котировки».
+    Отброшенное сообщение не сканируется по ключевым словам, не требует метаданных чата и не пересылается.
+
+    :param rules: (list[tuple[str, str]]) Правила (вид, значение) из таблицы фильтров пользователя.
+    """
+
+    def __init__(self, rules):
+        self.min_length = 0
+        self.max_length = None
+        self.blocked_ids = set()
+        self.blocked_usernames = set()
+        self.skip_bots = False
+        self.forwards = None
+        negative = []
+
+        for filter_type, value in rules:
+            if filter_type == FILTER_NEGATIVE:
+                negative.append(normalize_keyword(value))
+            elif filter_type == FILTER_MIN_LENGTH:
+                self.min_length = int(value)
+            elif filter_type == FILTER_MAX_LENGTH:
+                self.max_length = int(value)
+            elif filter_type == FILTER_SENDER:
+                if value.lstrip("-").isdigit():
+                    self.blocked_ids.add(int(value))
+                else:
+                    self.blocked_usernames.add(value.lstrip("@").lower())
+            elif filter_type == FILTER_BOTS:
+                self.skip_bots = value == "1"
+            elif filter_type == FILTER_FORWARDS:
+                self.forwards = value
+
+        self.negative = KeywordMatcher(negative) if negative else None
+        self.rejected = {}  # {причина: количество отброшенных сообщений}
+
+    def check(self, message, text):
+        """
+        Проверяет сообщение по правилам (дешёвые проверки — первыми).
+
+        :param message: (Message) Сообщение Telethon.
+        :param text: (str) Текст сообщения (для альбома — объединённый текст частей).
+        :return: (str | None) Причина отказа или None, если сообщение проходит фильтр.
+        """
+        if len(text) < self.min_length:
+            return FILTER_MIN_LENGTH
+        if self.max_length is not None and len(text) > self.max_length:
+            return FILTER_MAX_LENGTH
+
+        if self.forwards is not None and (message.fwd_from is not None) != (self.forwards == FORWARDS_ONLY):
+            return FILTER_FORWARDS
+
+        # Отправитель проверяется только по уже загруженным данным, без запросов к Telegram
+        sender = getattr(message, "sender", None)
+        if message.sender_id in self.blocked_ids:
+            return FILTER_SENDER
+        if self.blocked_usernames and (getattr(sender, "username", None) or "").lower() in self.blocked_usernames:
+            return FILTER_SENDER
+        if self.skip_bots and (message.via_bot_id or getattr(sender, "bot", False)):
+            return FILTER_BOTS
+
+        if self.negative is not None and self.negative.contains_word(normalize_text(text)):
+            return FILTER_NEGATIVE
+        return None
+
+    def rejects(self, message, text):
+        """
+        Проверяет сообщение и учитывает отказ в счётчиках.
+
+        :return: (bool) True, если сообщение нужно отбросить.
+        """
+        reason = self.check(message, text)
+        if reason is None:
+            return False
+        self.rejected[reason] = self.rejected.get(reason, 0) + 1
+        return True
+
+
+# 🧹 Фильтры пользователей с запущенным отслеживанием
+message_filters = {}  # {user_id: MessageFilter} — только для пользователей, у которых есть правила
+_tracked_users = set()  # Пользователи с запущенным отслеживанием (для обновления фильтра при изменении правил)
+
+
+def parse_filter_rules(text):
+    """
+    Разбирает правила фильтрации, введённые пользователем (по одному на строку).
+
+    - `-слово` — минус-слово или фраза (целые слова);
+    - `мин 20` / `макс 2000` — ограничения длины текста;
+    - `блок 123456789` / `блок @username` — заблокированный отправитель;
+    - `без ботов` — пропускать сообщения ботов;
+    - `только пересланные` / `только оригиналы`.
+
+    :param text: (str) Введённый текст.
+    :return: tuple (list[tuple[str, str]] правила, list[str] нераспознанные строки)
+    """
+    rules, invalid = [], []
+    for line in (line.strip() for line in text.splitlines()):
+        if not line:
+            continue
+        lowered = line.lower()
+        command, _, value = lowered.partition(" ")
+        value = value.strip()
+
+        if line.startswith("-") and normalize_keyword(line[1:]):
+            rules.append((FILTER_NEGATIVE, line[1:].strip()))
+        elif lowered in FORWARDS_COMMANDS:
+            rules.append((FILTER_FORWARDS, FORWARDS_COMMANDS[lowered]))
+        elif lowered in BOTS_COMMANDS:
+            rules.append((FILTER_BOTS, "1"))
+        elif command in RULE_COMMANDS and RULE_COMMANDS[command] == FILTER_SENDER and value:
+            rules.append((FILTER_SENDER, value))
+        elif command in RULE_COMMANDS and value.isdigit():
+            rules.append((RULE_COMMANDS[command], value))
+        else:
+            invalid.append(line)
+
+    # Для ограничений длины, ботов и пересланных действует последнее введённое значение
+    last = {filter_type: index for index, (filter_type, _) in enumerate(rules) if filter_type in SINGLE_VALUE_FILTERS}
+    rules = [
+        rule for index, rule in enumerate(rules) if rule[0] not in SINGLE_VALUE_FILTERS or last[rule[0]] == index
+    ]
+    return rules, invalid
+
+
+def format_filter_rules(rules):
+    """
+    Формирует описание правил фильтрации для пользователя.
+
+    :param rules: (list[tuple[str, str]]) Правила (вид, значение).
+    :return: (str) Текст (HTML).
+    """
+    if not rules:
+        return "не заданы"
+    lines = []
+    for filter_type, value in rules:
+        if filter_type == FILTER_NEGATIVE:
+            lines.append(f"➖ минус-слово: <code>{value}</code>")
+        elif filter_type == FILTER_MIN_LENGTH:
+            lines.append(f"📏 не короче {value} символов")
+        elif filter_type == FILTER_MAX_LENGTH:
+            lines.append(f"📏 не длиннее {value} символов")
+        elif filter_type == FILTER_SENDER:
+            lines.append(f"🚫 отправитель: <code>{value}</code>")
+        elif filter_type == FILTER_BOTS:
+            lines.append("🤖 без сообщений ботов")
+        elif filter_type == FILTER_FORWARDS:
+            lines.append("🔁 только пересланные" if value == FORWARDS_ONLY else "🔁 только оригиналы")
+    return "\n".join(lines)
+
+
+def register_user_filter(user_id):
+    """
+    Загружает правила фильтрации пользователя из базы данных и компилирует фильтр (при запуске отслеживания).
+
+    :param user_id: (int | str) Идентификатор пользователя Telegram.
+    :return: (int) Количество правил.
+    """
+    _tracked_users.add(str(user_id))
+    rules = get_user_filters(user_id=user_id)
+    if rules:
+        message_filters[str(user_id)] = MessageFilter(rules)
+        logger.info(f"🧹 Фильтр сообщений user_id={user_id} загружен: правил={len(rules)}")
+    else:
+        message_filters.pop(str(user_id), None)
+    return len(rules)
+
+
+def refresh_user_filter(user_id):
+    """
+    Обновляет фильтр пользователя после изменения правил.
+
+    Если отслеживание у пользователя не запущено, ничего не делает — правила будут загружены при запуске.
+
+    :param user_id: (int | str) Идентификатор пользователя Telegram.
+    :return: None
+    """
+    if str(user_id) in _tracked_users:
+        register_user_filter(user_id)
+
+
+def unregister_user_filter(user_id):
+    """Удаляет фильтр пользователя (при остановке отслеживания)."""
+    _tracked_users.discard(str(user_id))
+    message_filters.pop(str(user_id), None)
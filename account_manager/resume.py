@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from loguru import logger  # https://github.com/Delgan/loguru
+
+from core.config import backfill_limit, backfill_delay, backfill_max_age
+from database.database import get_channel_cursors, save_channel_cursors
+from system.dispatcher import bot
+
+
+class UserNotifier:
+    """
+    Замена объекта Message aiogram для сессий, запущенных без сообщения пользователя (возобновление после
+    перезапуска бота). Поддерживает `answer`, которым сессия отслеживания уведомляет пользователя.
+
+    :param user_id: (int) Идентификатор пользователя Telegram (чат с ботом).
+    """
+
+    def __init__(self, user_id):
+        self.user_id = int(user_id)
+
+    async def answer(self, text, reply_markup=None, parse_mode=None, **kwargs):
+        """Отправляет сообщение пользователю от имени бота."""
+        try:
+            return await bot.send_message(
+                chat_id=self.user_id, text=text, reply_markup=reply_markup, parse_mode=parse_mode, **kwargs
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Не удалось отправить уведомление пользователю {self.user_id}: {e}")
+
+
+class ChannelCursorTracker:
+    """
+    Хранит ID последнего обработанного сообщения по каждому каналу пользователя.
+
+    Обновления накапливаются в памяти и сохраняются в таблицу `ChannelCursor` раз в `flush_interval` секунд
+    одной транзакцией (и при остановке), чтобы не писать в SQLite на каждое сообщение.
+
+    Позиция не сохраняется дальше сообщений, которые ещё ожидают обработки (`hold`, например части
+    накапливаемого медиа-альбома): после перезапуска такие сообщения будут догружены.
+
+    :param user_id: (int | str) Идентификатор пользователя Telegram.
+    :param flush_interval: (float) Период сохранения в базу данных, секунд.
+    :param hold: (callable | None) `hold(chat_id)` — наименьший ID ещё не обработанного сообщения чата или None.
+    """
+
+    def __init__(self, user_id, flush_interval=30, hold=None):
+        self.user_id = int(user_id)
+        self.flush_interval = flush_interval
+        self.hold = hold
+        self.last_ids = get_channel_cursors(user_id=self.user_id)  # Состояние на момент запуска
+        self._dirty = {}  # {chat_id: message_id} — ещё не сохранённые обновления
+        self._task = None
+
+    def update(self, chat_id, message_id):
+        """Запоминает обработанное сообщение канала."""
+        if message_id > self._dirty.get(chat_id, 0):
+            self._dirty[chat_id] = message_id
+
+    def flush(self):
+        """Сохраняет накопленные обновления в базу данных."""
+        dirty, self._dirty = self._dirty, {}
+        cursors = {}
+        for chat_id, message_id in dirty.items():
+            held = self.hold(chat_id) if self.hold is not None else None
+            if held is not None and held <= message_id:
+                self._dirty[chat_id] = message_id  # Остальное сохраним после обработки ожидающих сообщений
+                message_id = held - 1
+            cursors[chat_id] = message_id
+        try:
+            save_channel_cursors(user_id=self.user_id, cursors=cursors)
+        except Exception as e:
+            logger.warning(f"⚠️ Не удалось сохранить позиции каналов user_id={self.user_id}: {e}")
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            self.flush()
+
+    def start(self):
+        """Запускает периодическое сохранение."""
+        self._task = asyncio.create_task(self._flush_periodically())
+
+    async def stop(self):
+        """Останавливает периодическое сохранение и сохраняет остаток."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self.flush()
+
+
+async def backfill_missed_messages(client, cursors, process, limit=backfill_limit, delay=backfill_delay,
+                                   max_age=backfill_max_age):
+    """
+    Догружает сообщения, опубликованные в каналах за время простоя, и передаёт их в обычную обработку.
+
+    Для каждого канала с сохранённой позицией запрашиваются сообщения новее неё (`iter_messages(min_id=...)`),
+    от старых к новым.
+
+    - Не более `limit` сообщений на канал (один запрос истории на канал).
+    - Сообщения старше `max_age` часов пропускаются.
+    - Между каналами выдерживается пауза `delay` секунд, чтобы не упереться в FloodWait.
+    - Ошибка в одном канале не прерывает догрузку остальных.
+
+    :param client: (TelegramClient) Клиент Telethon.
+    :param cursors: (dict) {chat_id: last_message_id} — позиции на момент запуска.
+    :param process: (coroutine function) Обработчик сообщения: `process(chat_id, message)`.
+    :param limit: (int) Максимум сообщений на канал.
+    :param delay: (float) Пауза между каналами, секунд.
+    :param max_age: (int) Максимальный возраст догружаемых сообщений, часов.
+    :return: (int) Количество обработанных сообщений.
+    """
+    if not cursors:
+        return 0
+
+    oldest = datetime.now(timezone.utc) - timedelta(hours=max_age)
+    total = 0
+    logger.info(f"⏪ Догрузка пропущенных сообщений: каналов {len(cursors)}, до {limit} сообщений на канал")
+
+    for chat_id, last_message_id in cursors.items():
+        try:
+            messages = [
+                msg async for msg in client.iter_messages(chat_id, min_id=last_message_id, limit=limit)
+                if msg.date is None or msg.date >= oldest
+            ]
+            for msg in reversed(messages):  # iter_messages отдаёт от новых к старым
+                await process(chat_id, msg)
+            total += len(messages)
+            if messages:
+                logger.info(f"⏪ Канал {chat_id}: догружено сообщений {len(messages)}")
+        except Exception as e:
+            logger.warning(f"⚠️ Не удалось догрузить сообщения канала {chat_id}: {e}")
+        await asyncio.sleep(delay)
+
+    logger.info(f"⏪ Догрузка завершена, обработано сообщений: {total}")
+    return total
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+import re
+
+from loguru import logger  # https://github.com/Delgan/loguru
+
+from account_manager.subscription import resolve_peer_id, subscription_telegram
+from database.database import get_user_routes
+
+ROUTE_ARROW_RE = re.compile(r"\s*(?:->|→|=>)\s*")
+
+
+class RoutingTable:
+    """
+    Таблица маршрутизации найденных сообщений пользователя: ключевое слово → целевые группы.
+
+    Строится один раз при запуске отслеживания: целевые группы маршрутов разрешаются в ID и аккаунт подписывается
+    на них заранее, поэтому при совпадении выбор получателей — поиск в словаре без запросов к Telegram.
+
+    - Сообщение пересылается во все группы маршрутов найденных ключевых слов (каждая группа — один раз).
+    - Ключевые слова без маршрута ведут в основную целевую группу пользователя.
+
+    :param default_target: (int) ID основной целевой группы.
+    :param routes: (dict) {ключевое слово в нижнем регистре: list[int] ID целевых групп}.
+    """
+
+    def __init__(self, default_target, routes=None):
+        self.default_target = default_target
+        self.routes = routes or {}
+
+    def __len__(self):
+        return len(self.routes)
+
+    def targets_for(self, keywords):
+        """
+        Возвращает целевые группы для найденных ключевых слов.
+
+        :param keywords: (Iterable[str]) Найденные ключевые слова.
+        :return: list[int] ID целевых групп без повторов.
+        """
+        targets = {}
+        for keyword in keywords:
+            for target in self.routes.get(keyword.casefold(), (self.default_target,)):
+                targets[target] = None
+        return list(targets) or [self.default_target]
+
+
+async def build_routing_table(client, user_id, default_target):
+    """
+    Загружает маршруты пользователя и подписывает аккаунт на их целевые группы.
+
+    Группа, к которой не удалось подключиться, пропускается: её ключевые слова ведут в основную группу.
+
+    :param client: (TelegramClient) Аккаунт, через который пересылаются сообщения пользователя.
+    :param user_id: (int | str) Идентификатор пользователя Telegram.
+    :param default_target: (int) ID основной целевой группы.
+    :return: (RoutingTable) Таблица маршрутизации.
+    """
+    routes = get_user_routes(user_id=user_id)
+    resolved = {}  # {целевая группа: ID}
+    for target in dict.fromkeys(target for _, target in routes):
+        try:
+            await subscription_telegram(client, target)
+            resolved[target] = await resolve_peer_id(client, target)
+        except Exception as e:
+            logger.warning(f"⚠️ Не удалось подключиться к группе маршрута {target} user_id={user_id}: {e}")
+
+    table = {}
+    for keyword, target in routes:
+        if target in resolved:
+            targets = table.setdefault(keyword.strip().casefold(), [])
+            if resolved[target] not in targets:
+                targets.append(resolved[target])
+
+    if table:
+        logger.info(f"🧭 Маршруты пересылки user_id={user_id}: ключевых слов={len(table)}, групп={len(resolved)}")
+    return RoutingTable(default_target, table)
+
+
+def parse_route_rules(text):
+    """
+    Разбирает маршруты, введённые пользователем (по одному на строку).
+
+    Формат строки: `ключевое слово, другое слово -> @группа1, @группа2`.
+
+    :param text: (str) Введённый текст.
+    :return: tuple (list[tuple[str, str]] маршруты (ключевое слово, группа), list[str] нераспознанные строки)
+    """
+    routes, invalid = [], []
+    for line in (line.strip() for line in text.splitlines()):
+        if not line:
+            continue
+        parts = ROUTE_ARROW_RE.split(line)
+        keywords = [keyword.strip() for keyword in parts[0].split(",") if keyword.strip()] if len(parts) == 2 else []
+        targets = [target.strip() for target in parts[1].split(",") if target.strip()] if len(parts) == 2 else []
+        if not keywords or not targets:
+            invalid.append(line)
+            continue
+        routes.extend((keyword, target) for keyword in keywords for target in targets)
+    return routes, invalid
+
+
+def format_route_rules(routes):
+    """
+    Формирует описание маршрутов для пользователя (группы одного ключевого слова — в одной строке).
+
+    :param routes: (list[tuple[str, str]]) Маршруты (ключевое слово, группа).
+    :return: (str) Текст (HTML).
+    """
+    if not routes:
+        return "не заданы — все сообщения пересылаются в основную группу"
+    by_keyword = {}
+    for keyword, target in routes:
+        by_keyword.setdefault(keyword, []).append(target)
+    return "\n".join(
+        f"🧭 <code>{keyword}</code> → {', '.join(targets)}" for keyword, targets in by_keyword.items()
+    )
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+import os
+
+from loguru import logger  # https://github.com/Delgan/loguru
+
+from core.config import channels_per_account
+from database.database import ChannelAssignment, db
+
+
+def list_session_files(session_dir):
+    """
+    Возвращает все файлы сессий (.session) пользователя.
+
+    :param session_dir: (str) Папка с сессиями пользователя (например, accounts/123456/).
+    :return: (list[str]) Полные пути к файлам сессий, отсортированные по имени.
+    """
+    if not os.path.isdir(session_dir):
+        return []
+    return sorted(
+        os.path.join(session_dir, file_name) for file_name in os.listdir(session_dir) if file_name.endswith(".session")
+    )
+
+
+def normalize_channel(channel):
+    """Приводит username канала к виду '@username' в нижнем регистре."""
+    return f"@{channel.strip().lstrip('@').lower()}"
+
+
+def assign_channels(user_id, channels, accounts, capacity=channels_per_account):
+    """
+    Распределяет каналы пользователя между его аккаунтами (не более `capacity` каналов на аккаунт).
+
+    Распределение «липкое» и сбалансированное:
+
+    1. Канал остаётся за аккаунтом, за которым он был закреплён ранее (если аккаунт подключён и в нём есть место).
+    2. Новый канал отдаётся аккаунту, который уже на него подписан (без лишней подписки).
+    3. Иначе — наименее загруженному аккаунту.
+
+    Каналы, для которых не нашлось места, возвращаются отдельно. Распределение сохраняется в `ChannelAssignment`.
+
+    :param user_id: (int | str) Идентификатор пользователя Telegram.
+    :param channels: (Iterable[str]) Username отслеживаемых каналов.
+    :param accounts: (dict) {имя файла сессии: set("@username" каналов, на которые аккаунт уже подписан)}.
+    :param capacity: (int) Максимум каналов на один аккаунт.
+    :return: tuple ({имя файла сессии: set("@username")}, list["@username"] — не распределённые каналы)
+    """
+    user_id = int(user_id)
+    ChannelAssignment.create_table(safe=True)
+    saved = {
+        row.username: row.session_name
+        for row in ChannelAssignment.select().where(ChannelAssignment.user_id == user_id)
+    }
+
+    assignment = {session_name: set() for session_name in accounts}
+    pending = []
+    for channel in sorted({normalize_channel(channel) for channel in channels if channel}):
+        session_name = saved.get(channel)
+        if session_name in assignment and len(assignment[session_name]) < capacity:
+            assignment[session_name].add(channel)
+        else:
+            pending.append(channel)
+
+    unassigned = []
+    for channel in pending:
+        free = [session_name for session_name in assignment if len(assignment[session_name]) < capacity]
+        if not free:
+            unassigned.append(channel)
+            continue
+        members = [session_name for session_name in free if channel in accounts[session_name]]
+        session_name = min(members or free, key=lambda name: len(assignment[name]))
+        assignment[session_name].add(channel)
+
+    rows = [
+        {"user_id": user_id, "username": channel, "session_name": session_name}
+        for session_name, assigned in assignment.items()
+        for channel in assigned
+    ]
+    with db.atomic():
+        ChannelAssignment.delete().where(ChannelAssignment.user_id == user_id).execute()
+        for start in range(0, len(rows), 100):
+            ChannelAssignment.insert_many(rows[start:start + 100]).execute()
+
+    logger.info(
+        f"🧩 Каналы user_id={user_id} распределены по аккаунтам: "
+        f"{', '.join(f'{name}={len(assigned)}' for name, assigned in assignment.items())}, "
+        f"без аккаунта: {len(unassigned)}"
+    )
+    return assignment, unassigned
@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+import asyncio
+from collections import OrderedDict
+
+from loguru import logger  # https://github.com/Delgan/loguru
+
+from account_manager.fuzzy import FuzzyIndex
+from account_manager.keyword_matcher import KeywordMatcher
+from account_manager.keyword_query import MatchContext, QueryError, compile_query
+from account_manager.normalizer import normalize_text
+from database.database import get_user_keywords
+
+
+class CompiledKeywords:
+    """
+    Автомат и индекс нечётких слов по ключевым словам набора пользователей.
+
+    :param user_keywords: (dict) {user_id: list[str]} Ключевые слова пользователей.
+    """
+
+    def __init__(self, user_keywords):
+        owners_by_pattern = {}
+        self.fuzzy = FuzzyIndex()  # Нечёткие слова пользователей
+        for user_id, keywords in user_keywords.items():
+            for keyword in keywords:
+                try:
+                    query = compile_query(keyword.strip())  # План запроса кешируется между перестроениями
+                except QueryError as e:
+                    logger.warning(f"⚠️ Ключевое слово «{keyword}» user_id={user_id} пропущено: {e}")
+                    continue
+                for atom_index, atom in enumerate(query.atoms):
+                    if atom.fuzzy:
+                        self.fuzzy.add(atom.fuzzy_forms, atom.fuzzy, (user_id, query.keyword, atom_index))
+                        continue
+                    owners_by_pattern.setdefault(atom.pattern, []).append((user_id, query.keyword, atom_index))
+
+        self.matcher = KeywordMatcher(owners_by_pattern.keys())
+        # Для каждого шаблона автомата: список (user_id, ключевое слово, номер атома запроса)
+        self.owners = [owners_by_pattern[pattern] for pattern in self.matcher.patterns]
+
+    def collect(self, normalized, full_text, hits, atom_hits, users):
+        """
+        Находит атомы ключевых слов в тексте.
+
+        :param normalized: (str) Нормализованный текст (`normalize_text`).
+        :param full_text: (str | None) Текст, нормализованный без стемминга (нужен, только если есть нечёткие слова).
+        :param hits: (dict) {user_id: set[str]} Сюда добавляются найденные обычные ключевые слова.
+        :param atom_hits: (dict) {(user_id, запрос): {номер атома: list[позиция]}} Сюда добавляются атомы запросов.
+        :param users: (Container) Пользователи, совпадения которых учитываются (остальные пропускаются).
+        :return: None
+        """
+        for end, index in self.matcher.iter_matches(normalized):
+            start = end - len(self.matcher.patterns[index]) + 1
+            for user_id, keyword, atom_index in self.owners[index]:
+                if user_id not in users:
+                    continue
+                query = compile_query(keyword)
+                if not query.accepts(atom_index, normalized, start):
+                    continue
+                if query.is_plain:
+                    hits.setdefault(user_id, set()).add(keyword)
+                else:
+                    atom_hits.setdefault((user_id, keyword), {}).setdefault(atom_index, []).append(start)
+        if len(self.fuzzy):
+            for start, (user_id, keyword, atom_index) in self.fuzzy.iter_matches(normalized, full_text):
+                if user_id in users:
+                    atom_hits.setdefault((user_id, keyword), {}).setdefault(atom_index, []).append(start)
+
+
+class SharedMatchIndex:
+    """
+    Общий для всего процесса индекс сопоставления сообщений с ключевыми словами всех пользователей.
+
+    Когда несколько пользователей отслеживают один и тот же канал, каждая их сессия Telethon получает одно и то же
+    сообщение. Индекс хранит единый автомат по объединению ключевых слов всех активных пользователей, выходы которого
+    сопоставлены парам (user_id, ключевое слово). Сообщение нормализуется и сканируется один раз — первой сессией,
+    которая его получила; остальные сессии берут готовый результат из кеша и получают только свои совпадения.
+
+    Ключевые слова и текст проходят одну и ту же нормализацию (`normalize_text`: регистр, «ё», буквы-двойники,
+    облегчённый стемминг), поэтому одно ключевое слово находит все формы слова, а стоимость поиска остаётся
+    линейной по длине сообщения.
+
+    Ключевое слово может быть запросом (`вакансия AND python NOT senior`, см. `KeywordQuery`): в автомат попадают
+    атомы запроса, а сам запрос вычисляется по их совпадениям после прохода по тексту. Слова с опечатками
+    (`слово~`) вместо автомата попадают в общий индекс удалений `FuzzyIndex`.
+
+    Изменение набора ключевых слов одного пользователя не останавливает остальные сессии:
+
+    - для изменившегося пользователя сразу строится собственный небольшой автомат (только его слова), которым
+      сообщения сканируются до перестроения общего;
+    - его записи в общем автомате с этого момента не учитываются;
+    - общий автомат перестраивается в фоновом потоке и подменяется целиком, когда готов; изменения, пришедшие
+      во время перестроения, попадают в следующее.
+
+    Совпадения собираются только для пользователей, отслеживающих чат сообщения (индекс «чат → пользователи»),
+    поэтому стоимость разбора совпадений зависит от подписчиков чата, а не от всех пользователей процесса.
+    Пользователь попадает в индекс чата при первом сообщении этого чата, которое передаёт его сессия
+    (`match_for_user`), и удаляется из всех чатов при остановке отслеживания (`unregister_user`). Если пользователь
+    добавился в чат после сканирования сообщения, сообщение досканируется только для него.
+
+    Кеш результатов ограничен по размеру (старые записи вытесняются).
+
+    :param cache_size: (int) Максимальное количество сообщений в кеше результатов сканирования.
+    """
+
+    def __init__(self, cache_size=4096):
+        self.cache_size = cache_size
+        self._user_keywords = {}  # {user_id: list[str]}
+        self._versions = {}  # {user_id: номер изменения набора ключевых слов}
+        self._version = 0
+        self._shared = CompiledKeywords({})  # Общий автомат (снимок наборов на момент построения)
+        self._overlays = {}  # {user_id: CompiledKeywords} — пользователи, изменившиеся после построения общего
+        self._stale = set()  # Пользователи, записи которых в общем автомате устарели
+        self._rebuild_task = None
+        self._channel_users = {}  # {chat_id: set(user_id)} — пользователи, отслеживающие чат
+        # {(chat_id, message_id, hash(text)): (set(user_id) просканированные, нормализованный текст, {user_id: set[str]})}
+        self._scan_cache = OrderedDict()
+        self.scans = 0  # Количество фактических сканирований
+        self.cache_hits = 0  # Количество повторных обращений, обслуженных из кеша
+        self.rebuilds = 0  # Количество перестроений общего автомата
+
+    def is_registered(self, user_id):
+        return str(user_id) in self._user_keywords
+
+    def set_user_keywords(self, user_id, keywords):
+        """
+        Регистрирует (или обновляет) набор ключевых слов пользователя.
+
+        :param user_id: (int | str) Идентификатор пользователя Telegram.
+        :param keywords: (list[str]) Ключевые слова пользователя.
+        :return: None
+        """
+        user_id = str(user_id)
+        self._user_keywords[user_id] = [keyword for keyword in keywords if keyword and keyword.strip()]
+        self._overlays[user_id] = CompiledKeywords({user_id: self._user_keywords[user_id]})
+        self._changed(user_id)
+
+    def remove_user(self, user_id):
+        """
+        Удаляет пользователя из индекса.
+
+        :param user_id: (int | str) Идентификатор пользователя Telegram.
+        :return: None
+        """
+        user_id = str(user_id)
+        if self._user_keywords.pop(user_id, None) is not None:
+            self._overlays.pop(user_id, None)
+            self._changed(user_id)
+        for chat_id in list(self._channel_users):
+            users = self._channel_users[chat_id]
+            users.discard(user_id)
+            if not users:
+                del self._channel_users[chat_id]
+
+    def add_user_channel(self, user_id, chat_id):
+        """
+        Отмечает, что пользователь отслеживает чат.
+
+        :param user_id: (int | str) Идентификатор пользователя Telegram.
+        :param chat_id: (int) Идентификатор чата.
+        :return: None
+        """
+        self._channel_users.setdefault(chat_id, set()).add(str(user_id))
+
+    def _changed(self, user_id):
+        """Исключает устаревшие записи пользователя из общего автомата и запускает его перестроение."""
+        self._version += 1
+        self._versions[user_id] = self._version
+        self._stale.add(user_id)
+        self._scan_cache.clear()
+        self._schedule_rebuild()
+
+    def _schedule_rebuild(self):
+        """Запускает перестроение общего автомата в фоновом потоке (без цикла событий — сразу)."""
+        if self._rebuild_task is not None and not self._rebuild_task.done():
+            return  # Изменения попадут в следующее перестроение
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._install(*self._snapshot(), CompiledKeywords(self._user_keywords))
+            return
+        self._rebuild_task = loop.create_task(self._rebuild())
+
+    def _snapshot(self):
+        return dict(self._user_keywords), dict(self._versions)
+
+    async def _rebuild(self):
+        while self._stale:
+            user_keywords, versions = self._snapshot()
+            try:
+                compiled = await asyncio.to_thread(CompiledKeywords, user_keywords)
+            except Exception as e:
+                logger.exception(f"❌ Ошибка перестроения общего индекса ключевых слов: {e}")
+                return
+            self._install(user_keywords, versions, compiled)
+
+    def _install(self, user_keywords, versions, compiled):
+        """Подменяет общий автомат; пользователи, изменившиеся во время построения, остаются на своих автоматах."""
+        self._shared = compiled
+        self._stale = {user_id for user_id, version in self._versions.items() if versions.get(user_id) != version}
+        self._overlays = {user_id: overlay for user_id, overlay in self._overlays.items() if user_id in self._stale}
+        self._versions = {
+            user_id: version for user_id, version in self._versions.items()
+            if user_id in self._user_keywords or user_id in self._stale
+        }
+        self._scan_cache.clear()
+        self.rebuilds += 1
+        logger.info(
+            f"🧩 Общий индекс ключевых слов перестроен: пользователей={len(user_keywords)}, "
+            f"шаблонов={len(compiled.matcher)}, нечётких слов={len(compiled.fuzzy)}"
+        )
+
+    def _scan(self, chat_id, message_id, text):
+        """
+        Сканирует текст сообщения один раз для всех пользователей, отслеживающих чат (с кешированием результата).
+
+        :return: dict {user_id: set[str]} Совпадения пользователей чата.
+        """
+        users = self._channel_users.get(chat_id, set())
+        cache_key = (chat_id, message_id, hash(text))
+        cached = self._scan_cache.get(cache_key)
+        if cached is not None:
+            scanned, normalized, hits = cached
+            self._scan_cache.move_to_end(cache_key)
+            missing = users - scanned
+            if not missing:
+                self.cache_hits += 1
+                return hits
+            scanned |= missing  # Пользователи, добавившиеся в чат после сканирования: досканируем только их
+            self._collect(text, normalized, hits, missing)
+            return hits
+
+        hits = {}
+        normalized = normalize_text(text)  # Нормализуем текст один раз для всех пользователей
+        self._collect(text, normalized, hits, users)
+
+        self.scans += 1
+        self._scan_cache[cache_key] = (set(users), normalized, hits)
+        if len(self._scan_cache) > self.cache_size:
+            self._scan_cache.popitem(last=False)
+        return hits
+
+    def _collect(self, text, normalized, hits, users):
+        """Добавляет в `hits` совпадения указанных пользователей."""
+        atom_hits = {}  # {(user_id, запрос): {номер атома: list[позиция]}}
+        overlays = [overlay for user_id, overlay in self._overlays.items() if user_id in users]
+        full_text = None
+        if len(self._shared.fuzzy) or any(len(overlay.fuzzy) for overlay in overlays):
+            full_text = normalize_text(text, stemming=False)  # Полные формы слов — для поиска опечаток в окончаниях
+        self._shared.collect(normalized, full_text, hits, atom_hits, users=users - self._stale)
+        for overlay in overlays:
+            overlay.collect(normalized, full_text, hits, atom_hits, users=users)
+
+        # Запросы вычисляются только при совпадении хотя бы одного их атома
+        for (user_id, keyword), query_hits in atom_hits.items():
+            if compile_query(keyword).evaluate(MatchContext(normalized, query_hits)):
+                hits.setdefault(user_id, set()).add(keyword)
+
+    def match_for_user(self, user_id, chat_id, message_id, text):
+        """
+        Возвращает ключевые слова пользователя, найденные в сообщении.
+
+        Пользователь отмечается как отслеживающий чат (`add_user_channel`): его сессия получает сообщения этого чата.
+
+        :param user_id: (int | str) Идентификатор пользователя Telegram.
+        :param chat_id: (int) Идентификатор чата-источника.
+        :param message_id: (int) Идентификатор сообщения.
+        :param text: (str) Исходный текст сообщения.
+        :return: set[str]
+        """
+        if not text or not self.is_registered(user_id):
+            return set()
+        self.add_user_channel(user_id, chat_id)
+        return self._scan(chat_id, message_id, text).get(str(user_id), set())
+
+
+# 🧠 Единый индекс для всех сессий отслеживания процесса
+shared_index = SharedMatchIndex()
+
+
+def register_user_keywords(user_id):
+    """
+    Загружает ключевые слова пользователя из базы данных и регистрирует их в общем индексе.
+
+    Вызывается при запуске отслеживания.
+
+    :param user_id: (int | str) Идентификатор пользователя Telegram.
+    :return: (int) Количество зарегистрированных ключевых слов.
+    """
+    keywords = get_user_keywords(user_id=user_id)
+    shared_index.set_user_keywords(user_id, keywords)
+    logger.info(f"🧩 Ключевые слова user_id={user_id} добавлены в общий индекс: {len(keywords)}")
+    return len(keywords)
+
+
+def refresh_user_keywords(user_id):
+    """
+    Обновляет ключевые слова пользователя в общем индексе после изменения набора (добавление или удаление).
+
+    Если отслеживание у пользователя не запущено, ничего не делает — слова будут загружены при запуске.
+
+    :param user_id: (int | str) Идентификатор пользователя Telegram.
+    :return: None
+    """
+    if shared_index.is_registered(user_id):
+        register_user_keywords(user_id)
+
+
+def unregister_user(user_id):
+    """
+    Удаляет пользователя из общего индекса (при остановке отслеживания).
+
+    :param user_id: (int | str) Идентификатор пользователя Telegram.
+    :return: None
+    """
+    shared_index.remove_user(user_id)
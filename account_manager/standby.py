@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import os
+import time
+
+from loguru import logger  # https://github.com/Delgan/loguru
+
+from core.config import heartbeat_interval, heartbeat_timeout
+
+STANDBY_DIR = "standby"  # Подпапка accounts/{user_id}/ с сессией резервного аккаунта
+
+
+def find_standby_session(session_dir):
+    """
+    Возвращает файл сессии резервного аккаунта пользователя.
+
+    :param session_dir: (str) Папка с сессиями пользователя (например, accounts/123456/).
+    :return: (str | None) Полный путь к файлу сессии или None, если резервный аккаунт не подключён.
+    """
+    standby_dir = os.path.join(session_dir, STANDBY_DIR)
+    if not os.path.isdir(standby_dir):
+        return None
+    for file_name in sorted(os.listdir(standby_dir)):
+        if file_name.endswith(".session"):
+            return os.path.join(standby_dir, file_name)
+    return None
+
+
+class StandbyMonitor:
+    """
+    Следит за потоком обновлений основного аккаунта и переключает пересылку на резервный аккаунт.
+
+    Резервный аккаунт подписан на те же каналы и слушает их параллельно с основным; повторная пересылка
+    исключается дедупликацией по (чат, ID сообщения). Монитор раз в `interval` секунд сравнивает время
+    последних событий обоих аккаунтов:
+
+    - если основной аккаунт отключён или не получил ни одного события за `timeout` секунд, в течение которых
+      резервный события получал, очередь пересылок переключается на резервный аккаунт;
+    - когда основной аккаунт снова получает события, пересылка возвращается на него.
+
+    :param primary: (TelegramClient) Клиент основного аккаунта.
+    :param standby: (TelegramClient) Клиент резервного аккаунта.
+    :param forwarding_queue: (ForwardingQueue) Очередь пересылок пользователя.
+    :param notify: (coroutine function) Уведомление пользователя: `notify(text)`.
+    :param interval: (float) Период проверки, секунд.
+    :param timeout: (float) Сколько секунд без событий считается остановкой потока обновлений.
+    """
+
+    def __init__(self, primary, standby, forwarding_queue, notify, interval=heartbeat_interval,
+                 timeout=heartbeat_timeout):
+        self.primary = primary
+        self.standby = standby
+        self.forwarding_queue = forwarding_queue
+        self.notify = notify
+        self.interval = interval
+        self.timeout = timeout
+        now = time.monotonic()
+        self.primary_seen = now
+        self.standby_seen = now
+        self.promoted = False
+        self.promoted_at = None
+        self.failovers = 0
+
+    def beat_primary(self):
+        """Отмечает событие, полученное основным аккаунтом."""
+        self.primary_seen = time.monotonic()
+
+    def beat_standby(self):
+        """Отмечает событие, полученное резервным аккаунтом."""
+        self.standby_seen = time.monotonic()
+
+    def primary_stalled(self):
+        """Проверяет, остановился ли поток обновлений основного аккаунта."""
+        if not self.primary.is_connected():
+            return True
+        now = time.monotonic()
+        return now - self.primary_seen > self.timeout and now - self.standby_seen < self.timeout
+
+    async def run(self):
+        """Цикл проверки (запускается фоновой задачей на время сессии отслеживания)."""
+        while True:
+            await asyncio.sleep(self.interval)
+
+            if not self.promoted and self.primary_stalled() and self.standby.is_connected():
+                self.promoted = True
+                self.promoted_at = time.monotonic()
+                self.failovers += 1
+                self.forwarding_queue.client = self.standby
+                logger.warning("🛡 Основной аккаунт не получает обновления — пересылка переключена на резервный")
+                await self.notify("🛡 Основной аккаунт не получает обновления. Пересылка переключена на резервный.")
+
+            elif self.promoted and self.primary.is_connected() and self.primary_seen > self.promoted_at:
+                self.promoted = False
+                self.forwarding_queue.client = self.primary
+                logger.info("🛡 Основной аккаунт снова получает обновления — пересылка возвращена на него")
+                await self.notify("✅ Основной аккаунт снова получает обновления. Пересылка возвращена на него.")
@@ -2,11 +2,14 @@
 import asyncio
 
 from loguru import logger  # https://github.com/Delgan/loguru
+from telethon import utils
 from telethon.errors import (
     UserAlreadyParticipantError, FloodWaitError, InviteRequestSentError, AuthKeyUnregisteredError
 )
 from telethon.tl.functions.channels import JoinChannelRequest
 
+from account_manager.peer_cache import peer_cache
+
 
 async def subscription_telegram(client, target_username):
     """
@@ -45,3 +48,43 @@ async def subscription_telegram(client, target_username):
     except Exception as e:
         logger.exception(e)
         return None
+
+
+async def resolve_peer_id(client, peer):
+    """
+    Разрешает сущность именно этим клиентом и возвращает её маркированный ID.
+
+    ID из общего кеша метаданных мог быть получен другим аккаунтом или загружен из SQLite, а отправить сообщение
+    по ID клиент может, только если сущность (с его access_hash) есть в его сессии. `get_input_entity` берёт
+    сущность из сессии клиента, а при её отсутствии запрашивает у Telegram и сохраняет в сессию.
+
+    :param client: (TelegramClient) Клиент, который будет отправлять сообщения.
+    :param peer: (int | str) @username, ссылка или маркированный ID.
+    :return: (int) Маркированный ID.
+    """
+    return utils.get_peer_id(await client.get_input_entity(peer))
+
+
+async def get_subscribed_channels(client):
+    """
+    Быстро получает супергруппы и каналы, в которых аккаунт уже состоит.
+
+    Использует только список диалогов (`iter_dialogs` отдаёт сущности вместе с диалогами), без запросов
+    по каждому каналу, поэтому отслеживание запускается за секунды даже при сотнях диалогов.
+    Сущности сохраняются в общий кеш метаданных.
+
+    :param client: (TelegramClient) Активный клиент Telethon.
+    :return: tuple (dict {"@username": маркированный ID}, list[Channel] — все супергруппы и каналы)
+    """
+    subscribed = {}
+    entities = []
+    async for dialog in client.iter_dialogs():
+        entity = dialog.entity
+        # Пропускаем личные чаты и обычные группы
+        if not getattr(entity, 'megagroup', False) and not getattr(entity, 'broadcast', False):
+            continue
+        peer_cache.remember(entity)  # Прогреваем общий кеш метаданных
+        entities.append(entity)
+        if entity.username:
+            subscribed[f"@{entity.username.lower()}"] = dialog.id
+    return subscribed, entities
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import time
+
+from loguru import logger  # https://github.com/Delgan/loguru
+
+from core.config import restart_max_attempts, restart_base_delay
+
+RESTART_MAX_DELAY = 300  # Максимальная задержка перед перезапуском, секунд
+STABLE_RUN_SECONDS = 600  # Сессия, проработавшая дольше, сбрасывает счётчик перезапусков
+
+
+class TrackingSession:
+    """
+    Состояние сессии отслеживания одного пользователя, управляемой `TrackingSupervisor`.
+
+    :param user_id: (str) Идентификатор пользователя Telegram.
+    :param factory: (callable) Функция без аргументов, возвращающая корутину сессии (например, `filter_messages`).
+    """
+
+    def __init__(self, user_id, factory):
+        self.user_id = user_id
+        self.factory = factory
+        self.task = None
+        self.state = "starting"  # starting → running → restarting / stopping → stopped / failed
+        self.started_at = time.time()
+        self.restarts = 0
+        self.last_error = None
+
+    def uptime(self):
+        """Время работы сессии в секундах."""
+        return int(time.time() - self.started_at)
+
+
+class TrackingSupervisor:
+    """
+    Управляет сессиями отслеживания как фоновыми задачами asyncio.
+
+    - Для каждого пользователя допускается только одна сессия: повторный запуск отклоняется.
+    - Остановка отменяет задачу сессии: отмена прерывает любое ожидание (подписку на каналы, паузу между
+      подписками, FloodWait, прослушивание), а очистка ресурсов выполняется в `finally` самой сессии.
+    - Если сессия завершилась исключением, она перезапускается с экспоненциальной задержкой
+      (`restart_base_delay` · 2ⁿ, не более RESTART_MAX_DELAY) до `max_restarts` раз подряд.
+      Штатное завершение сессии (например, нет каналов или целевой группы) перезапуска не вызывает.
+
+    :param max_restarts: (int) Максимум перезапусков подряд после сбоев.
+    :param base_delay: (float) Начальная задержка перед перезапуском, секунд.
+    """
+
+    def __init__(self, max_restarts=restart_max_attempts, base_delay=restart_base_delay):
+        self.max_restarts = max_restarts
+        self.base_delay = base_delay
+        self._sessions = {}  # {user_id: TrackingSession}
+
+    def is_running(self, user_id):
+        """Проверяет, есть ли у пользователя активная сессия отслеживания."""
+        return str(user_id) in self._sessions
+
+    def start(self, user_id, factory):
+        """
+        Запускает сессию отслеживания пользователя в фоновой задаче.
+
+        :param user_id: (int | str) Идентификатор пользователя Telegram.
+        :param factory: (callable) Функция без аргументов, возвращающая корутину сессии.
+        :return: (bool) True, если сессия запущена; False, если у пользователя уже есть активная сессия.
+        """
+        user_id = str(user_id)
+        if user_id in self._sessions:
+            logger.warning(f"⚠️ Отслеживание для user_id={user_id} уже запущено, повторный запуск отклонён")
+            return False
+
+        session = TrackingSession(user_id=user_id, factory=factory)
+        self._sessions[user_id] = session
+        session.task = asyncio.create_task(self._run(session), name=f"tracking-{user_id}")
+        logger.info(f"🚀 Сессия отслеживания user_id={user_id} запущена (активных сессий: {len(self._sessions)})")
+        return True
+
+    async def _run(self, session):
+        try:
+            while True:
+                session.state = "running"
+                run_started = time.monotonic()
+                try:
+                    await session.factory()
+                    session.state = "stopped"
+                    return
+                except Exception as e:
+                    session.last_error = f"{type(e).__name__}: {e}"
+                    if time.monotonic() - run_started > STABLE_RUN_SECONDS:
+                        session.restarts = 0  # Сессия работала стабильно — считаем сбой первым
+
+                    if session.restarts >= self.max_restarts:
+                        session.state = "failed"
+                        logger.error(
+                            f"❌ Сессия user_id={session.user_id} остановлена после {session.restarts} перезапусков: {e}"
+                        )
+                        return
+
+                    delay = min(RESTART_MAX_DELAY, self.base_delay * 2 ** session.restarts)
+                    session.restarts += 1
+                    session.state = "restarting"
+                    logger.warning(
+                        f"🔁 Сбой сессии user_id={session.user_id}: {e}. "
+                        f"Перезапуск {session.restarts}/{self.max_restarts} через {delay} сек."
+                    )
+                    await asyncio.sleep(delay)
+        finally:
+            if self._sessions.get(session.user_id) is session:
+                del self._sessions[session.user_id]
+
+    async def stop(self, user_id, timeout=30):
+        """
+        Останавливает сессию отслеживания пользователя и дожидается очистки ресурсов.
+
+        :param user_id: (int | str) Идентификатор пользователя Telegram.
+        :param timeout: (float) Максимальное время ожидания завершения сессии, секунд.
+        :return: (bool) True, если сессия была активна; False, если отслеживание не запущено.
+        """
+        session = self._sessions.get(str(user_id))
+        if session is None:
+            return False
+
+        session.state = "stopping"
+        session.task.cancel()
+        try:
+            await asyncio.wait_for(asyncio.shield(session.task), timeout=timeout)
+        except asyncio.CancelledError:
+            pass
+        except asyncio.TimeoutError:
+            logger.warning(f"⚠️ Сессия user_id={user_id} не завершилась за {timeout} сек.")
+        logger.info(f"🛑 Сессия отслеживания user_id={user_id} остановлена")
+        return True
+
+    async def shutdown(self):
+        """Останавливает все сессии (при завершении работы бота)."""
+        await asyncio.gather(*(self.stop(user_id) for user_id in list(self._sessions)), return_exceptions=True)
+
+    def status(self):
+        """
+        Возвращает состояние всех активных сессий.
+
+        :return: (list[dict]) user_id, state, uptime, restarts, last_error.
+        """
+        return [
+            {
+                "user_id": session.user_id,
+                "state": session.state,
+                "uptime": session.uptime(),
+                "restarts": session.restarts,
+                "last_error": session.last_error,
+            }
+            for session in self._sessions.values()
+        ]
+
+
+# 🧭 Единый супервизор сессий отслеживания процесса
+tracking_supervisor = TrackingSupervisor()
@@ -4,8 +4,8 @@ from loguru import logger
 from telethon.errors import (
     UsernameInvalidError, UsernameNotOccupiedError, UserNotParticipantError, ChannelPrivateError
 )
-from telethon.tl.types import Channel, Chat
 
+from account_manager.peer_cache import peer_cache
 from keyboards.user.keyboards import main_menu_keyboard
 
 
@@ -18,12 +18,12 @@ async def unsubscribe(client, username_to_search, message):
     :param username_to_search:
     :return: 
     """
-    # 1. Пытаемся найти чат по username
+    # 1. Пытаемся найти чат по username (через общий кеш метаданных)
     try:
-        entity = await client.get_entity(f"@{username_to_search}")
-        chat_title = getattr(entity, 'title', getattr(entity, 'first_name', 'Без названия'))
-        chat_id = entity.telegram_id
-        chat_type = "канал" if isinstance(entity, Channel) else "группа" if isinstance(entity, Chat) else "чат"
+        peer = await peer_cache.get(client, f"@{username_to_search}")
+        chat_title = peer.title or 'Без названия'
+        chat_id = peer.peer_id
+        chat_type = "канал" if peer.peer_type in ("channel", "megagroup") else "группа" if peer.peer_type == "chat" else "чат"
 
         logger.info(f"Найден {chat_type} '{chat_title}' (ID: {chat_id}) для @{username_to_search}")
     except (UsernameInvalidError, UsernameNotOccupiedError, ValueError) as e:
@@ -37,8 +37,8 @@ async def unsubscribe(client, username_to_search, message):
 
     # 2. Отписываемся от чата
     try:
-        # Универсальный способ для групп и каналов
-        await client.delete_dialog(entity)
+        # Универсальный способ для групп и каналов (input entity берётся из кеша сессии Telethon)
+        await client.delete_dialog(f"@{username_to_search}")
         logger.info(f"Успешная отписка от {chat_type} '{chat_title}' (ID: {chat_id})")
         await message.answer(f"✅ Отписались от {chat_type} «{chat_title}» (@{username_to_search})")
     except (UserNotParticipantError, ChannelPrivateError) as e:
@@ -33,3 +33,37 @@ proxy_ip = config['proxy_data']['ip']
 
 # Язык локализации интерфейса бота
 language = config['localization']['language']
+
+# Параметры отслеживания (необязательная секция [tracking], при отсутствии используются значения по умолчанию)
+forward_workers = config.getint('tracking', 'forward_workers', fallback=2)  # Воркеров отправки на клиента
+forward_rate = config.getfloat('tracking', 'forward_rate', fallback=0.5)  # Отправок в секунду на целевую группу
+forward_burst = config.getint('tracking', 'forward_burst', fallback=3)  # Допустимый всплеск отправок
+forward_max_attempts = config.getint('tracking', 'forward_max_attempts', fallback=5)  # Попыток доставки
+restart_max_attempts = config.getint('tracking', 'restart_max_attempts', fallback=5)  # Перезапусков сессии после сбоев
+restart_base_delay = config.getfloat('tracking', 'restart_base_delay', fallback=5.0)  # Начальная задержка перезапуска
+backfill_limit = config.getint('tracking', 'backfill_limit', fallback=100)  # Догрузка пропущенных: максимум на канал
+backfill_delay = config.getfloat('tracking', 'backfill_delay', fallback=1.0)  # Пауза между каналами при догрузке
+backfill_max_age = config.getint('tracking', 'backfill_max_age', fallback=24)  # Не догружать сообщения старше, часов
+refresh_group_metadata = config.getboolean('tracking', 'refresh_group_metadata', fallback=True)  # Обновлять базу групп
+group_refresh_age = config.getint('tracking', 'group_refresh_age', fallback=24)  # Не обновлять группы чаще, часов
+channels_per_account = config.getint('tracking', 'channels_per_account', fallback=500)  # Каналов на один аккаунт
+heartbeat_interval = config.getint('tracking', 'heartbeat_interval', fallback=30)  # Проверка резервного аккаунта, сек
+heartbeat_timeout = config.getint('tracking', 'heartbeat_timeout', fallback=180)  # Без событий до переключения, сек
+poll_min_interval = config.getint('tracking', 'poll_min_interval', fallback=60)  # Опрос каналов без подписки: мин., сек
+poll_max_interval = config.getint('tracking', 'poll_max_interval', fallback=1800)  # Максимальный интервал опроса, сек
+poll_delay = config.getfloat('tracking', 'poll_delay', fallback=2.0)  # Пауза между запросами опроса, сек
+poll_limit = config.getint('tracking', 'poll_limit', fallback=50)  # Сообщений за один опрос канала
+poll_hot_rate = config.getint('tracking', 'poll_hot_rate', fallback=30)  # Сообщений в час для подписки на канал
+event_workers = config.getint('tracking', 'event_workers', fallback=4)  # Воркеров обработки входящих сообщений
+event_queue_size = config.getint('tracking', 'event_queue_size', fallback=1000)  # Ёмкость очереди входящих сообщений
+event_overflow = config.get('tracking', 'event_overflow', fallback='drop_oldest')  # drop_oldest, coalesce или block
+album_window = config.getfloat('tracking', 'album_window', fallback=1.5)  # Ожидание частей альбома, сек
+suppress_duplicates = config.getboolean('tracking', 'suppress_duplicates', fallback=True)  # Не пересылать копии постов
+duplicate_window = config.getint('tracking', 'duplicate_window', fallback=1800)  # Окно поиска копий, сек
+duplicate_distance = config.getint('tracking', 'duplicate_distance', fallback=3)  # Расстояние SimHash для копий, бит
+duplicate_min_words = config.getint('tracking', 'duplicate_min_words', fallback=8)  # Короче — только точные копии
+keyword_stemming = config.getboolean('tracking', 'keyword_stemming', fallback=False)  # Искать все формы ключевых слов
+match_log_batch = config.getint('tracking', 'match_log_batch', fallback=200)  # Журнал совпадений: строк в одной записи
+match_log_interval = config.getfloat('tracking', 'match_log_interval', fallback=2.0)  # Запись журнала не реже, сек
+keyword_stats_interval = config.getint('tracking', 'keyword_stats_interval', fallback=60)  # Запись статистики слов, сек
+pool_accounts = config.getint('tracking', 'pool_accounts', fallback=2)  # Аккаунтов accounts/free для общего пула
@@ -2,7 +2,9 @@
 import os
 from datetime import datetime
 
-from peewee import SqliteDatabase, Model, IntegerField, CharField, AutoField, TextField, DateTimeField
+from peewee import (
+    SqliteDatabase, Model, IntegerField, CharField, AutoField, TextField, DateTimeField, DateField, fn, EXCLUDED
+)
 
 db = SqliteDatabase('data/bot.db', timeout=30,
                     pragmas={'journal_mode': 'wal', 'cache_size': 4096, 'synchronous': 'NORMAL'},
@@ -50,6 +52,24 @@ def delete_group_by_username(user_id: int, channel: str):
     Groups.delete().where(Groups.username == channel).execute()
 
 
+def get_user_keywords(user_id):
+    """
+    Возвращает список ключевых слов пользователя из его персональной таблицы.
+
+    Если таблицы ещё нет — создаёт её и возвращает пустой список.
+
+    :param user_id: (int) Telegram user_id
+    :return: (list[str]) Непустые ключевые слова пользователя
+    """
+    Keywords = create_keywords_model(user_id=user_id)
+
+    if not Keywords.table_exists():
+        Keywords.create_table()
+        return []
+
+    return [keyword.user_keyword for keyword in Keywords.select() if keyword.user_keyword]
+
+
 class User(BaseModel):
     """
     Модель для хранения основных данных пользователя Telegram.
@@ -163,6 +183,211 @@ def create_group_model(user_id):
     return Group  # Возвращаем класс модели
 
 
+def create_settings_model(user_id):
+    """
+    Динамически создаёт модель Peewee для хранения настроек отслеживания конкретного пользователя.
+
+    Настройки хранятся в виде пар «ключ — значение» (например, режим дайджеста), поэтому новые настройки
+    не требуют изменения схемы. Создаётся отдельная таблица для каждого пользователя по шаблону '<user_id>_settings'.
+
+    :param user_id: (int) Уникальный идентификатор пользователя Telegram.
+    :return peewee.Model: Класс модели Peewee с полями `id`, `key` и `value`.
+
+    Model Fields:
+        id (AutoField):
+            Автоинкрементный первичный ключ.
+        key (CharField):
+            Уникальное имя настройки.
+        value (CharField):
+            Значение настройки в виде строки.
+    """
+
+    class Settings(BaseModel):
+        id = AutoField()
+        key = CharField(unique=True)  # Имя настройки
+        value = CharField(null=True)  # Значение настройки
+
+        class Meta:
+            table_name = f"{user_id}_settings"  # Имя таблицы
+
+    return Settings  # Возвращаем класс модели
+
+
+def get_user_settings(user_id: int) -> dict:
+    """
+    Возвращает все настройки отслеживания пользователя.
+
+    :param user_id: (int) ID пользователя Telegram.
+    :return dict: {ключ: значение}, пустой словарь, если настроек нет.
+    """
+    Settings = create_settings_model(user_id)
+
+    if not Settings.table_exists():
+        return {}
+
+    return {setting.key: setting.value for setting in Settings.select()}
+
+
+def get_user_setting(user_id: int, key: str, default=None):
+    """
+    Возвращает значение одной настройки пользователя.
+
+    :param user_id: (int) ID пользователя Telegram.
+    :param key: (str) Имя настройки.
+    :param default: Значение по умолчанию, если настройка не задана.
+    :return: (str) Значение настройки или `default`.
+    """
+    return get_user_settings(user_id).get(key, default)
+
+
+def set_user_setting(user_id: int, key: str, value):
+    """
+    Сохраняет значение настройки пользователя (создаёт или обновляет запись).
+
+    :param user_id: (int) ID пользователя Telegram.
+    :param key: (str) Имя настройки.
+    :param value: Значение настройки (приводится к строке).
+    :return: None
+    """
+    Settings = create_settings_model(user_id)
+    Settings.create_table(safe=True)
+    Settings.insert(key=key, value=str(value)).on_conflict(
+        conflict_target=[Settings.key],
+        update={Settings.value: str(value)}
+    ).execute()
+
+
+def create_filters_model(user_id):
+    """
+    Динамически создаёт модель Peewee для хранения фильтров сообщений конкретного пользователя.
+
+    Фильтры проверяются до поиска ключевых слов и отбрасывают заведомо ненужные сообщения (см.
+    `account_manager.prefilter`). Каждая запись — одно правило «вид — значение»: минус-слово, ограничение длины,
+    заблокированный отправитель и т.д. Создаётся отдельная таблица для каждого пользователя по шаблону
+    '<user_id>_filters'.
+
+    :param user_id: (int) Уникальный идентификатор пользователя Telegram.
+    :return peewee.Model: Класс модели Peewee с полями `id`, `filter_type` и `value`.
+
+    Model Fields:
+        id (AutoField):
+            Автоинкрементный первичный ключ.
+        filter_type (CharField):
+            Вид правила (negative, min_length, max_length, sender, bots, forwards).
+        value (CharField):
+            Значение правила в виде строки.
+    """
+
+    class Filters(BaseModel):
+        id = AutoField()
+        filter_type = CharField()  # Вид правила
+        value = CharField()  # Значение правила
+
+        class Meta:
+            table_name = f"{user_id}_filters"  # Имя таблицы
+            indexes = ((("filter_type", "value"), True),)  # Одно и то же правило хранится один раз
+
+    return Filters  # Возвращаем класс модели
+
+
+def get_user_filters(user_id: int) -> list:
+    """
+    Возвращает правила фильтрации сообщений пользователя.
+
+    :param user_id: (int) ID пользователя Telegram.
+    :return list: [(вид правила, значение)], пустой список, если фильтров нет.
+    """
+    Filters = create_filters_model(user_id)
+
+    if not Filters.table_exists():
+        return []
+
+    return [(rule.filter_type, rule.value) for rule in Filters.select().order_by(Filters.id)]
+
+
+def set_user_filters(user_id: int, rules: list):
+    """
+    Заменяет правила фильтрации сообщений пользователя (в одной транзакции).
+
+    :param user_id: (int) ID пользователя Telegram.
+    :param rules: (list[tuple[str, str]]) Правила (вид, значение).
+    :return: None
+    """
+    Filters = create_filters_model(user_id)
+    Filters.create_table(safe=True)
+    with db.atomic():
+        Filters.delete().execute()
+        if rules:
+            Filters.insert_many(
+                [{"filter_type": filter_type, "value": value} for filter_type, value in dict.fromkeys(rules)]
+            ).execute()
+
+
+def create_routes_model(user_id):
+    """
+    Динамически создаёт модель Peewee для хранения маршрутов пересылки конкретного пользователя.
+
+    Маршрут направляет сообщения, найденные по ключевому слову, в отдельную целевую группу (одно ключевое слово
+    может иметь несколько групп). Сообщения по ключевым словам без маршрута пересылаются в основную группу
+    ('<user_id>_group'). Создаётся отдельная таблица для каждого пользователя по шаблону '<user_id>_routes'.
+
+    :param user_id: (int) Уникальный идентификатор пользователя Telegram.
+    :return peewee.Model: Класс модели Peewee с полями `id`, `keyword` и `target`.
+
+    Model Fields:
+        id (AutoField):
+            Автоинкрементный первичный ключ.
+        keyword (CharField):
+            Ключевое слово (как оно сохранено в таблице ключевых слов).
+        target (CharField):
+            Целевая группа (например, @my_alerts_channel).
+    """
+
+    class Routes(BaseModel):
+        id = AutoField()
+        keyword = CharField()  # Ключевое слово
+        target = CharField()  # Целевая группа
+
+        class Meta:
+            table_name = f"{user_id}_routes"  # Имя таблицы
+            indexes = ((("keyword", "target"), True),)  # Один маршрут хранится один раз
+
+    return Routes  # Возвращаем класс модели
+
+
+def get_user_routes(user_id: int) -> list:
+    """
+    Возвращает маршруты пересылки пользователя.
+
+    :param user_id: (int) ID пользователя Telegram.
+    :return list: [(ключевое слово, целевая группа)], пустой список, если маршрутов нет.
+    """
+    Routes = create_routes_model(user_id)
+
+    if not Routes.table_exists():
+        return []
+
+    return [(route.keyword, route.target) for route in Routes.select().order_by(Routes.id)]
+
+
+def set_user_routes(user_id: int, routes: list):
+    """
+    Заменяет маршруты пересылки пользователя (в одной транзакции).
+
+    :param user_id: (int) ID пользователя Telegram.
+    :param routes: (list[tuple[str, str]]) Маршруты (ключевое слово, целевая группа).
+    :return: None
+    """
+    Routes = create_routes_model(user_id)
+    Routes.create_table(safe=True)
+    with db.atomic():
+        Routes.delete().execute()
+        if routes:
+            Routes.insert_many(
+                [{"keyword": keyword, "target": target} for keyword, target in dict.fromkeys(routes)]
+            ).execute()
+
+
 class TelegramGroup(BaseModel):
     """
     Модель для хранения данных о найденных Telegram-группах и каналах.
@@ -201,6 +426,377 @@ class TelegramGroup(BaseModel):
         table_name = 'telegram_groups'
 
 
+class PeerMetadata(BaseModel):
+    """
+    Модель для хранения кеша метаданных Telegram-сущностей (каналов, групп, пользователей).
+
+    Используется общим кешем `account_manager.peer_cache`, чтобы не запрашивать у Telegram одни и те же
+    сущности повторно (запросы get_entity учитываются в лимитах FloodWait) и сохранять кеш между перезапусками.
+    Таблица общая для всех пользователей.
+
+    Attributes:
+        peer_id (IntegerField): Маркированный ID сущности (для каналов начинается с -100), уникальный.
+        username (CharField, optional): Username в нижнем регистре без '@'.
+        title (CharField, optional): Название чата или имя пользователя.
+        peer_type (CharField): Тип сущности — 'channel', 'megagroup', 'chat', 'user' или 'bot'.
+        access_hash (IntegerField, optional): access_hash аккаунта, который получил сущность.
+        updated_at (DateTimeField): Время последнего обновления записи.
+
+    Meta:
+        table_name (str): Имя таблицы в базе данных — 'peer_metadata'.
+    """
+    peer_id = IntegerField(unique=True)
+    username = CharField(null=True, index=True)
+    title = CharField(null=True)
+    peer_type = CharField()
+    access_hash = IntegerField(null=True)
+    updated_at = DateTimeField(default=datetime.now)
+
+    class Meta:
+        table_name = 'peer_metadata'
+
+
+class PendingForward(BaseModel):
+    """
+    Модель для хранения очереди исходящих пересылок (ещё не доставленных в целевую группу).
+
+    Используется очередью `account_manager.forwarding_queue`: запись создаётся при постановке в очередь
+    и удаляется после успешной доставки, поэтому перезапуск бота не теряет найденные совпадения.
+    Таблица общая для всех пользователей.
+
+    Attributes:
+        user_id (IntegerField): ID пользователя Telegram, для которого выполняется пересылка.
+        target_id (IntegerField): Маркированный ID целевой группы.
+        chat_id (IntegerField, optional): Маркированный ID чата-источника пересылаемых сообщений.
+        message_ids (CharField, optional): ID пересылаемых сообщений через запятую.
+        text (TextField, optional): Текст сопроводительного сообщения (очищается после отправки).
+        attempts (IntegerField): Количество неудачных попыток доставки.
+        created_at (DateTimeField): Время постановки в очередь.
+
+    Meta:
+        table_name (str): Имя таблицы в базе данных — 'pending_forwards'.
+    """
+    user_id = IntegerField(index=True)
+    target_id = IntegerField()
+    chat_id = IntegerField(null=True)
+    message_ids = CharField(null=True)
+    text = TextField(null=True)
+    attempts = IntegerField(default=0)
+    created_at = DateTimeField(default=datetime.now)
+
+    class Meta:
+        table_name = 'pending_forwards'
+
+
+class ActiveTracking(BaseModel):
+    """
+    Модель для хранения запущенных сессий отслеживания.
+
+    Запись создаётся при запуске отслеживания и удаляется при остановке пользователем. Записи, оставшиеся
+    после перезапуска или сбоя бота, используются для автоматического возобновления отслеживания.
+
+    Attributes:
+        user_id (IntegerField): ID пользователя Telegram, уникальный.
+        session_path (CharField): Путь к файлу сессии (.session) аккаунта пользователя.
+        started_at (DateTimeField): Время запуска отслеживания.
+
+    Meta:
+        table_name (str): Имя таблицы в базе данных — 'active_tracking'.
+    """
+    user_id = IntegerField(unique=True)
+    session_path = CharField()
+    started_at = DateTimeField(default=datetime.now)
+
+    class Meta:
+        table_name = 'active_tracking'
+
+
+class ChannelCursor(BaseModel):
+    """
+    Модель для хранения ID последнего обработанного сообщения в каждом отслеживаемом канале.
+
+    По этим данным после перезапуска догружаются сообщения, пропущенные за время простоя.
+
+    Attributes:
+        user_id (IntegerField): ID пользователя Telegram.
+        chat_id (IntegerField): Маркированный ID канала/группы.
+        last_message_id (IntegerField): ID последнего обработанного сообщения.
+        updated_at (DateTimeField): Время последнего обновления записи.
+
+    Meta:
+        table_name (str): Имя таблицы в базе данных — 'channel_cursors'.
+        indexes: Уникальная пара (user_id, chat_id).
+    """
+    user_id = IntegerField()
+    chat_id = IntegerField()
+    last_message_id = IntegerField()
+    updated_at = DateTimeField(default=datetime.now)
+
+    class Meta:
+        table_name = 'channel_cursors'
+        indexes = ((('user_id', 'chat_id'), True),)
+
+
+class ChannelAssignment(BaseModel):
+    """
+    Модель для хранения распределения отслеживаемых каналов пользователя между его аккаунтами.
+
+    Каждый канал закреплён за одним аккаунтом (файлом сессии), который на него подписан и слушает его.
+    Закрепление сохраняется между запусками, чтобы аккаунты не переподписывались на каналы повторно.
+
+    Attributes:
+        user_id (IntegerField): ID пользователя Telegram.
+        username (CharField): Username канала в нижнем регистре с '@'.
+        session_name (CharField): Имя файла сессии аккаунта, за которым закреплён канал.
+
+    Meta:
+        table_name (str): Имя таблицы в базе данных — 'channel_assignments'.
+        indexes: Уникальная пара (user_id, username).
+    """
+    user_id = IntegerField()
+    username = CharField()
+    session_name = CharField()
+
+    class Meta:
+        table_name = 'channel_assignments'
+        indexes = ((('user_id', 'username'), True),)
+
+
+class MatchLog(BaseModel):
+    """
+    Модель журнала найденных совпадений: какое ключевое слово, в каком канале и когда найдено.
+
+    Записи добавляются пачками (`account_manager.match_log`) и выгружаются пользователю в Excel.
+    Таблица общая для всех пользователей.
+
+    Attributes:
+        user_id (IntegerField): ID пользователя Telegram.
+        chat_id (IntegerField): Маркированный ID канала/группы-источника.
+        chat_title (CharField, optional): Название канала/группы на момент совпадения.
+        message_id (IntegerField): ID сообщения в канале.
+        keywords (TextField): Найденные ключевые слова через запятую.
+        link (CharField, optional): Ссылка на сообщение.
+        snippet (TextField, optional): Фрагмент текста вокруг ключевого слова.
+        matched_at (DateTimeField): Время совпадения.
+
+    Meta:
+        table_name (str): Имя таблицы в базе данных — 'matches'.
+        indexes: (user_id, matched_at) — выгрузка за период, (user_id, chat_id) — выборка по каналу.
+    """
+    user_id = IntegerField()
+    chat_id = IntegerField()
+    chat_title = CharField(null=True)
+    message_id = IntegerField()
+    keywords = TextField()
+    link = CharField(null=True)
+    snippet = TextField(null=True)
+    matched_at = DateTimeField(default=datetime.now)
+
+    class Meta:
+        table_name = 'matches'
+        indexes = (
+            (('user_id', 'matched_at'), False),
+            (('user_id', 'chat_id'), False),
+        )
+
+
+def save_pending_forwards(items: list):
+    """
+    Сохраняет пачку новых задач очереди пересылок одной транзакцией (идентификаторы присваиваются записям).
+
+    :param items: (list[PendingForward]) Ещё не сохранённые задачи.
+    :return: None
+    """
+    with db.atomic():
+        for item in items:
+            item.save(force_insert=True)
+
+
+def save_matches(rows: list):
+    """
+    Сохраняет пачку совпадений в журнал одной транзакцией.
+
+    :param rows: (list[dict]) Записи с полями модели `MatchLog`.
+    :return: None
+    """
+    MatchLog.create_table(safe=True)
+    with db.atomic():
+        for start in range(0, len(rows), 100):  # Ограничение SQLite на количество параметров запроса
+            MatchLog.insert_many(rows[start:start + 100]).execute()
+
+
+def get_user_matches(user_id: int, since: datetime, limit: int = 10000) -> list:
+    """
+    Возвращает совпадения пользователя за период, от новых к старым.
+
+    :param user_id: (int) ID пользователя Telegram.
+    :param since: (datetime) Начало периода.
+    :param limit: (int) Максимальное количество записей.
+    :return list: Записи `MatchLog`.
+    """
+    if not MatchLog.table_exists():
+        return []
+
+    return list(
+        MatchLog.select()
+        .where((MatchLog.user_id == user_id) & (MatchLog.matched_at >= since))
+        .order_by(MatchLog.matched_at.desc())
+        .limit(limit)
+    )
+
+
+class KeywordHits(BaseModel):
+    """
+    Модель счётчиков срабатываний ключевых слов: количество совпадений ключевого слова пользователя за день.
+
+    Счётчики накапливаются в памяти (`account_manager.keyword_stats`) и сохраняются пачками; по ним строится
+    отчёт «📊 Статистика ключевых слов». Таблица общая для всех пользователей.
+
+    Attributes:
+        user_id (IntegerField): ID пользователя Telegram.
+        keyword (TextField): Ключевое слово (как в таблице ключевых слов пользователя).
+        day (DateField): День.
+        hits (IntegerField): Количество совпадений за день.
+        last_hit (DateTimeField): Время последнего совпадения за день.
+
+    Meta:
+        table_name (str): Имя таблицы в базе данных — 'keyword_hits'.
+        indexes: Уникальная тройка (user_id, keyword, day).
+    """
+    user_id = IntegerField()
+    keyword = TextField()
+    day = DateField()
+    hits = IntegerField(default=0)
+    last_hit = DateTimeField(default=datetime.now)
+
+    class Meta:
+        table_name = 'keyword_hits'
+        indexes = ((('user_id', 'keyword', 'day'), True),)
+
+
+def save_keyword_hits(rows: list):
+    """
+    Прибавляет счётчики срабатываний ключевых слов одной транзакцией (вставка или увеличение существующих).
+
+    :param rows: (list[dict]) Записи с полями `user_id`, `keyword`, `day`, `hits`, `last_hit`.
+    :return: None
+    """
+    if not rows:
+        return
+    KeywordHits.create_table(safe=True)
+    with db.atomic():
+        for start in range(0, len(rows), 100):  # Ограничение SQLite на количество параметров запроса
+            KeywordHits.insert_many(rows[start:start + 100]).on_conflict(
+                conflict_target=[KeywordHits.user_id, KeywordHits.keyword, KeywordHits.day],
+                update={KeywordHits.hits: KeywordHits.hits + EXCLUDED.hits,
+                        KeywordHits.last_hit: fn.MAX(KeywordHits.last_hit, EXCLUDED.last_hit)}
+            ).execute()
+
+
+def get_keyword_hits(user_id: int, since) -> dict:
+    """
+    Возвращает статистику срабатываний ключевых слов пользователя.
+
+    :param user_id: (int) ID пользователя Telegram.
+    :param since: (date) Начало периода для подсчёта совпадений.
+    :return dict: {ключевое слово: (совпадений за период, первый день учёта, время последнего совпадения)}
+    """
+    if not KeywordHits.table_exists():
+        return {}
+
+    period_hits = dict(
+        KeywordHits.select(KeywordHits.keyword, fn.SUM(KeywordHits.hits))
+        .where((KeywordHits.user_id == user_id) & (KeywordHits.day >= since))
+        .group_by(KeywordHits.keyword)
+        .tuples()
+    )
+    query = (
+        KeywordHits.select(KeywordHits.keyword, fn.MIN(KeywordHits.day), fn.MAX(KeywordHits.last_hit))
+        .where(KeywordHits.user_id == user_id)
+        .group_by(KeywordHits.keyword)
+        .tuples()
+    )
+    return {
+        keyword: (period_hits.get(keyword, 0), first_day, last_hit) for keyword, first_day, last_hit in query
+    }
+
+
+def set_tracking_active(user_id: int, session_path: str):
+    """
+    Отмечает сессию отслеживания пользователя как запущенную (для возобновления после перезапуска).
+
+    :param user_id: (int) ID пользователя Telegram.
+    :param session_path: (str) Путь к файлу сессии.
+    :return: None
+    """
+    ActiveTracking.create_table(safe=True)
+    ActiveTracking.insert(user_id=user_id, session_path=session_path, started_at=datetime.now()).on_conflict(
+        conflict_target=[ActiveTracking.user_id],
+        update={ActiveTracking.session_path: session_path, ActiveTracking.started_at: datetime.now()}
+    ).execute()
+
+
+def remove_tracking_active(user_id: int):
+    """
+    Снимает отметку о запущенной сессии отслеживания пользователя.
+
+    :param user_id: (int) ID пользователя Telegram.
+    :return: None
+    """
+    ActiveTracking.create_table(safe=True)
+    ActiveTracking.delete().where(ActiveTracking.user_id == user_id).execute()
+
+
+def get_active_trackings():
+    """
+    Возвращает сессии отслеживания, которые были запущены на момент остановки бота.
+
+    :return list[ActiveTracking]: Записи о запущенных сессиях.
+    """
+    ActiveTracking.create_table(safe=True)
+    return list(ActiveTracking.select().order_by(ActiveTracking.started_at))
+
+
+def get_channel_cursors(user_id: int) -> dict:
+    """
+    Возвращает ID последних обработанных сообщений по каналам пользователя.
+
+    :param user_id: (int) ID пользователя Telegram.
+    :return dict: {chat_id: last_message_id}
+    """
+    ChannelCursor.create_table(safe=True)
+    query = ChannelCursor.select().where(ChannelCursor.user_id == user_id)
+    return {cursor.chat_id: cursor.last_message_id for cursor in query}
+
+
+def save_channel_cursors(user_id: int, cursors: dict):
+    """
+    Сохраняет ID последних обработанных сообщений по каналам пользователя одной транзакцией.
+
+    Значение в базе только увеличивается: запись с меньшим ID не перезаписывает более новую.
+
+    :param user_id: (int) ID пользователя Telegram.
+    :param cursors: (dict) {chat_id: last_message_id}
+    :return: None
+    """
+    if not cursors:
+        return
+    ChannelCursor.create_table(safe=True)
+    now = datetime.now()
+    rows = [
+        {"user_id": user_id, "chat_id": chat_id, "last_message_id": message_id, "updated_at": now}
+        for chat_id, message_id in cursors.items()
+    ]
+    with db.atomic():
+        for start in range(0, len(rows), 100):
+            ChannelCursor.insert_many(rows[start:start + 100]).on_conflict(
+                conflict_target=[ChannelCursor.user_id, ChannelCursor.chat_id],
+                update={ChannelCursor.last_message_id: fn.MAX(ChannelCursor.last_message_id,
+                                                               EXCLUDED.last_message_id),
+                        ChannelCursor.updated_at: now}
+            ).execute()
+
+
 def getting_number_records_database():
     """Получает количество записей в базе данных о найденных группах пользователями"""
     return TelegramGroup.select().count()
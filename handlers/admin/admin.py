@@ -6,6 +6,7 @@ from aiogram import F
 from aiogram.fsm.context import FSMContext
 from aiogram.types import Message
 from loguru import logger  # https://github.com/Delgan/loguru
+from telethon import utils
 from telethon.errors import (
     FloodWaitError, AuthKeyUnregisteredError, UsernameInvalidError, UsernameNotOccupiedError, TypeNotFoundError
 )
@@ -14,7 +15,7 @@ from telethon.sync import TelegramClient
 from telethon.tl.functions.channels import GetFullChannelRequest
 
 from account_manager.auth import checking_accounts
-from account_manager.parser import determine_telegram_chat_type
+from account_manager.peer_cache import peer_cache, PEER_TYPE_LABELS
 from database.database import TelegramGroup, db
 from keyboards.admin.keyboards import admin_keyboard
 from system.dispatcher import api_id, api_hash, router
@@ -54,6 +55,7 @@ async def admin_panel(message: Message, state: FSMContext):
                 "Вот что вы можете сделать:\n\n"
                 "📁 <b>Получить лог-файл</b> — просмотреть журнал ошибок и событий бота за последнее время. Полезно для диагностики.\n\n"
                 "🔄 <b>Актуализация базы данных</b> — обновить информацию о группах и каналах: проверить их текущий тип (группа/канал) и получить актуальные ID.\n\n"
+                "📡 <b>Сессии отслеживания</b> — состояние запущенных сессий пользователей: время работы, перезапуски, ошибки и очереди пересылок.\n\n"
             ),
             parse_mode="HTML",
             reply_markup=admin_keyboard(),
@@ -70,7 +72,7 @@ async def update_db(message: Message):
 
     Последовательность действий:
      - Сканирует папку accounts/parsing для поиска доступных сессий;
-     - Подключается к Telegram API для получения метаданных по username;
+     - Получает метаданные по username из общего кеша `peer_cache` (запрос к Telegram API — только при промахе);
      - Определяет тип сущности (канал, супергруппа и т.д.);
      - Обновляет записи в базе через прямой UPDATE-запрос;
      - При FloodWaitError переключается на следующий аккаунт;
@@ -146,12 +148,12 @@ async def update_db(message: Message):
                     try:
                         await asyncio.sleep(2)
 
-                        # Получаем сущность Telegram по username
-                        entity = await client.get_entity(group.username)
+                        # Получаем метаданные по username (из общего кеша, при промахе — запрос к Telegram)
+                        peer = await peer_cache.get(client, group.username)
 
-                        logger.info(entity)
+                        logger.info(f"{peer.peer_id} | {peer.title} | {peer.peer_type}")
 
-                        if hasattr(entity, 'bot') or not hasattr(entity, 'broadcast'):
+                        if peer.peer_type not in ("channel", "megagroup"):
                             logger.warning(
                                 f"Пропускаем username {group.username}: это пользователь, а не канал/группа.")
                             errors += 1
@@ -165,27 +167,27 @@ async def update_db(message: Message):
                             continue
 
                         # Получаем полную информацию
-                        full_entity = await client(GetFullChannelRequest(channel=entity))
+                        full_entity = await client(GetFullChannelRequest(channel=group.username))
 
                         # Извлекаем данные из полной сущности
                         description = full_entity.full_chat.about or ""
                         participants_count = full_entity.full_chat.participants_count or 0
                         logger.info(f"Описание: {description}")
 
-                        new_group_type = determine_telegram_chat_type(entity)  # Определяем тип сущности
+                        new_group_type = PEER_TYPE_LABELS[peer.peer_type]  # Определяем тип сущности
 
                         # === Формируем username с @ ===
-                        actual_username = f"@{entity.username}" if entity.username else ""
+                        actual_username = f"@{peer.username}" if peer.username else ""
 
                         # Обновляем запись через UPDATE запрос со всеми доступными данными
                         TelegramGroup.update(
-                            id=entity.id,
-                            group_hash=entity.access_hash,
+                            id=utils.resolve_id(peer.peer_id)[0],
+                            group_hash=peer.access_hash,
                             group_type=new_group_type,
                             username=actual_username,
                             description=description,
                             participants=participants_count,
-                            name=entity.title  # Также обновляем название на актуальное
+                            name=peer.title  # Также обновляем название на актуальное
                         ).where(
                             TelegramGroup.group_hash == group.group_hash
                         ).execute()
@@ -195,7 +197,7 @@ async def update_db(message: Message):
 
                         logger.info(
                             f"[{processed}/{total_count}] Обновлено: {group.username} | "
-                            f"ID: {entity.id} | Тип: {new_group_type} | Описание: {description} | Участники: {participants_count} | Аккаунт: {current_account}"
+                            f"ID: {peer.peer_id} | Тип: {new_group_type} | Описание: {description} | Участники: {participants_count} | Аккаунт: {current_account}"
                         )
 
                         # Каждые 10 обновлений отправляем прогресс
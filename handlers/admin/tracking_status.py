@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+from aiogram import F
+from aiogram.fsm.context import FSMContext
+from aiogram.types import Message
+from loguru import logger  # https://github.com/Delgan/loguru
+
+from account_manager.listener_pool import listener_pool
+from account_manager.match_log import match_log
+from account_manager.parser import channel_pollers, duplicate_indexes, event_queues, forwarding_queues
+from account_manager.prefilter import message_filters
+from account_manager.supervisor import tracking_supervisor
+from keyboards.admin.keyboards import admin_keyboard
+from system.dispatcher import router
+
+STATE_LABELS = {
+    "starting": "🟡 запуск",
+    "running": "🟢 работает",
+    "restarting": "🟠 перезапуск",
+    "stopping": "⚪️ остановка",
+    "stopped": "⚪️ остановлена",
+    "failed": "🔴 сбой",
+}
+
+
+def format_uptime(seconds):
+    """Форматирует время работы в вид «1 ч 05 мин»."""
+    hours, minutes = seconds // 3600, seconds % 3600 // 60
+    return f"{hours} ч {minutes:02d} мин" if hours else f"{minutes} мин"
+
+
+@router.message(F.text == "📡 Сессии отслеживания")
+async def tracking_status(message: Message, state: FSMContext):
+    """
+    Обработчик команды «📡 Сессии отслеживания».
+
+    Отправляет администратору список активных сессий отслеживания из `tracking_supervisor`:
+    состояние, время работы, количество перезапусков, последнюю ошибку, состояние очередей входящих сообщений
+    и пересылок, опроса каналов без подписки. В начале списка — состояние общего пула аккаунтов прослушивания
+    и журнала совпадений.
+
+    - Длинный список разбивается на несколько сообщений (лимит Telegram — 4096 символов).
+    - Доступ к команде имеют только администраторы.
+
+    :param message: (Message) Входящее сообщение с командой «📡 Сессии отслеживания».
+    :param state: (FSMContext) Контекст машины состояний. Сбрасывается в начале выполнения.
+    :return: None
+    """
+    try:
+        await state.clear()  # Сбрасываем текущее состояние FSM
+
+        sessions = tracking_supervisor.status()
+        if not sessions:
+            await message.answer("📡 Активных сессий отслеживания нет.", reply_markup=admin_keyboard())
+            return
+
+        lines = []
+        for session in sorted(sessions, key=lambda item: item["user_id"]):
+            line = (
+                f"👤 <code>{session['user_id']}</code> — {STATE_LABELS.get(session['state'], session['state'])}, "
+                f"{format_uptime(session['uptime'])}, перезапусков: {session['restarts']}"
+            )
+            event_queue = event_queues.get(session["user_id"])
+            if event_queue is not None:
+                event_stats = event_queue.stats()
+                line += (
+                    f"\n    📥 входящих в очереди: {event_stats['queued']}, задержка: {event_stats['lag']} сек., "
+                    f"обработано: {event_stats['processed']}, отброшено: {event_stats['dropped']}"
+                )
+            forwarding_queue = forwarding_queues.get(session["user_id"])
+            if forwarding_queue is not None:
+                queue_stats = forwarding_queue.stats()
+                line += (
+                    f"\n    📤 в очереди: {queue_stats['queued']}, отправлено: {queue_stats['sent']}, "
+                    f"ошибок: {queue_stats['failed']}, FloodWait: {queue_stats['flood_waits']}"
+                )
+            duplicates = duplicate_indexes.get(session["user_id"])
+            if duplicates is not None and duplicates.suppressed:
+                line += f"\n    🔁 копий не переслано: {duplicates.suppressed}"
+            message_filter = message_filters.get(session["user_id"])
+            if message_filter is not None and message_filter.rejected:
+                line += f"\n    🧹 отброшено фильтром: {sum(message_filter.rejected.values())}"
+            pollers = channel_pollers.get(session["user_id"], [])
+            if any(len(poller) for poller in pollers):
+                poll_stats = [poller.stats() for poller in pollers]
+                line += (
+                    f"\n    🔄 на опросе: {sum(item['channels'] for item in poll_stats)}, "
+                    f"запросов: {sum(item['polls'] for item in poll_stats)}, "
+                    f"сообщений: {sum(item['messages'] for item in poll_stats)}"
+                )
+            if session["last_error"]:
+                line += f"\n    ⚠️ {session['last_error'][:200]}"
+            lines.append(line)
+
+        chunk = f"📡 <b>Сессии отслеживания: {len(sessions)}</b>\n\n"
+        pool_stats = listener_pool.stats()
+        if pool_stats["accounts"]:
+            chunk += (
+                f"🌐 Общий пул: аккаунтов {pool_stats['accounts']}, каналов {pool_stats['channels']}, "
+                f"пользователей {pool_stats['users']}, сообщений {pool_stats['events']}, "
+                f"передано пользователям {pool_stats['deliveries']}\n\n"
+            )
+        log_stats = match_log.stats()
+        chunk += (
+            f"📜 Журнал совпадений: записано {log_stats['written']} ({log_stats['flushes']} пачек), "
+            f"в очереди {log_stats['queued']}\n\n"
+        )
+        for line in lines:
+            if len(chunk) + len(line) > 4000:
+                await message.answer(chunk, parse_mode="HTML")
+                chunk = ""
+            chunk += line + "\n\n"
+        await message.answer(chunk, parse_mode="HTML", reply_markup=admin_keyboard())
+    except Exception as e:
+        logger.exception(e)
+
+
+def register_handlers_tracking_status():
+    """
+    Регистрирует обработчик просмотра состояния сессий отслеживания.
+
+    Добавляет в маршрутизатор обработчик команды «📡 Сессии отслеживания».
+
+    - Доступ к команде имеют только администраторы;
+    - Команда вызывается через кнопку панели администратора.
+
+    :return: None
+    """
+    router.message.register(tracking_status)
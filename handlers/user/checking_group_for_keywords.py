@@ -9,6 +9,8 @@ from telethon import TelegramClient
 from telethon.sessions import StringSession
 
 from account_manager.auth import CheckingAccountsValidity
+from account_manager.keyword_query import QueryError, compile_query
+from account_manager.peer_cache import peer_cache
 from account_manager.subscription import subscription_telegram
 from keyboards.user.keyboards import back_keyboard
 from states.states import MyStatesParsing
@@ -50,7 +52,9 @@ async def get_url(message: Message, state: FSMContext):
         text=("✍️ Введите ключевое слово для поиска в сообщениях.\n\n"
               "📌 Пример: <code>Работа в Москве</code> или <code>ищу дизайнера</code>\n\n"
               "❗️Важно: Не указывайте слишком короткие или множественные слова (например: <code>работа, Москва, дизайн</code>).\n"
-              "Бот ищет точные совпадения — лучше использовать фразу целиком."),
+              "Бот ищет точные совпадения — лучше использовать фразу целиком.\n\n"
+              "🧠 Можно ввести запрос: <code>вакансия AND python NOT senior</code>, <code>\"ремонт квартир\"</code>, "
+              "<code>дизайн* NEAR/3 логотип</code>, <code>(python OR golang) удалённо</code>, <code>вакансия~</code> (с опечатками)"),
         reply_markup=back_keyboard(),
         parse_mode="HTML"
     )
@@ -66,6 +70,11 @@ async def get_keyword(message: Message, state: FSMContext):
     :return:
     """
     keyword = message.text.strip()  # Получаем ключевое слово из сообщения
+    try:
+        compile_query(keyword)  # Проверяем запрос до начала поиска
+    except QueryError as e:
+        await message.answer(f"⚠️ Ошибка в запросе: {e}. Введите ключевое слово ещё раз.", reply_markup=back_keyboard())
+        return
     await message.answer(
         text=("✅ Данные успешно получены!\n\n"
               "🔍 Начинаю поиск сообщений по указанной группе и ключевому слову…\n\n"
@@ -149,56 +158,49 @@ async def parse_group_for_keywords(url, keyword, message: Message):
 
             count = 0
             matched_count = 0
+            query = compile_query(keyword)  # Запрос разбирается один раз на весь поиск
 
             # Итерируем сообщения
             async for msg in client.iter_messages(entity=url, **parse_kwargs):
                 count += 1
                 text = msg.message if msg.message else ""
-                if text and keyword.lower() in text.lower():
+                if text and query.matches(text):
                     matched_count += 1
                     logger.info(f"✅ Найдено сообщение с ключевым словом: '{keyword}' — {text.strip()}")
 
                     # ИСПРАВЛЕНО: используем msg.id вместо message.id
-                    logger.info(f"📌 Найдено совпадение. Пересылаю сообщение ID={msg.telegram_id}")
+                    logger.info(f"📌 Найдено совпадение. Пересылаю сообщение ID={msg.id}")
 
                     # Получаем дату сообщения
                     msg_date = msg.date.strftime("%d.%m.%Y %H:%M:%S") if msg.date else "Неизвестно"
 
-                    # Получаем информацию о чате-источнике
+                    # Получаем информацию о чате-источнике (из общего кеша, запрос к Telegram — один раз)
+                    message_link = None
                     try:
-                        chat_entity = await client.get_entity(url)
-                        chat_title = getattr(chat_entity, "title", None) or getattr(chat_entity, "username",
-                                                                                    None) or "Неизвестно"
-                        chat_id = chat_entity.id
+                        peer = await peer_cache.get(client, url)
+                        chat_title = peer.title or peer.username or "Неизвестно"
+
+                        # Формируем ссылку на сообщение
+                        if peer.username:
+                            message_link = f"https://t.me/{peer.username}/{msg.id}"
+                        elif str(peer.peer_id).startswith("-100"):
+                            # Удаляем префикс -100 и получаем чистый ID
+                            message_link = f"https://t.me/c/{str(peer.peer_id)[4:]}/{msg.id}"
                     except Exception as e:
                         logger.warning(f"Не удалось получить название чата: {e}")
                         chat_title = "Неизвестно"
-                        chat_id = None
-
-                    # Формируем ссылку на сообщение
-                    # Для чатов с username (если есть)
-                    if chat_id:
-                        try:
-                            # Для супергрупп/каналов (chat_id начинается с -100)
-                            if str(chat_id).startswith("-100"):
-                                # Удаляем префикс -100 и получаем чистый ID
-                                clean_chat_id = str(chat_id)[4:]
-                                message_link = f"https://t.me/c/{clean_chat_id}/{msg.telegram_id}"
-                            elif hasattr(chat_entity, 'username') and chat_entity.username:
-                                message_link = f"https://t.me/{chat_entity.username}/{msg.telegram_id}"
-                        except Exception as e:
-                            logger.warning(f"Не удалось создать ссылку на сообщение: {e}")
 
                     # Формируем итоговое сообщение с контекстом
                     # Обрезаем текст если он слишком длинный
                     display_text = text if len(text) <= 500 else text[:500] + "..."
+                    link_html = f"<a href='{message_link}'>Перейти к сообщению</a>" if message_link else "Ссылка недоступна"
 
                     # Отправляем в целевую группу
                     await message.answer(
                         text=(f"📥 <b>Новое сообщение</b>\n\n"
                               f"<b>Источник:</b> {chat_title}\n"
                               f"<b>Дата:</b> {msg_date}\n"
-                              f"<b>Ссылка:</b> <a href='{message_link}'>Перейти к сообщению</a>\n\n"
+                              f"<b>Ссылка:</b> {link_html}\n\n"
                               f"<b>Текст сообщения:</b>\n{display_text}"),
                         parse_mode="HTML"
                     )
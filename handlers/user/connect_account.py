@@ -9,6 +9,9 @@ from aiogram.types import Message
 from loguru import logger  # https://github.com/Delgan/loguru
 
 from account_manager.auth import CheckingAccountsValidity
+from account_manager.listener_pool import listener_pool
+from account_manager.sharding import list_session_files
+from account_manager.standby import STANDBY_DIR
 from database.database import User
 from keyboards.user.keyboards import back_keyboard
 from locales.locales import get_text
@@ -72,6 +75,14 @@ async def handle_connect_account_free(message: Message, state: FSMContext):
         }
     )
     available_sessions = await CheckingAccountsValidity(message=message, path='accounts/free').get_available_sessions()
+    # Аккаунты, зарезервированные за общим пулом прослушивания (`pool_accounts`), пользователям не выдаются
+    available_sessions = [session for session in available_sessions if session not in listener_pool.session_names()]
+    if not available_sessions:
+        await message.answer(
+            text="⚠️ Свободных аккаунтов сейчас нет. Подключите свой аккаунт.",
+            reply_markup=back_keyboard()
+        )
+        return
     logger.info(f"Подключаем аккаунт {available_sessions}")
     random_session = random.choice(available_sessions)
     logger.info(f"Подключаем аккаунт {random_session}")
@@ -96,12 +107,14 @@ async def handle_account_file(message: Message, state: FSMContext):
     1. Сбрасывает текущее состояние FSM.
     2. Проверяет, что присланный файл имеет расширение .session.
     3. Создаёт папку пользователя в директории 'accounts/' если её нет.
-    4. Удаляет старые файлы сессий (.session и .session-journal) в папке пользователя.
+    4. Удаляет старый файл с тем же именем (и его .session-journal), если он есть.
     5. Скачивает и сохраняет новый .session-файл.
-    6. Уведомляет пользователя об успешной загрузке (и удалении старых файлов, если было).
+    6. Уведомляет пользователя об успешной загрузке и количестве подключённых аккаунтов.
 
     - Принимаются только файлы с расширением '.session'.
-    - Старые сессии удаляются для предотвращения конфликтов.
+    - Другие сессии пользователя сохраняются: при нескольких аккаунтах отслеживаемые каналы распределяются
+      между ними (лимит Telegram — 500 каналов на аккаунт).
+    - Файл с подписью «резерв» сохраняется в 'accounts/{user_id}/standby/' и используется как резервный аккаунт.
     - Файлы хранятся по пути 'accounts/{user_id}/'.
     - Используется бот API для скачивания файла.
 
@@ -122,14 +135,20 @@ async def handle_account_file(message: Message, state: FSMContext):
     user_folder = os.path.join(os.getcwd(), f"accounts/{message.from_user.id}")
     os.makedirs(user_folder, exist_ok=True)
 
+    # Сессия с подписью «резерв» подключается как резервный аккаунт (он у пользователя один)
+    is_standby = (message.caption or "").strip().lower() == "резерв"
+    target_folder = os.path.join(user_folder, STANDBY_DIR) if is_standby else user_folder
+    os.makedirs(target_folder, exist_ok=True)
+
     # Полный путь к новому файлу
-    new_file_path = os.path.join(user_folder, message.document.file_name)
+    new_file_path = os.path.join(target_folder, message.document.file_name)
 
-    # 🧹 Удаляем старые файлы .session и .session-journal
+    # 🧹 Удаляем старую версию этого же файла (.session и .session-journal), для резервного — прежний резервный
     deleted_files = []
-    for file_name in os.listdir(user_folder):
-        if file_name.endswith(".session") or file_name.endswith(".session-journal"):
-            full_path = os.path.join(user_folder, file_name)
+    for file_name in os.listdir(target_folder):
+        if file_name in (message.document.file_name, f"{message.document.file_name}-journal") or (
+                is_standby and file_name.endswith((".session", ".session-journal"))):
+            full_path = os.path.join(target_folder, file_name)
             try:
                 os.remove(full_path)
                 deleted_files.append(file_name)
@@ -147,6 +166,13 @@ async def handle_account_file(message: Message, state: FSMContext):
     msg = f"✅ Аккаунт {message.document.file_name} успешно загружен."
     if deleted_files:
         msg += f"\n♻️ Старые файлы ({', '.join(deleted_files)}) были удалены. Аккаунт обновлен"
+    sessions_count = len(list_session_files(user_folder))
+    if is_standby:
+        msg += ("\n🛡 Аккаунт подключён как резервный: он будет слушать те же каналы, что и основной, и примет "
+                "пересылку, если основной аккаунт перестанет получать обновления.")
+    elif sessions_count > 1:
+        msg += (f"\n🧩 Подключено аккаунтов: {sessions_count}. Отслеживаемые каналы будут распределены между ними "
+                f"при следующем запуске отслеживания.")
     await message.answer(msg)
 
 
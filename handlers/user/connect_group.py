@@ -4,8 +4,9 @@ from aiogram.fsm.context import FSMContext
 from aiogram.types import Message
 from loguru import logger  # https://github.com/Delgan/loguru
 
-from database.database import User, create_group_model
-from keyboards.user.keyboards import (back_keyboard)
+from account_manager.routing import format_route_rules, parse_route_rules
+from database.database import User, create_group_model, get_user_keywords, get_user_routes, set_user_routes
+from keyboards.user.keyboards import back_keyboard, tracking_settings_keyboard
 from locales.locales import get_text
 from states.states import MyStates
 from system.dispatcher import router
@@ -83,13 +84,81 @@ async def handle_group_username_submission(message: Message, state: FSMContext):
     await state.clear()  # Завершаем текущее состояние машины состояния
 
 
+@router.message(F.text == "🧭 Маршруты пересылки")
+async def handle_routes_menu(message: Message, state: FSMContext):
+    """
+    Обработчик команды "🧭 Маршруты пересылки".
+
+    Показывает текущие маршруты «ключевое слово → целевые группы» и просит ввести новый набор маршрутов
+    (по одному на строку), переводит пользователя в состояние MyStates.entering_routes.
+
+    :param message: (Message) Объект входящего сообщения от пользователя.
+    :param state: (FSMContext) Контекст машины состояний.
+    :return: None
+    """
+    await state.clear()  # Завершаем текущее состояние машины состояния
+    routes = get_user_routes(user_id=message.from_user.id)
+    await message.answer(
+        text=("🧭 <b>Маршруты пересылки</b>\n\n"
+              f"{format_route_rules(routes)}\n\n"
+              "Сообщения, найденные по ключевому слову с маршрутом, пересылаются в указанные группы, остальные — "
+              "в основную группу.\n\n"
+              "✍️ Введите новый набор маршрутов, по одному на строку (он заменит текущий):\n"
+              "<code>python, golang -> @dev_alerts</code>\n"
+              "<code>дизайн -> @design_alerts, @team_chat</code>\n\n"
+              "Чтобы удалить все маршруты, отправьте <code>очистить</code>.\n\n"
+              "ℹ️ Изменения вступают в силу при следующем запуске отслеживания."),
+        reply_markup=back_keyboard(),
+        parse_mode="HTML"
+    )
+    await state.set_state(MyStates.entering_routes)
+
+
+@router.message(MyStates.entering_routes)
+async def handle_routes_submission(message: Message, state: FSMContext):
+    """
+    Обработчик ввода маршрутов пересылки.
+
+    Ключевые слова маршрутов должны совпадать с ключевыми словами пользователя; набор маршрутов заменяется целиком.
+
+    :param message: (Message) Объект входящего сообщения с маршрутами.
+    :param state: (FSMContext) Контекст машины состояний, сбрасывается после обработки.
+    :return: None
+    """
+    if message.text.strip().lower() == "очистить":
+        routes = []
+    else:
+        routes, invalid = parse_route_rules(message.text)
+        if invalid:
+            await message.answer(
+                "⚠️ Не удалось разобрать строки:\n" + "\n".join(f"• {line}" for line in invalid[:10]) +
+                "\n\nФормат: ключевое слово, другое слово -> @группа1, @группа2"
+            )
+            return
+
+    set_user_routes(user_id=message.from_user.id, routes=routes)
+    logger.info(f"Пользователь {message.from_user.id} задал маршруты пересылки: {len(routes)}")
+    await state.clear()  # Завершаем текущее состояние машины состояния
+
+    user_keywords = {keyword.strip().casefold() for keyword in get_user_keywords(user_id=message.from_user.id)}
+    unknown = sorted({keyword for keyword, _ in routes if keyword.casefold() not in user_keywords})
+    warning = f"\n\n⚠️ Нет среди ваших ключевых слов: {', '.join(unknown)}" if unknown else ""
+
+    await message.answer(
+        text=f"🧭 <b>Маршруты пересылки</b>\n\n{format_route_rules(routes)}{warning}",
+        reply_markup=tracking_settings_keyboard(),
+        parse_mode="HTML"
+    )
+
+
 def register_entering_group_handler():
     """
     Регистрирует обработчики для подключения технической группы.
 
-    Добавляет в маршрутизатор (router) два обработчика:
+    Добавляет в маршрутизатор (router) обработчики:
         1. handle_connect_message_group — реагирует на нажатие кнопки "📤 Подключить группу для сообщений".
         2. handle_group_username_submission — обрабатывает ввод username группы в состоянии MyStates.entering_group.
+        3. handle_routes_menu и handle_routes_submission — маршруты пересылки по ключевым словам в другие группы.
 
     Эти обработчики позволяют пользователю указать чат, куда бот будет пересылать
     найденные сообщения, содержащие ключевые слова.
@@ -98,3 +167,5 @@ def register_entering_group_handler():
     """
     router.message.register(handle_connect_message_group)  # Регистрация обработчика
     router.message.register(handle_group_username_submission)  # Регистрация обработчика ввода username
+    router.message.register(handle_routes_menu)
+    router.message.register(handle_routes_submission)
@@ -4,6 +4,8 @@ from aiogram.fsm.context import FSMContext
 from aiogram.types import Message
 from loguru import logger  # https://github.com/Delgan/loguru
 
+from account_manager.keyword_query import QueryError, compile_query
+from account_manager.shared_index import refresh_user_keywords
 from database.database import User, create_keywords_model
 from keyboards.user.keyboards import back_keyboard
 from locales.locales import get_text
@@ -92,6 +94,11 @@ async def handle_keywords_submission(message: Message, state: FSMContext):
 
     # Add each keyword one by one
     for keyword in keywords_list:
+        try:
+            compile_query(keyword)  # Запрос с ошибкой не сохраняем
+        except QueryError as e:
+            error_keywords.append((keyword, f"ошибка в запросе: {e}"))
+            continue
         try:
             KeywordsModel.create(user_keyword=keyword)
             added_keywords.append(keyword)
@@ -102,6 +109,10 @@ async def handle_keywords_submission(message: Message, state: FSMContext):
                 error_keywords.append((keyword, str(e)))
                 logger.error(f"Error adding keyword {keyword}: {e}")
 
+    # Обновляем общий индекс ключевых слов, если у пользователя запущено отслеживание
+    if added_keywords:
+        refresh_user_keywords(user_id=telegram_user.id)
+
     # Format response message
     response_parts = []
 
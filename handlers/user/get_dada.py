@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
+import asyncio
 import os
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from aiogram import F
 from aiogram.fsm.context import FSMContext
@@ -9,7 +10,11 @@ from loguru import logger  # https://github.com/Delgan/loguru
 from openpyxl import Workbook
 from openpyxl.styles import Font, Alignment, PatternFill
 
-from database.database import User, create_keywords_model, create_groups_model
+from account_manager.keyword_stats import keyword_stats
+from account_manager.match_log import match_log
+from database.database import (
+    User, create_keywords_model, create_groups_model, get_user_matches, get_user_keywords, get_keyword_hits
+)
 from locales.locales import get_text
 from system.dispatcher import router
 
@@ -243,13 +248,151 @@ async def get_tracking_links_list(message: Message, state: FSMContext):
         await message.answer(get_text(user.language, "export_error"))
 
 
+@router.message(F.text == "📜 Журнал совпадений")
+async def get_matches_log(message: Message, state: FSMContext):
+    """
+    Обработчик команды "📜 Журнал совпадений" для экспорта найденных совпадений в Excel.
+
+    Выгружает совпадения пользователя за последние 30 дней (не более 10 000 записей, от новых к старым):
+    время, канал, найденные ключевые слова, ссылку и фрагмент текста. Перед выгрузкой сохраняются записи,
+    ещё не записанные в базу (`match_log`).
+
+    :param message: (Message) Входящее сообщение от пользователя, инициировавшего экспорт.
+    :param state: (FSMContext) Контекст машины состояний, сбрасывается в начале обработки.
+    :return: None
+    """
+    await state.clear()  # Завершаем текущее состояние машины состояния
+    telegram_user = message.from_user
+
+    logger.info(f"Пользователь {telegram_user.id} {telegram_user.username} запросил экспорт журнала совпадений")
+
+    # Сохраняем накопленные записи, чтобы выгрузка была полной (запись и выборка — в отдельном потоке)
+    await match_log.flush_in_thread()
+    matches = await asyncio.to_thread(
+        get_user_matches, user_id=telegram_user.id, since=datetime.now() - timedelta(days=30)
+    )
+
+    if not matches:
+        await message.answer("📜 За последние 30 дней совпадений не найдено.")
+        return
+
+    data = [
+        (
+            idx,
+            match.matched_at.strftime("%d.%m.%Y %H:%M:%S"),
+            match.chat_title or str(match.chat_id),
+            match.keywords,
+            match.link,
+            match.snippet
+        )
+        for idx, match in enumerate(matches, start=1)
+    ]
+
+    # Формируем имя файла
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"matches_{telegram_user.id}_{timestamp}.xlsx"
+    headers = ["№", "Время / Time", "Канал / Channel", "Ключевые слова / Keywords", "Ссылка / Link",
+               "Фрагмент / Snippet"]
+
+    try:
+        filepath = create_excel_file(
+            data=data,
+            headers=headers,
+            filename=filename,
+            sheet_name="Matches"
+        )
+
+        document = FSInputFile(filepath)
+        await message.answer_document(
+            document=document,
+            caption=f"📜 Журнал совпадений за 30 дней\nВсего записей: {len(data)}"
+        )
+
+        # Удаляем файл после отправки
+        os.remove(filepath)
+        logger.info(f"Файл журнала совпадений отправлен и удалён: {filepath}")
+
+    except Exception as e:
+        logger.exception(f"Ошибка при создании Excel-файла с журналом совпадений: {e}")
+        await message.answer("❌ Ошибка при выгрузке журнала совпадений.")
+
+
+@router.message(F.text == "📊 Статистика ключевых слов")
+async def get_keyword_statistics(message: Message, state: FSMContext):
+    """
+    Обработчик команды "📊 Статистика ключевых слов".
+
+    Отправляет пользователю отчёт по его ключевым словам за последние 30 дней: количество совпадений,
+    среднее количество в день (с первого дня учёта, но не больше 30 дней) и время последнего совпадения.
+    Ключевые слова отсортированы по количеству совпадений; слова без совпадений за период перечислены отдельно —
+    их стоит удалить или переформулировать.
+
+    - Перед построением отчёта сохраняются счётчики, ещё не записанные в базу (`keyword_stats`).
+    - Длинный отчёт разбивается на несколько сообщений (лимит Telegram — 4096 символов).
+
+    :param message: (Message) Входящее сообщение от пользователя.
+    :param state: (FSMContext) Контекст машины состояний, сбрасывается в начале обработки.
+    :return: None
+    """
+    await state.clear()  # Завершаем текущее состояние машины состояния
+    telegram_user = message.from_user
+
+    logger.info(f"Пользователь {telegram_user.id} {telegram_user.username} запросил статистику ключевых слов")
+
+    try:
+        user_keywords = await asyncio.to_thread(get_user_keywords, user_id=telegram_user.id)
+        keywords = list(dict.fromkeys(keyword.strip() for keyword in user_keywords))
+        if not keywords:
+            await message.answer("📊 У вас нет ключевых слов.")
+            return
+
+        # Сохраняем накопленные счётчики, чтобы отчёт был полным (запись и выборка — в отдельном потоке)
+        await keyword_stats.flush_in_thread()
+        today = datetime.now().date()
+        since = today - timedelta(days=29)
+        hits = await asyncio.to_thread(get_keyword_hits, user_id=telegram_user.id, since=since)
+
+        active, inactive = [], []
+        for keyword in keywords:
+            period_hits, first_day, last_hit = hits.get(keyword, (0, None, None))
+            if not period_hits:
+                last = f" (последнее: {last_hit:%d.%m.%Y})" if last_hit else ""
+                inactive.append(f"▫️ <code>{keyword}</code>{last}")
+                continue
+            days = (today - max(first_day, since)).days + 1
+            active.append((period_hits, (
+                f"🔹 <code>{keyword}</code> — {period_hits} "
+                f"({period_hits / days:.1f} в день), последнее: {last_hit:%d.%m.%Y %H:%M}"
+            )))
+
+        lines = [f"📊 <b>Статистика ключевых слов за 30 дней</b>\nСрабатывали: {len(active)} из {len(keywords)}"]
+        lines += [line for _, line in sorted(active, key=lambda item: item[0], reverse=True)]
+        if inactive:
+            lines.append(f"\n💤 <b>Без совпадений за 30 дней: {len(inactive)}</b>")
+            lines += inactive
+
+        chunk = ""
+        for line in lines:
+            if len(chunk) + len(line) > 4000:
+                await message.answer(chunk, parse_mode="HTML")
+                chunk = ""
+            chunk += line + "\n"
+        await message.answer(chunk, parse_mode="HTML")
+
+    except Exception as e:
+        logger.exception(f"Ошибка при формировании статистики ключевых слов: {e}")
+        await message.answer("❌ Ошибка при формировании статистики ключевых слов.")
+
+
 def register_data_export_handlers():
     """
     Регистрирует обработчики для экспорта пользовательских данных в Excel.
 
-    Добавляет в маршрутизатор (router) два обработчика:
+    Добавляет в маршрутизатор (router) обработчики:
         1. get_keywords_list — для экспорта списка ключевых слов по кнопке "🔍 Список ключевых слов".
         2. get_tracking_links_list — для экспорта списка отслеживаемых ссылок по кнопке "🌐 Ссылки для отслеживания".
+        3. get_matches_log — для экспорта журнала совпадений по кнопке "📜 Журнал совпадений".
+        4. get_keyword_statistics — для отчёта по срабатываниям ключевых слов по кнопке "📊 Статистика ключевых слов".
 
     Эти обработчики позволяют пользователю получать свои данные в виде файлов .xlsx,
     пригодных для просмотра или анализа в сторонних программах.
@@ -261,3 +404,5 @@ def register_data_export_handlers():
     """
     router.message.register(get_keywords_list)
     router.message.register(get_tracking_links_list)
+    router.message.register(get_matches_log)
+    router.message.register(get_keyword_statistics)
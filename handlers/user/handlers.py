@@ -8,8 +8,11 @@ from aiogram.filters import CommandStart
 from aiogram.fsm.context import FSMContext
 from loguru import logger  # https://github.com/Delgan/loguru
 
-from account_manager.parser import filter_messages
+from account_manager.listener_pool import POOL_DIR, listener_pool
+from account_manager.parser import run_tracking_session
+from account_manager.supervisor import tracking_supervisor
 from account_manager.session import find_session_file
+from account_manager.sharding import list_session_files
 from database.database import (
     User, create_groups_model, getting_number_records_database, get_session_count,
     get_target_group_count, get_tracked_channels_count, get_keywords_count, TelegramGroup
@@ -255,12 +258,16 @@ async def handle_start_tracking(message, state: FSMContext):
     Обработчик команды "⏯ Запуск отслеживания".
 
     Проверяет наличие подключенного Telegram-аккаунта (.session файл) у пользователя.
-    Если аккаунт найден, запускает процесс фильтрации сообщений с помощью `filter_messages`.
-    Если аккаунт не найден, уведомляет пользователя и предлагает 🔐 Подключить аккаунт.
+    Если аккаунт найден, запускает процесс фильтрации сообщений (`run_tracking_session`) в фоновой задаче
+    `tracking_supervisor` — обработчик сразу возвращается, сессия живёт независимо от него и возобновляется
+    после перезапуска бота.
+    Если аккаунт не найден, отслеживание запускается через общий пул аккаунтов бота (`listener_pool`, папка
+    accounts/free/). Если и пул недоступен, уведомляет пользователя и предлагает 🔐 Подключить аккаунт.
 
     - Путь к сессии ищется в папке `accounts/{user_id}/`.
     - Используется первое найденное .session-расширение.
     - Сообщение о запуске отправляется до начала парсинга.
+    - У пользователя может быть только одна сессия отслеживания.
 
     :param message: (Message) Входящее сообщение от пользователя.
     :param state: (FSMContext) Контекст машины состояний, не используется напрямую.
@@ -274,13 +281,25 @@ async def handle_start_tracking(message, state: FSMContext):
         logger.info(
             f"Пользователь {message.from_user.id} {message.from_user.username} {message.from_user.first_name} {message.from_user.last_name} перешел в меню запуска парсинга.")
 
+        if tracking_supervisor.is_running(message.from_user.id):
+            await message.answer(
+                text="⚠️ Отслеживание уже запущено. Чтобы перезапустить его, сначала остановите текущее.",
+                reply_markup=menu_launch_tracking_keyboard()
+            )
+            return
+
         # === Папка, где хранятся сессии ===
         session_dir = os.path.join("accounts", str(message.from_user.id))
         os.makedirs(session_dir, exist_ok=True)
 
-        session_path = await find_session_file(session_dir, user, message)  # <-- ✅ ищем файл сессии
+        if not list_session_files(session_dir) and listener_pool.is_available():
+            logger.info("Нет подключенного аккаунта — отслеживание через общий пул аккаунтов")
+            session_path = POOL_DIR
+        else:
+            session_path = await find_session_file(session_dir, user, message)  # <-- ✅ ищем файл сессии
 
         logger.info(session_path)
+
         if session_path is None:
             logger.warning("Нет подключенного аккаунта")
 
@@ -296,11 +315,14 @@ async def handle_start_tracking(message, state: FSMContext):
             reply_markup=menu_launch_tracking_keyboard()  # клавиатура выбора языка
         )
 
-        await filter_messages(
-            message=message,  # сообщение
-            user_id=message.from_user.id,  # ID пользователя
-            user=user,  # модель пользователя
-            session_path=session_path  # путь к сессии
+        tracking_supervisor.start(
+            user_id=message.from_user.id,
+            factory=lambda: run_tracking_session(
+                message=message,  # сообщение
+                user_id=message.from_user.id,  # ID пользователя
+                user=user,  # модель пользователя
+                session_path=session_path  # путь к сессии
+            )
         )
     except Exception as e:
         logger.exception(e)
@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+import os
+
+from aiogram import F
+from aiogram.fsm.context import FSMContext
+from aiogram.types import Message
+from loguru import logger  # https://github.com/Delgan/loguru
+
+from account_manager.delivery import DELIVERY_FORMAT_LABELS, get_delivery_format
+from account_manager.digest import get_digest_settings
+from account_manager.poller import get_poll_mode
+from account_manager.prefilter import format_filter_rules, parse_filter_rules, refresh_user_filter
+from account_manager.standby import find_standby_session
+from database.database import get_user_filters, set_user_filters, set_user_setting
+from keyboards.user.keyboards import back_keyboard, delivery_format_keyboard, tracking_settings_keyboard
+from states.states import MyStates
+from system.dispatcher import router
+
+
+def format_tracking_settings(user_id: int) -> str:
+    """
+    Формирует текст с текущими настройками отслеживания пользователя.
+
+    :param user_id: (int) ID пользователя Telegram.
+    :return: (str) Текст сообщения.
+    """
+    digest_enabled, digest_window, digest_size = get_digest_settings(user_id=user_id)
+    delivery_format = DELIVERY_FORMAT_LABELS[get_delivery_format(user_id=user_id)]
+    has_standby = find_standby_session(os.path.join("accounts", str(user_id))) is not None
+    poll_mode = get_poll_mode(user_id=user_id)
+    return (
+        "🛠 <b>Настройки отслеживания</b>\n\n"
+        f"📬 <b>Формат доставки:</b> {delivery_format}\n"
+        f"🛡 <b>Резервный аккаунт:</b> {'подключён' if has_standby else 'не подключён'}\n"
+        f"🔄 <b>Режим опроса:</b> {'включён' if poll_mode else 'выключен'}\n"
+        f"📰 <b>Дайджест:</b> {'включён' if digest_enabled else 'выключен'}\n"
+        f"⏱ <b>Окно дайджеста:</b> {digest_window // 60} мин., до {digest_size} совпадений\n\n"
+        "В режиме дайджеста найденные сообщения не пересылаются по одному, а собираются и отправляются "
+        "одним сообщением со ссылками раз в заданный интервал.\n\n"
+        "В режиме опроса аккаунт не подписывается на каналы, а периодически проверяет их историю; подписка "
+        "выполняется только на каналы с частыми публикациями. Без режима опроса проверкой истории отслеживаются "
+        "только каналы, подписка на которые невозможна или превышает лимит аккаунта.\n\n"
+        "Чтобы подключить резервный аккаунт, отправьте его файл .session с подписью «резерв».\n\n"
+        "ℹ️ Изменения вступают в силу при следующем запуске отслеживания."
+    )
+
+
+@router.message(F.text == "🛠 Настройки отслеживания")
+async def handle_tracking_settings_menu(message: Message, state: FSMContext):
+    """
+    Обработчик команды "🛠 Настройки отслеживания".
+
+    Очищает состояние FSM и показывает пользователю текущие настройки доставки найденных сообщений
+    с клавиатурой для их изменения.
+
+    :param message: (Message) Входящее сообщение от пользователя.
+    :param state: (FSMContext) Контекст машины состояний, сбрасывается перед обработкой.
+    :return: None
+    """
+    await state.clear()  # Завершаем текущее состояние машины состояния
+    logger.info(f"Пользователь {message.from_user.id} перешел в меню 🛠 Настройки отслеживания")
+
+    await message.answer(
+        text=format_tracking_settings(user_id=message.from_user.id),
+        reply_markup=tracking_settings_keyboard(),
+        parse_mode="HTML"
+    )
+
+
+@router.message(F.text.in_(["📰 Включить дайджест", "📰 Выключить дайджест"]))
+async def handle_toggle_digest(message: Message, state: FSMContext):
+    """
+    Обработчик включения и отключения режима дайджеста.
+
+    :param message: (Message) Входящее сообщение с выбранным действием.
+    :param state: (FSMContext) Контекст машины состояний, сбрасывается перед обработкой.
+    :return: None
+    """
+    await state.clear()  # Завершаем текущее состояние машины состояния
+    enabled = message.text == "📰 Включить дайджест"
+    set_user_setting(user_id=message.from_user.id, key="digest_enabled", value="1" if enabled else "0")
+    logger.info(f"Пользователь {message.from_user.id} {'включил' if enabled else 'выключил'} режим дайджеста")
+
+    await message.answer(
+        text=format_tracking_settings(user_id=message.from_user.id),
+        reply_markup=tracking_settings_keyboard(),
+        parse_mode="HTML"
+    )
+
+
+@router.message(F.text.in_(["🔄 Включить режим опроса", "🔄 Выключить режим опроса"]))
+async def handle_toggle_poll_mode(message: Message, state: FSMContext):
+    """
+    Обработчик включения и отключения режима опроса каналов без подписки.
+
+    :param message: (Message) Входящее сообщение с выбранным действием.
+    :param state: (FSMContext) Контекст машины состояний, сбрасывается перед обработкой.
+    :return: None
+    """
+    await state.clear()  # Завершаем текущее состояние машины состояния
+    enabled = message.text == "🔄 Включить режим опроса"
+    set_user_setting(user_id=message.from_user.id, key="poll_mode", value="1" if enabled else "0")
+    logger.info(f"Пользователь {message.from_user.id} {'включил' if enabled else 'выключил'} режим опроса")
+
+    await message.answer(
+        text=format_tracking_settings(user_id=message.from_user.id),
+        reply_markup=tracking_settings_keyboard(),
+        parse_mode="HTML"
+    )
+
+
+@router.message(F.text == "⏱ Параметры дайджеста")
+async def handle_digest_params_menu(message: Message, state: FSMContext):
+    """
+    Обработчик команды "⏱ Параметры дайджеста".
+
+    Просит пользователя ввести окно накопления (в минутах) и максимальное количество совпадений в дайджесте,
+    переводит пользователя в состояние MyStates.entering_digest_params.
+
+    :param message: (Message) Входящее сообщение от пользователя.
+    :param state: (FSMContext) Контекст машины состояний.
+    :return: None
+    """
+    await state.clear()  # Завершаем текущее состояние машины состояния
+    await message.answer(
+        text=("⏱ Введите через пробел интервал дайджеста в минутах и максимальное количество совпадений.\n\n"
+              "📌 Пример: <code>10 30</code> — отправлять дайджест раз в 10 минут или сразу при 30 совпадениях."),
+        reply_markup=back_keyboard(),
+        parse_mode="HTML"
+    )
+    await state.set_state(MyStates.entering_digest_params)
+
+
+@router.message(MyStates.entering_digest_params)
+async def handle_digest_params_submission(message: Message, state: FSMContext):
+    """
+    Обработчик ввода параметров дайджеста.
+
+    - Интервал: от 1 до 1440 минут.
+    - Количество совпадений: от 2 до 100.
+
+    :param message: (Message) Входящее сообщение с параметрами.
+    :param state: (FSMContext) Контекст машины состояний, сбрасывается после обработки.
+    :return: None
+    """
+    parts = message.text.split()
+    try:
+        window_minutes, size = int(parts[0]), int(parts[1])
+        if not 1 <= window_minutes <= 1440 or not 2 <= size <= 100:
+            raise ValueError
+    except (ValueError, IndexError):
+        await message.answer("⚠️ Неверный формат. Пример: 10 30 (интервал 1–1440 мин., количество 2–100).")
+        return
+
+    set_user_setting(user_id=message.from_user.id, key="digest_window", value=window_minutes * 60)
+    set_user_setting(user_id=message.from_user.id, key="digest_size", value=size)
+    logger.info(f"Пользователь {message.from_user.id} задал параметры дайджеста: {window_minutes} мин., {size}")
+    await state.clear()  # Завершаем текущее состояние машины состояния
+
+    await message.answer(
+        text=format_tracking_settings(user_id=message.from_user.id),
+        reply_markup=tracking_settings_keyboard(),
+        parse_mode="HTML"
+    )
+
+
+@router.message(F.text == "📬 Формат доставки")
+async def handle_delivery_format_menu(message: Message, state: FSMContext):
+    """
+    Обработчик команды "📬 Формат доставки".
+
+    Показывает пользователю доступные форматы доставки найденных сообщений:
+        - 📨 Только пересылка — пересылается оригинал сообщения (1 запрос к Telegram);
+        - 📝 Только контекст — источник, ссылка и фрагмент текста вокруг ключевого слова (1 запрос);
+        - 📨 Пересылка и контекст — сообщение с полным текстом и пересылка оригинала (2 запроса).
+
+    :param message: (Message) Входящее сообщение от пользователя.
+    :param state: (FSMContext) Контекст машины состояний, сбрасывается перед обработкой.
+    :return: None
+    """
+    await state.clear()  # Завершаем текущее состояние машины состояния
+    await message.answer(
+        text=("📬 <b>Выберите формат доставки найденных сообщений:</b>\n\n"
+              "📨 <b>Только пересылка</b> — пересылается оригинал сообщения.\n"
+              "📝 <b>Только контекст</b> — источник, ссылка и фрагмент текста вокруг ключевого слова.\n"
+              "📨 <b>Пересылка и контекст</b> — сообщение с полным текстом и пересылка оригинала.\n\n"
+              "ℹ️ Форматы с одним сообщением вдвое снижают нагрузку на аккаунт при большом количестве совпадений."),
+        reply_markup=delivery_format_keyboard(),
+        parse_mode="HTML"
+    )
+
+
+@router.message(F.text.in_(list(DELIVERY_FORMAT_LABELS.values())))
+async def handle_delivery_format_selection(message: Message, state: FSMContext):
+    """
+    Обработчик выбора формата доставки.
+
+    :param message: (Message) Входящее сообщение с выбранным форматом.
+    :param state: (FSMContext) Контекст машины состояний, сбрасывается перед обработкой.
+    :return: None
+    """
+    await state.clear()  # Завершаем текущее состояние машины состояния
+    delivery_format = next(key for key, label in DELIVERY_FORMAT_LABELS.items() if label == message.text)
+    set_user_setting(user_id=message.from_user.id, key="delivery_format", value=delivery_format)
+    logger.info(f"Пользователь {message.from_user.id} выбрал формат доставки: {delivery_format}")
+
+    await message.answer(
+        text=format_tracking_settings(user_id=message.from_user.id),
+        reply_markup=tracking_settings_keyboard(),
+        parse_mode="HTML"
+    )
+
+
+@router.message(F.text == "🧹 Фильтры сообщений")
+async def handle_filters_menu(message: Message, state: FSMContext):
+    """
+    Обработчик команды "🧹 Фильтры сообщений".
+
+    Показывает текущие правила фильтрации и просит ввести новый набор правил (по одному на строку),
+    переводит пользователя в состояние MyStates.entering_filters.
+
+    :param message: (Message) Входящее сообщение от пользователя.
+    :param state: (FSMContext) Контекст машины состояний.
+    :return: None
+    """
+    await state.clear()  # Завершаем текущее состояние машины состояния
+    rules = get_user_filters(user_id=message.from_user.id)
+    await message.answer(
+        text=("🧹 <b>Фильтры сообщений</b>\n\n"
+              f"{format_filter_rules(rules)}\n\n"
+              "Сообщения, не прошедшие фильтр, не проверяются по ключевым словам и не пересылаются.\n\n"
+              "✍️ Введите новый набор правил, по одному на строку (он заменит текущий):\n"
+              "<code>-минус слово</code> — не пересылать сообщения с этим словом\n"
+              "<code>мин 20</code> / <code>макс 2000</code> — длина текста в символах\n"
+              "<code>блок 123456789</code> / <code>блок @username</code> — игнорировать отправителя\n"
+              "<code>без ботов</code> — игнорировать сообщения ботов\n"
+              "<code>только пересланные</code> / <code>только оригиналы</code>\n\n"
+              "Чтобы удалить все фильтры, отправьте <code>очистить</code>."),
+        reply_markup=back_keyboard(),
+        parse_mode="HTML"
+    )
+    await state.set_state(MyStates.entering_filters)
+
+
+@router.message(MyStates.entering_filters)
+async def handle_filters_submission(message: Message, state: FSMContext):
+    """
+    Обработчик ввода правил фильтрации сообщений.
+
+    Набор правил заменяется целиком; у запущенного отслеживания фильтр обновляется сразу.
+
+    :param message: (Message) Входящее сообщение с правилами.
+    :param state: (FSMContext) Контекст машины состояний, сбрасывается после обработки.
+    :return: None
+    """
+    if message.text.strip().lower() == "очистить":
+        rules = []
+    else:
+        rules, invalid = parse_filter_rules(message.text)
+        if invalid:
+            await message.answer(
+                "⚠️ Не удалось разобрать строки:\n" + "\n".join(f"• {line}" for line in invalid[:10]) +
+                "\n\nИсправьте их и отправьте правила ещё раз."
+            )
+            return
+
+    set_user_filters(user_id=message.from_user.id, rules=rules)
+    refresh_user_filter(user_id=message.from_user.id)
+    logger.info(f"Пользователь {message.from_user.id} задал фильтры сообщений: {len(rules)} правил")
+    await state.clear()  # Завершаем текущее состояние машины состояния
+
+    await message.answer(
+        text=f"🧹 <b>Фильтры сообщений</b>\n\n{format_filter_rules(rules)}",
+        reply_markup=tracking_settings_keyboard(),
+        parse_mode="HTML"
+    )
+
+
+def register_tracking_settings_handlers():
+    """
+    Регистрирует обработчики меню настроек отслеживания.
+
+    Добавляет в маршрутизатор (router) обработчики для:
+        - Открытия меню "🛠 Настройки отслеживания"
+        - Включения и отключения режима дайджеста
+        - Ввода параметров дайджеста
+        - Выбора формата доставки
+        - Ввода фильтров сообщений
+
+    Вызывается при инициализации бота в `main.py`.
+
+    :return: None
+    """
+    router.message.register(handle_tracking_settings_menu)
+    router.message.register(handle_toggle_digest)
+    router.message.register(handle_digest_params_menu)
+    router.message.register(handle_digest_params_submission)
+    router.message.register(handle_delivery_format_menu)
+    router.message.register(handle_delivery_format_selection)
+    router.message.register(handle_toggle_poll_mode)
+    router.message.register(handle_filters_menu)
+    router.message.register(handle_filters_submission)
@@ -32,6 +32,7 @@ def admin_keyboard():
             [KeyboardButton(text="Присвоить категорию")],
             [KeyboardButton(text="Проверка аккаунтов")],
             [KeyboardButton(text="Присвоить язык")],
+            [KeyboardButton(text="📡 Сессии отслеживания")],
             [KeyboardButton(text="🔙 Назад")]
         ],
         resize_keyboard=True,
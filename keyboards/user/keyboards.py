@@ -148,6 +148,7 @@ def settings_keyboard():
         - Обновление списка отслеживаемых групп
         - Ввод и редактирование ключевых слов
         - Подключение аккаунта и технической группы
+        - Выгрузка журнала найденных совпадений и статистика ключевых слов
         - Смена языка интерфейса
         - Возврат в главное меню
 
@@ -157,6 +158,8 @@ def settings_keyboard():
     Layout:
         [🔁 Обновить список] [🔍 Ввод ключевого слова]
         [🔐 Подключить аккаунт] [📤 Подключить группу для сообщений]
+        [📜 Журнал совпадений] [📊 Статистика ключевых слов]
+        [🛠 Настройки отслеживания]
         [🌐 Сменить язык]
         [🔙 Назад]
 
@@ -169,6 +172,8 @@ def settings_keyboard():
             [KeyboardButton(text="Удалить группу из отслеживания")],
             [KeyboardButton(text="🔍 Список ключевых слов"), KeyboardButton(text="🌐 Ссылки для отслеживания")],
             [KeyboardButton(text="🔐 Подключить аккаунт"), KeyboardButton(text="📤 Подключить группу для сообщений")],
+            [KeyboardButton(text="📜 Журнал совпадений"), KeyboardButton(text="📊 Статистика ключевых слов")],
+            [KeyboardButton(text="🛠 Настройки отслеживания")],
             [KeyboardButton(text="🌐 Сменить язык")],
             [KeyboardButton(text="🔙 Назад")]
         ],
@@ -177,6 +182,64 @@ def settings_keyboard():
     )
 
 
+def tracking_settings_keyboard():
+    """
+    Создаёт клавиатуру меню настроек отслеживания.
+
+    Предоставляет доступ к параметрам доставки найденных сообщений:
+        - Включение и отключение режима дайджеста
+        - Настройка окна и размера дайджеста
+        - Выбор формата доставки
+        - Включение и отключение режима опроса каналов без подписки
+        - Фильтры сообщений (минус-слова, длина, отправители)
+        - Маршруты пересылки по ключевым словам в разные группы
+
+    Returns:
+        ReplyKeyboardMarkup: Объект клавиатуры с настройками отслеживания.
+
+    Layout:
+        [📰 Включить дайджест] [📰 Выключить дайджест]
+        [⏱ Параметры дайджеста] [📬 Формат доставки]
+        [🔄 Включить режим опроса] [🔄 Выключить режим опроса]
+        [🧹 Фильтры сообщений] [🧭 Маршруты пересылки]
+        [🔙 Назад]
+    """
+    return ReplyKeyboardMarkup(
+        keyboard=[
+            [KeyboardButton(text="📰 Включить дайджест"), KeyboardButton(text="📰 Выключить дайджест")],
+            [KeyboardButton(text="⏱ Параметры дайджеста"), KeyboardButton(text="📬 Формат доставки")],
+            [KeyboardButton(text="🔄 Включить режим опроса"), KeyboardButton(text="🔄 Выключить режим опроса")],
+            [KeyboardButton(text="🧹 Фильтры сообщений"), KeyboardButton(text="🧭 Маршруты пересылки")],
+            [KeyboardButton(text="🔙 Назад")]
+        ],
+        resize_keyboard=True,
+        one_time_keyboard=False  # Отправлять сообщение только один раз
+    )
+
+
+def delivery_format_keyboard():
+    """
+    Создаёт клавиатуру выбора формата доставки найденных сообщений.
+
+    Returns:
+        ReplyKeyboardMarkup: Объект клавиатуры с форматами доставки.
+
+    Layout:
+        [📨 Только пересылка] [📝 Только контекст]
+        [📨 Пересылка и контекст]
+        [🔙 Назад]
+    """
+    return ReplyKeyboardMarkup(
+        keyboard=[
+            [KeyboardButton(text="📨 Только пересылка"), KeyboardButton(text="📝 Только контекст")],
+            [KeyboardButton(text="📨 Пересылка и контекст")],
+            [KeyboardButton(text="🔙 Назад")]
+        ],
+        resize_keyboard=True,
+        one_time_keyboard=False  # Отправлять сообщение только один раз
+    )
+
+
 def connect_keyboard_account():
     """Если у пользователя не подключен аккаунт, то высылаем ему наддую клавиатуру"""
     return ReplyKeyboardMarkup(
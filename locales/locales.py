@@ -52,7 +52,11 @@ LOCALES = {
         "account_missing_2": (
             "⚠️ Сессия аккаунта недействительна (session файл не валидный) — требуется повторный вход. Отправьте валидный файл сессии"
         ),
-        "enter_keyword": "🔍 Введите ключевое слово / словосочетание для отслеживания",
+        "enter_keyword": (
+            "🔍 Введите ключевое слово / словосочетание для отслеживания\n\n"
+            "🧠 Можно ввести запрос: вакансия AND python NOT senior, \"ремонт квартир\", "
+            "дизайн* NEAR/3 логотип, (python OR golang) удалённо, вакансия~ (с опечатками)"
+        ),
         "enter_group": (
             "🔍 Введите ссылку на группу в формате @username, в которую будет пересылаться сообщение, обнаруженное по ключевому слову"
         ),
@@ -102,7 +106,11 @@ LOCALES = {
         "account_missing_2": (
             "⚠️ The session file for your Telegram account is invalid — you need to log in again. Send a valid session file."
         ),
-        "enter_keyword": "🔍 Enter a keyword / phrase to track",
+        "enter_keyword": (
+            "🔍 Enter a keyword / phrase to track\n\n"
+            "🧠 Queries are supported: vacancy AND python NOT senior, \"exact phrase\", "
+            "design* NEAR/3 logo, (python OR golang) remote, vacancy~ (with typos)"
+        ),
         "enter_group": (
             "🔍 Enter a link to the group in the format @username to which the message will be forwarded when a keyword is detected"
         ),
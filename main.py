@@ -5,11 +5,17 @@ import sys
 
 from loguru import logger  # https://github.com/Delgan/loguru
 
+from account_manager.keyword_stats import keyword_stats
+from account_manager.listener_pool import listener_pool
+from account_manager.match_log import match_log
+from account_manager.parser import resume_tracking_sessions
+from account_manager.supervisor import tracking_supervisor
 from handlers.admin.admin import register_handlers_admin_panel
 from handlers.admin.checking_accounts import register_checking_accounts
 from handlers.admin.checking_group_for_ai import register_handlers_checking_group_for_ai
 from handlers.admin.language_detection import register_handlers_languages
 from handlers.admin.post_log import register_handlers_log
+from handlers.admin.tracking_status import register_handlers_tracking_status
 from handlers.user.checking_group_for_keywords import register_handlers_checking_group_for_keywords
 from handlers.user.connect_account import register_connect_account_handler
 from handlers.user.connect_group import register_entering_group_handler
@@ -20,6 +26,7 @@ from handlers.user.handlers import register_greeting_handlers
 from handlers.user.pars_ai import register_handlers_pars_ai
 from handlers.user.post_doc import register_handlers_post_doc
 from handlers.user.stop_tracking import register_stop_tracking_handler
+from handlers.user.tracking_settings import register_tracking_settings_handlers
 from system.dispatcher import dp, bot
 
 logger.add("logs/log.log", rotation="1 MB", compression="zip", enqueue=True)  # Логирование бота
@@ -58,6 +65,7 @@ async def main() -> None:
         register_connect_account_handler()  # Подключение аккаунта
         register_handlers_checking_group_for_keywords()  # Проверка группы на наличие ключевых слов
         register_handlers_delete()  # Удаление групп из базы данных пользователя
+        register_tracking_settings_handlers()  # Настройки отслеживания (дайджест и т.д.)
 
         """
         Панель администратора
@@ -67,8 +75,16 @@ async def main() -> None:
         register_handlers_checking_group_for_ai()  # Присвоение категории группам / каналам
         register_checking_accounts()  # Проверка аккаунтов
         register_handlers_languages() # Присвоение языка группам / каналам
+        register_handlers_tracking_status()  # Состояние сессий отслеживания
 
+        resume_task = asyncio.create_task(resume_tracking_sessions())  # Возобновляем отслеживание, прерванное перезапуском
         await dp.start_polling(bot)
+        resume_task.cancel()  # Прерываем возобновление, если оно ещё идёт, чтобы не запускать сессии при выходе
+        await asyncio.gather(resume_task, return_exceptions=True)
+        await tracking_supervisor.shutdown()  # Корректно останавливаем сессии отслеживания при выходе
+        await listener_pool.shutdown()  # Отключаем аккаунты общего пула прослушивания
+        await match_log.close()  # Сохраняем остаток журнала совпадений
+        await keyword_stats.close()  # Сохраняем счётчики срабатываний ключевых слов
 
     except Exception as e:
         logger.exception(e)
@@ -17,6 +17,10 @@ class MyStates(StatesGroup):
 
     del_username_groups = State()
 
+    entering_digest_params = State()  # Ожидание ввода окна (минуты) и размера дайджеста
+    entering_filters = State()  # Ожидание ввода правил фильтрации сообщений
+    entering_routes = State()  # Ожидание ввода маршрутов «ключевое слово → целевые группы»
+
 
 class MyStatesParsing(StatesGroup):
     get_url = State()  # Ожидание ввода URL для парсинга